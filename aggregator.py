@@ -0,0 +1,458 @@
+"""
+rPPG 중앙 집계 서버
+여러 장치가 MQTT로 보내는 원시 파형(프레임별 ROI 색상 평균, main.py --waveform)을 구독하여
+장치별 링 버퍼에 쌓고, 주기마다 활성 장치 전체의 심박수 / 호흡률을
+(장치 수 x 윈도우) 배열 하나에 대한 2차원 실수 FFT로 한 번에 계산하여 장치별 토픽으로 다시 발행합니다.
+장치는 파형 헤더의 장치 ID(기본값: 장치의 호스트 이름, --device-id로 지정)로 구분하므로
+재시작해도 같은 버퍼와 결과 토픽을 이어 쓰며, --idle-timeout 동안 새 샘플이 없는 장치는 제거합니다.
+
+사용 예:
+    python aggregator.py --mqtt-host broker.local
+    python aggregator.py --subscribe "rppg/+/waveform" --result-prefix rppg/vitals --window 10
+"""
+
+import argparse
+import os
+import struct
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from mqtt_client import MQTTClient, load_mqtt_config
+from mqtt_payload import decode_waveform
+from signal_utils import RingBuffer, get_spectral_plan
+
+
+# 원시 파형에서 사용할 채널 (BGR 중 녹색, 장치의 신호 값과 동일)
+SIGNAL_CHANNEL = 1
+
+
+class DeviceStream:
+    def __init__(self, device_id, topic, capacity):
+        """
+        장치 하나의 원시 파형 버퍼
+
+        Args:
+            device_id: 장치 ID
+            topic: 마지막으로 파형을 받은 토픽
+            capacity: 버퍼 용량 (샘플 수)
+        """
+        self.device_id = device_id
+        self.topic = topic
+        self.timestamps = RingBuffer(capacity)
+        self.values = RingBuffer(capacity)
+        self.last_seen = time.time()
+        self.updated = False
+        self.chunks = 0
+
+    def add_chunk(self, timestamps, values):
+        """
+        파형 묶음 추가 (이미 받은 시각 이전의 샘플은 버림)
+
+        새 샘플이 있을 때만 last_seen을 갱신하므로, 재전송된 옛 묶음만 오거나 장치 시계가
+        되돌아가 샘플이 계속 버려지는 장치도 idle_timeout 뒤에 제거되고 새 버퍼로 다시 시작합니다.
+
+        Args:
+            timestamps: 샘플 시각 배열 (초)
+            values: 샘플 값 배열
+        """
+        if len(self.timestamps) > 0:
+            newer = timestamps > self.timestamps.last()
+            timestamps, values = timestamps[newer], values[newer]
+
+        for timestamp, value in zip(timestamps, values):
+            self.timestamps.append(timestamp)
+            self.values.append(value)
+
+        if len(timestamps) > 0:
+            self.last_seen = time.time()
+            self.updated = True
+        self.chunks += 1
+
+    def resample_window(self, fps, window_size, max_gap):
+        """
+        가장 최근 window_size 샘플 구간을 fps 균일 격자로 재샘플링
+
+        Args:
+            fps: 분석 샘플링 주파수 (Hz)
+            window_size: 분석 윈도우 길이 (샘플 수)
+            max_gap: 허용하는 최대 샘플 간격 (초, 넘으면 구간이 끊긴 것으로 보고 분석 안 함)
+
+        Returns:
+            재샘플링된 신호 (window_size,), 데이터가 부족하거나 끊겼으면 None
+        """
+        if len(self.timestamps) < 2:
+            return None
+
+        timestamps = self.timestamps.view()
+        end = timestamps[-1]
+        start = end - (window_size - 1) / fps
+        if timestamps[0] > start:
+            return None
+
+        # 윈도우 시작 직전 샘플부터 사용
+        first = max(int(np.searchsorted(timestamps, start, side='right')) - 1, 0)
+        timestamps = timestamps[first:]
+        if np.max(np.diff(timestamps)) > max_gap:
+            return None
+
+        grid = start + np.arange(window_size) / fps
+        return np.interp(grid, timestamps, self.values.view()[first:])
+
+
+class VitalsAggregator:
+    def __init__(self, fps=30.0, window=10.0, idle_timeout=30.0, max_gap=1.0, max_device_fps=60.0):
+        """
+        장치별 파형 버퍼와 일괄 심박수 / 호흡률 계산기 초기화
+
+        Args:
+            fps: 분석 샘플링 주파수 (Hz, 모든 장치의 파형을 이 주파수로 재샘플링)
+            window: 분석 윈도우 길이 (초, 장치 RPPGDetector의 기본 버퍼 10초와 동일)
+            idle_timeout: 이 시간 동안 파형이 없으면 장치 제거 (초)
+            max_gap: 윈도우 안에서 허용하는 최대 샘플 간격 (초)
+            max_device_fps: 장치 버퍼 용량 계산에 쓰는 최대 장치 fps
+        """
+        self.fps = fps
+        self.window = window
+        self.window_size = int(round(window * fps))
+        self.idle_timeout = idle_timeout
+        self.max_gap = max_gap
+        self.capacity = int(np.ceil(window * max_device_fps)) + 1
+
+        self.devices = {}
+        self._lock = threading.Lock()
+        self.received_chunks = 0
+        self.invalid_chunks = 0
+        self.evicted_devices = 0
+
+    def add_waveform(self, topic, payload):
+        """
+        MQTT 파형 메시지 처리 (MQTT 수신 콜백)
+
+        Args:
+            topic: 수신 토픽
+            payload: encode_waveform() 형식의 페이로드
+        """
+        try:
+            waveform = decode_waveform(payload)
+        except (ValueError, struct.error, zlib.error):
+            self.invalid_chunks += 1
+            return
+
+        device_id = waveform["device_id"] or topic
+        values = waveform["values"]
+        if values.ndim != 2 or values.shape[1] <= SIGNAL_CHANNEL:
+            self.invalid_chunks += 1
+            return
+
+        with self._lock:
+            stream = self.devices.get(device_id)
+            if stream is None:
+                stream = DeviceStream(device_id, topic, self.capacity)
+                self.devices[device_id] = stream
+            stream.topic = topic
+            stream.add_chunk(waveform["timestamps"], values[:, SIGNAL_CHANNEL])
+            self.received_chunks += 1
+
+    def evict(self, now=None):
+        """
+        idle_timeout 동안 새 샘플이 없던 장치 제거
+
+        Args:
+            now: 현재 시각 (None이면 time.time())
+
+        Returns:
+            제거한 장치 ID 목록
+        """
+        if now is None:
+            now = time.time()
+
+        with self._lock:
+            idle = [device_id for device_id, stream in self.devices.items()
+                    if now - stream.last_seen > self.idle_timeout]
+            for device_id in idle:
+                del self.devices[device_id]
+            self.evicted_devices += len(idle)
+        return idle
+
+    def calculate_vitals(self, min_bpm=40, max_bpm=200, min_rpm=8, max_rpm=30):
+        """
+        모든 활성 장치의 심박수와 호흡률을 한 번에 계산
+
+        장치별 최근 윈도우를 공통 fps로 재샘플링해 (장치 수 x 윈도우) 배열로 쌓고,
+        한 번의 디트렌딩, 한 번의 2차원 실수 FFT, 한 번의 벡터화된 피크 / 신뢰도 계산으로
+        처리합니다 (대역 / 필터 이득 / SNR 기준은 RPPGDetector와 동일).
+
+        Args:
+            min_bpm: 최소 심박수
+            max_bpm: 최대 심박수
+            min_rpm: 최소 호흡률 (분당 호흡 수)
+            max_rpm: 최대 호흡률 (분당 호흡 수)
+
+        Returns:
+            {장치 ID: ((심박수, 신뢰도), (호흡률, 신뢰도), 마지막 샘플 시각)} 딕셔너리
+            (지난 계산 이후 새 샘플이 없거나 윈도우를 채우지 못한 장치는 제외)
+        """
+        device_ids = []
+        rows = []
+        end_times = []
+        with self._lock:
+            for device_id, stream in self.devices.items():
+                # 파형이 끊긴 장치는 제거될 때까지 같은 결과를 반복 발행하지 않음
+                if not stream.updated:
+                    continue
+                stream.updated = False
+                resampled = stream.resample_window(self.fps, self.window_size, self.max_gap)
+                if resampled is not None:
+                    device_ids.append(device_id)
+                    rows.append(resampled)
+                    end_times.append(stream.timestamps.last())
+
+        if not rows:
+            return {}
+
+        stacked = np.stack(rows)
+        stacked = stacked - stacked.mean(axis=1, keepdims=True)
+
+        hr_plan = get_spectral_plan(self.fps, self.window_size, min_bpm / 60.0, max_bpm / 60.0, 0.7, 4.0)
+        spectra = hr_plan.spectrum(stacked)
+        heart_freqs, heart_confidences = hr_plan.estimate_batch(spectra, 1.0, 5.0, apply_filter_gain=True)
+
+        if self.window_size >= 6 * self.fps:  # 호흡률은 최소 6초 데이터 필요
+            rr_plan = get_spectral_plan(self.fps, self.window_size, min_rpm / 60.0, max_rpm / 60.0, 0.1, 0.5)
+            resp_freqs, resp_confidences = rr_plan.estimate_batch(spectra, 0.8, 4.0, apply_filter_gain=True)
+        else:
+            resp_freqs, resp_confidences = np.full(len(rows), np.nan), np.zeros(len(rows))
+
+        results = {}
+        for i, device_id in enumerate(device_ids):
+            heart_result = ((heart_freqs[i] * 60, heart_confidences[i])
+                            if not np.isnan(heart_freqs[i]) else (None, 0.0))
+            respiration_result = ((resp_freqs[i] * 60, resp_confidences[i])
+                                  if not np.isnan(resp_freqs[i]) else (None, 0.0))
+            results[device_id] = (heart_result, respiration_result, end_times[i])
+
+        return results
+
+
+class AggregatorService:
+    def __init__(self, mqtt_client, aggregator, subscribe_topic="rppg/+/waveform",
+                 result_prefix="rppg/vitals", interval=1.0, report_interval=10.0):
+        """
+        MQTT 구독 → 일괄 계산 → 장치별 결과 발행 루프
+
+        Args:
+            mqtt_client: MQTTClient (구독과 결과 발행에 함께 사용)
+            aggregator: VitalsAggregator
+            subscribe_topic: 원시 파형 토픽 필터
+            result_prefix: 결과 토픽 접두사 (장치별 토픽: {접두사}/{장치 ID})
+            interval: 계산 주기 (초)
+            report_interval: 상태 보고 간격 (초)
+        """
+        self.mqtt_client = mqtt_client
+        self.aggregator = aggregator
+        self.subscribe_topic = subscribe_topic
+        self.result_prefix = result_prefix
+        self.interval = interval
+        self.report_interval = report_interval
+        self.last_compute_time = 0.0
+        self.published = 0
+
+    def get_topic(self, device_id):
+        """장치별 결과 토픽"""
+        return f"{self.result_prefix}/{device_id}"
+
+    def start(self):
+        """파형 토픽 구독 및 MQTT 연결"""
+        self.mqtt_client.subscribe(self.subscribe_topic, self.aggregator.add_waveform)
+        self.mqtt_client.connect()
+
+    def tick(self):
+        """
+        한 주기 처리: 유휴 장치 제거, 일괄 계산, 결과 발행
+
+        Returns:
+            결과를 발행한 장치 수
+        """
+        for device_id in self.aggregator.evict():
+            print(f"🗑️  유휴 장치 제거: {device_id}")
+
+        start = time.perf_counter()
+        results = self.aggregator.calculate_vitals()
+        self.last_compute_time = time.perf_counter() - start
+
+        # 장치별 결과가 전송 큐에서 밀려나지 않도록 큐를 두 주기 분량 이상으로 유지
+        # (연결이 끊겨 그보다 많이 밀리면 오래된 결과부터 버림)
+        outbound = self.mqtt_client.queue
+        outbound.maxsize = max(outbound.maxsize, 2 * len(results))
+
+        for device_id, ((heart_rate, hr_confidence), (respiration_rate, _), timestamp) in results.items():
+            self.mqtt_client.publish_vital_signs(
+                heart_rate=heart_rate,
+                respiration_rate=respiration_rate,
+                heart_confidence=hr_confidence if heart_rate is not None else 0.0,
+                timestamp=timestamp,
+                topic=self.get_topic(device_id)
+            )
+        self.published += len(results)
+        return len(results)
+
+    def print_report(self, active):
+        """
+        상태 보고 출력
+
+        Args:
+            active: 이번 주기에 결과를 낸 장치 수
+        """
+        aggregator = self.aggregator
+        print(f"📊 장치 {len(aggregator.devices)}대 (분석 {active}대) | "
+              f"계산 {self.last_compute_time * 1000:.1f} ms | "
+              f"수신 {aggregator.received_chunks}묶음 (오류 {aggregator.invalid_chunks}) | "
+              f"발행 {self.published}건 (버림 {self.mqtt_client.queue.dropped}) | "
+              f"제거 {aggregator.evicted_devices}대")
+
+    def run(self):
+        """종료될 때까지 interval마다 tick() 실행"""
+        next_tick = time.time()
+        last_report_time = time.time()
+        while True:
+            next_tick += self.interval
+            active = self.tick()
+
+            now = time.time()
+            if now - last_report_time >= self.report_interval:
+                self.print_report(active)
+                last_report_time = now
+
+            time.sleep(max(0.0, next_tick - time.time()))
+
+
+def load_broker_settings():
+    """
+    설정 파일(broker, qos 항목만) 또는 환경 변수에서 브로커 접속 정보 읽기
+
+    장치용 설정(스풀, 원시 파형 채널, 바이너리 형식, 장치 ID, 전송 큐)은 집계 서버에 쓰지 않습니다.
+
+    Returns:
+        {"host", "port", "username", "password", "qos"} 딕셔너리, 설정이 없으면 None
+    """
+    config = load_mqtt_config("mqtt_config.json")
+    if config is not None:
+        if not config.get("enabled", True):
+            return None
+        broker_config = config.get("broker", {})
+        return {
+            "host": broker_config.get("host", "localhost"),
+            "port": broker_config.get("port", 1883),
+            "username": broker_config.get("username"),
+            "password": broker_config.get("password"),
+            "qos": config.get("qos", 0)
+        }
+
+    if os.getenv("MQTT_ENABLED", "false").lower() != "true":
+        return None
+    return {
+        "host": os.getenv("MQTT_BROKER_HOST", "localhost"),
+        "port": int(os.getenv("MQTT_BROKER_PORT", "1883")),
+        "username": os.getenv("MQTT_USERNAME", None),
+        "password": os.getenv("MQTT_PASSWORD", None),
+        "qos": 0
+    }
+
+
+def create_mqtt_client(args):
+    """
+    집계 서버 전용 MQTT 클라이언트 생성
+
+    브로커 접속 정보는 명령줄 인수 > 설정 파일 > 환경 변수 순으로 정하고,
+    결과 발행에 맞는 설정(JSON 형식, 스풀 / 파형 채널 없음)으로 클라이언트를 만듭니다.
+
+    Args:
+        args: 파싱된 명령줄 인수
+
+    Returns:
+        MQTTClient 인스턴스 또는 None
+    """
+    if args.mqtt_host or args.mqtt_port:
+        broker = {"host": args.mqtt_host or "localhost", "port": args.mqtt_port or 1883, "qos": 0}
+    else:
+        broker = load_broker_settings()
+        if broker is None:
+            return None
+
+    return MQTTClient(
+        broker_host=broker["host"],
+        broker_port=broker["port"],
+        topic=args.result_prefix,
+        client_id=f"rppg_aggregator_{int(time.time())}",
+        username=args.mqtt_username or broker.get("username"),
+        password=args.mqtt_password or broker.get("password"),
+        qos=broker["qos"],
+        queue_size=args.queue_size
+    )
+
+
+def main():
+    """
+    메인 함수
+    """
+    parser = argparse.ArgumentParser(description='rPPG 중앙 집계 서버')
+    parser.add_argument('--mqtt-host', type=str, default=None,
+                        help='MQTT 브로커 호스트 (기본값: localhost)')
+    parser.add_argument('--mqtt-port', type=int, default=None,
+                        help='MQTT 브로커 포트 (기본값: 1883)')
+    parser.add_argument('--mqtt-username', type=str, default=None,
+                        help='MQTT 사용자명')
+    parser.add_argument('--mqtt-password', type=str, default=None,
+                        help='MQTT 비밀번호')
+    parser.add_argument('--subscribe', type=str, default='rppg/+/waveform',
+                        help='구독할 원시 파형 토픽 필터 (기본값: rppg/+/waveform)')
+    parser.add_argument('--result-prefix', type=str, default='rppg/vitals',
+                        help='결과 토픽 접두사 (장치별 토픽: {접두사}/{장치 ID}, 기본값: rppg/vitals)')
+    parser.add_argument('--fps', type=float, default=30.0,
+                        help='분석 샘플링 주파수 (Hz, 기본값: 30)')
+    parser.add_argument('--window', type=float, default=10.0,
+                        help='분석 윈도우 길이 (초, 기본값: 10)')
+    parser.add_argument('--interval', type=float, default=1.0,
+                        help='심박수/호흡률 계산 주기 (초, 기본값: 1.0)')
+    parser.add_argument('--idle-timeout', type=float, default=30.0,
+                        help='파형이 끊긴 장치를 제거할 시간 (초, 기본값: 30)')
+    parser.add_argument('--queue-size', type=int, default=1000,
+                        help='결과 전송 큐 초기 크기 (장치 수의 두 배보다 작으면 자동으로 늘어남, 기본값: 1000)')
+    parser.add_argument('--report-interval', type=float, default=10.0,
+                        help='상태 보고 간격 (초, 기본값: 10)')
+
+    args = parser.parse_args()
+
+    print("rPPG 중앙 집계 서버 시작")
+    print("=" * 50)
+    print(f"구독: {args.subscribe} → 발행: {args.result_prefix}/<장치 ID>")
+    print(f"분석: {args.fps:.0f} Hz, 윈도우 {args.window:.0f}초, {args.interval:.1f}초마다")
+    print("Ctrl+C로 종료하세요")
+    print("=" * 50)
+
+    mqtt_client = create_mqtt_client(args)
+    if mqtt_client is None:
+        print("❌ 오류: MQTT 브로커 설정이 없습니다. --mqtt-host 또는 mqtt_config.json을 지정하세요.")
+        return
+
+    aggregator = VitalsAggregator(fps=args.fps, window=args.window, idle_timeout=args.idle_timeout)
+    service = AggregatorService(mqtt_client, aggregator, subscribe_topic=args.subscribe,
+                                result_prefix=args.result_prefix, interval=args.interval,
+                                report_interval=args.report_interval)
+    service.start()
+
+    try:
+        service.run()
+    except KeyboardInterrupt:
+        print("\n프로그램이 중단되었습니다.")
+    finally:
+        mqtt_client.disconnect()
+        print(f"결과 {service.published}건을 발행했습니다.")
+        print("\n프로그램을 종료합니다.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""
+rPPG 녹화 영상 일괄 처리 프로그램
+녹화된 영상 파일들을 프로세스 풀로 병렬 분석하여 구간별 심박수 / 호흡률 / 신뢰도를
+CSV 또는 Parquet 파일로 저장합니다. 영상은 실시간 속도 제한 없이 최대한 빠르게 처리됩니다.
+
+사용 예:
+    python batch_process.py "recordings/*.mp4" --output-dir results
+    python batch_process.py night1.avi night2.avi --detector dlib --format parquet --workers 8
+"""
+
+import argparse
+import csv
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import cv2
+
+from signal_utils import check_timestamp_options
+
+
+# 출력 열 순서
+COLUMNS = ["file", "time", "frame", "heart_rate", "hr_confidence",
+           "respiration_rate", "rr_confidence", "buffer"]
+
+
+def expand_inputs(patterns):
+    """
+    파일 경로 / glob 패턴 목록을 실제 파일 목록으로 확장 (중복 제거, 순서 유지)
+
+    Args:
+        patterns: 파일 경로 또는 glob 패턴 목록
+
+    Returns:
+        영상 파일 경로 목록
+    """
+    files = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True)) if glob.has_magic(pattern) else [pattern]
+        for path in matches:
+            if os.path.isfile(path) and path not in files:
+                files.append(path)
+    return files
+
+
+def create_detector(backend, fps, detector_options):
+    """
+    백엔드에 맞는 RPPGDetector 생성 (워커 프로세스 안에서 모델 로드)
+
+    Args:
+        backend: 'mediapipe' 또는 'dlib'
+        fps: 영상 fps
+        detector_options: RPPGDetector 생성자 키워드 인수
+
+    Returns:
+        RPPGDetector 인스턴스
+    """
+    if backend == 'dlib':
+        from rppg import RPPGDetector
+    else:
+        from rppg_mediapipe import RPPGDetector
+    return RPPGDetector(fps=fps, **detector_options)
+
+
+def process_video(path, backend='mediapipe', detector_options=None, update_interval=1.0):
+    """
+    영상 파일 하나를 처음부터 끝까지 분석 (워커 프로세스 본체)
+
+    프레임 시각은 벽시계가 아닌 영상의 프레임 타임스탬프(CAP_PROP_POS_MSEC)를 사용하고,
+    영상 시간 기준 update_interval마다 심박수 / 호흡률을 계산합니다.
+
+    Args:
+        path: 영상 파일 경로
+        backend: 'mediapipe' 또는 'dlib'
+        detector_options: RPPGDetector 생성자 키워드 인수
+        update_interval: 심박수/호흡률 계산 간격 (영상 시간, 초)
+
+    Returns:
+        (구간별 결과 행 목록, 처리 통계 딕셔너리)
+    """
+    # 파일마다 프로세스가 따로 있으므로 OpenCV 내부 스레드는 하나만 사용 (코어 과다 점유 방지)
+    cv2.setNumThreads(1)
+
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise RuntimeError(f"영상 파일을 열 수 없습니다: {path}")
+
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    if fps <= 0:
+        fps = 30
+    detector = create_detector(backend, int(round(fps)), detector_options or {})
+
+    rows = []
+    frame_index = 0
+    last_update_time = 0.0
+    start_time = time.time()
+
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+
+            # 영상의 프레임 타임스탬프 (백엔드가 제공하지 않으면 프레임 번호 / fps)
+            timestamp = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+            if timestamp <= 0 and frame_index > 0:
+                timestamp = frame_index / fps
+            frame_index += 1
+
+            _, _, signal_value = detector.process_frame(frame, timestamp)
+            if signal_value is not None:
+                detector.add_signal(signal_value, timestamp, roi_values=detector.last_roi_values)
+
+            if timestamp - last_update_time >= update_interval:
+                (heart_rate, hr_confidence), (respiration_rate, rr_confidence) = detector.calculate_vitals()
+                rows.append({
+                    "file": path,
+                    "time": round(timestamp, 3),
+                    "frame": frame_index,
+                    "heart_rate": round(float(heart_rate), 2) if heart_rate is not None else None,
+                    "hr_confidence": round(float(hr_confidence), 4),
+                    "respiration_rate": round(float(respiration_rate), 2) if respiration_rate is not None else None,
+                    "rr_confidence": round(float(rr_confidence), 4),
+                    "buffer": len(detector.signal_buffer)
+                })
+                last_update_time = timestamp
+    finally:
+        cap.release()
+
+    elapsed = time.time() - start_time
+    stats = {
+        "frames": frame_index,
+        "duration": frame_index / fps,
+        "elapsed": elapsed,
+        "speed": (frame_index / fps) / elapsed if elapsed > 0 else 0.0
+    }
+    return rows, stats
+
+
+def write_rows(rows, output_path, output_format='csv'):
+    """
+    구간별 결과를 CSV 또는 Parquet 파일로 저장
+
+    Args:
+        rows: 결과 행 딕셔너리 목록
+        output_path: 출력 파일 경로
+        output_format: 'csv' 또는 'parquet' (Parquet는 pandas + pyarrow 필요)
+    """
+    if output_format == 'parquet':
+        try:
+            import pandas as pd
+        except ImportError:
+            raise RuntimeError("Parquet 출력에는 pandas와 pyarrow가 필요합니다: pip install pandas pyarrow")
+        pd.DataFrame(rows, columns=COLUMNS).to_parquet(output_path, index=False)
+        return
+
+    with open(output_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main():
+    """
+    메인 함수
+    """
+    parser = argparse.ArgumentParser(description='rPPG 녹화 영상 일괄 처리 프로그램')
+    parser.add_argument('inputs', nargs='+',
+                        help='영상 파일 경로 또는 glob 패턴 (예: "recordings/**/*.mp4")')
+    parser.add_argument('--detector', choices=['mediapipe', 'dlib'], default='mediapipe',
+                        help='얼굴 감지 백엔드 (기본값: mediapipe)')
+    parser.add_argument('--output-dir', type=str, default='.',
+                        help='결과 파일 저장 폴더 (파일별로 <영상이름>_vitals.csv 생성, 기본값: 현재 폴더)')
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv',
+                        help='출력 형식 (기본값: csv, parquet는 pandas + pyarrow 필요)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='동시에 처리할 파일 수 (기본값: CPU 코어 수)')
+    parser.add_argument('--buffer-size', type=int, default=300,
+                        help='신호 버퍼 크기 (프레임 수, 기본값: 300 = 30fps 기준 10초)')
+    parser.add_argument('--respiration-window', type=float, default=None,
+                        help='호흡률 전용 장기 버퍼 길이 (초, 예: 60)')
+    parser.add_argument('--use-timestamps', action='store_true',
+                        help='프레임 타임스탬프로 측정한 fps로 재샘플링하여 분석 (가변 프레임레이트 영상에 권장)')
+    parser.add_argument('--rois', type=str, default='forehead',
+                        help='사용할 얼굴 ROI (쉼표로 구분: forehead,left_cheek,right_cheek, 기본값: forehead)')
+    parser.add_argument('--detection-scale', type=float, default=1.0,
+                        help='얼굴 감지 해상도 축소 비율 (예: 0.5, 기본값: 1.0)')
+    parser.add_argument('--detect-interval', type=int, default=1,
+                        help='dlib 얼굴 감지 주기 (프레임 수, 0이면 추적을 놓칠 때만 감지)')
+    parser.add_argument('--update-interval', type=float, default=1.0,
+                        help='심박수/호흡률 계산 간격 (영상 시간 기준 초, 기본값: 1.0)')
+
+    args = parser.parse_args()
+
+    error = check_timestamp_options(args.use_timestamps, respiration_window=args.respiration_window)
+    if error is not None:
+        parser.error(error)
+
+    files = expand_inputs(args.inputs)
+    if not files:
+        print("❌ 오류: 처리할 영상 파일을 찾을 수 없습니다.")
+        return
+
+    detector_options = {
+        "buffer_size": args.buffer_size,
+        "respiration_window": args.respiration_window,
+        "use_timestamps": args.use_timestamps,
+        "roi_names": tuple(name.strip() for name in args.rois.split(',') if name.strip()),
+        "detection_scale": args.detection_scale
+    }
+    if args.detector == 'dlib':
+        detector_options["detect_interval"] = args.detect_interval if args.detect_interval > 0 else None
+
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    workers = args.workers or os.cpu_count() or 1
+
+    print("rPPG 녹화 영상 일괄 처리 시작")
+    print("=" * 50)
+    print(f"영상 {len(files)}개, 워커 {min(workers, len(files))}개, 백엔드: {args.detector}")
+    print("=" * 50)
+
+    start_time = time.time()
+    failed = 0
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(process_video, path, args.detector, detector_options, args.update_interval): path
+            for path in files
+        }
+
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                rows, stats = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"❌ {path}: {e}")
+                continue
+
+            output_path = output_dir / f"{Path(path).stem}_vitals.{args.format}"
+            write_rows(rows, output_path, args.format)
+            print(f"✅ {path}: {stats['frames']}프레임 ({stats['duration']:.0f}초 영상) → "
+                  f"{stats['elapsed']:.1f}초 처리 (실시간 대비 {stats['speed']:.1f}배), {output_path}")
+
+    print(f"\n완료: {len(files) - failed}/{len(files)}개 파일, 총 {time.time() - start_time:.1f}초")
+
+
+if __name__ == "__main__":
+    main()
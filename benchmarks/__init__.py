@@ -0,0 +1,9 @@
+"""
+rPPG 벤치마크 패키지
+카메라 없이 합성 얼굴 영상으로 RPPGDetector의 단계별 지연 시간, fps, 메모리, 심박수 오차를 측정합니다.
+
+사용 예:
+    python -m benchmarks.run_benchmark --detector mediapipe --resolution 1280x720
+"""
+
+from benchmarks.synthetic_video import SyntheticFaceVideo
@@ -0,0 +1,336 @@
+"""
+rPPG 합성 영상 벤치마크
+합성 얼굴 영상을 RPPGDetector에 끝까지 통과시키며 단계별 지연 시간, 처리 fps,
+메모리 사용량, 심박수 / 호흡률 절대 오차를 측정합니다. 카메라 / GPU 없이 CPU만으로 실행됩니다.
+
+사용 예:
+    python -m benchmarks.run_benchmark
+    python -m benchmarks.run_benchmark --detector dlib --resolution 1280x720 --noise 4 --motion 10
+    python -m benchmarks.run_benchmark --preset ci --json bench.json --max-hr-error 5 --min-fps 30
+"""
+
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from benchmarks.synthetic_video import SyntheticFaceVideo
+
+try:
+    import resource
+except ImportError:
+    # Windows에는 resource 모듈이 없음 (최대 RSS 보고 생략)
+    resource = None
+
+
+# CI용 기본 시나리오 (해상도 / 노이즈 / 움직임 조합)
+PRESETS = {
+    "ci": [
+        {"name": "vga-clean", "width": 640, "height": 480, "noise": 1.0, "motion": 0.0},
+        {"name": "hd-noisy", "width": 1280, "height": 720, "noise": 4.0, "motion": 0.0},
+        {"name": "vga-motion", "width": 640, "height": 480, "noise": 2.0, "motion": 8.0},
+    ],
+}
+
+
+def load_detector_class(backend):
+    """
+    백엔드에 맞는 RPPGDetector 클래스 로드
+
+    Args:
+        backend: 'mediapipe' 또는 'dlib'
+
+    Returns:
+        RPPGDetector 클래스
+    """
+    if backend == 'dlib':
+        from rppg import RPPGDetector
+    else:
+        from rppg_mediapipe import RPPGDetector
+    return RPPGDetector
+
+
+def summarize_times(samples):
+    """
+    지연 시간 샘플 요약 (밀리초)
+
+    Args:
+        samples: 초 단위 지연 시간 목록
+
+    Returns:
+        호출 수, 평균 / p50 / p95 / 최대 (ms) 딕셔너리
+    """
+    if not samples:
+        return {"count": 0, "mean_ms": None, "p50_ms": None, "p95_ms": None, "max_ms": None}
+
+    values = np.asarray(samples) * 1000.0
+    return {
+        "count": len(values),
+        "mean_ms": float(np.mean(values)),
+        "p50_ms": float(np.percentile(values, 50)),
+        "p95_ms": float(np.percentile(values, 95)),
+        "max_ms": float(np.max(values))
+    }
+
+
+def process_video(video, detector, update_interval, use_detection, stage_times=None):
+    """
+    합성 영상 전체를 감지기에 통과시킴
+
+    Args:
+        video: SyntheticFaceVideo 인스턴스
+        detector: RPPGDetector 인스턴스
+        update_interval: 심박수/호흡률 계산 간격 (영상 시간, 초)
+        use_detection: False이면 얼굴 감지를 건너뛰고 정답 ROI만 사용
+        stage_times: {단계 이름: 지연 시간 목록} (이 딕셔너리에 추가, None이면 기록 안 함)
+
+    Returns:
+        감지한 프레임 수, 실제 경로 처리 시간 합계 (초), 심박수 오차 목록, 호흡률 오차 목록
+    """
+    if stage_times is None:
+        stage_times = {"detect": [], "roi": [], "add_signal": [], "spectral": []}
+
+    hr_errors, rr_errors = [], []
+    detected_frames = 0
+    pipeline_time = 0.0
+    last_update_time = 0.0
+
+    for t, frame in video.frames():
+        frame_time = 0.0
+        signal_value = None
+
+        if use_detection:
+            start = time.perf_counter()
+            _, _, signal_value = detector.process_frame(frame, t)
+            elapsed = time.perf_counter() - start
+            stage_times["detect"].append(elapsed)
+            frame_time += elapsed
+            if signal_value is not None:
+                detected_frames += 1
+
+        start = time.perf_counter()
+        roi_value = detector.extract_roi_signal(frame, video.roi_at(t))
+        elapsed = time.perf_counter() - start
+        stage_times["roi"].append(elapsed)
+        if signal_value is None:
+            signal_value = roi_value
+            frame_time += elapsed
+
+        start = time.perf_counter()
+        detector.add_signal(signal_value, t, roi_values=detector.last_roi_values)
+        elapsed = time.perf_counter() - start
+        stage_times["add_signal"].append(elapsed)
+        frame_time += elapsed
+
+        if t - last_update_time >= update_interval:
+            start = time.perf_counter()
+            (heart_rate, _), (respiration_rate, _) = detector.calculate_vitals()
+            elapsed = time.perf_counter() - start
+            stage_times["spectral"].append(elapsed)
+            frame_time += elapsed
+            last_update_time = t
+
+            # 버퍼가 가득 찬 뒤의 추정값만 오차에 반영 (워밍업 제외)
+            if detector.signal_buffer.is_full():
+                if heart_rate is not None:
+                    hr_errors.append(abs(heart_rate - video.heart_rate))
+                if respiration_rate is not None:
+                    rr_errors.append(abs(respiration_rate - video.respiration_rate))
+
+        pipeline_time += frame_time
+
+    return detected_frames, pipeline_time, hr_errors, rr_errors
+
+
+def run_benchmark(video, backend='mediapipe', detector_options=None, update_interval=1.0,
+                  use_detection=True, measure_memory=True):
+    """
+    합성 영상 하나로 감지기 전체 경로 벤치마크
+
+    단계:
+        detect: process_frame (얼굴 감지 + 랜드마크 + ROI 추출, use_detection일 때)
+        roi: 정답 위치 ROI의 extract_roi_signal (항상 측정, 감지 실패 시 이 값을 신호로 사용)
+        add_signal: 버퍼 / 필터 갱신
+        spectral: calculate_vitals (update_interval마다)
+
+    합성 패치는 얼굴 감지기가 찾지 못할 수 있으므로 감지 실패 프레임은 정답 ROI로 대체하고,
+    감지율을 함께 보고합니다. 처리 fps는 실제 경로(detect 또는 roi + add_signal + spectral)
+    시간으로 계산하며 프레임 생성 시간은 제외합니다.
+
+    tracemalloc의 할당 추적은 모든 단계를 느리게 하므로 지연 시간 / fps / 오차는 추적 없이 측정하고,
+    최대 메모리는 새 감지기로 영상을 한 번 더 처리하는 별도 패스에서 측정합니다.
+
+    Args:
+        video: SyntheticFaceVideo 인스턴스
+        backend: 'mediapipe' 또는 'dlib'
+        detector_options: RPPGDetector 생성자 키워드 인수
+        update_interval: 심박수/호흡률 계산 간격 (영상 시간, 초)
+        use_detection: False이면 얼굴 감지 모델을 만들지 않고 ROI / 스펙트럼 단계만 측정
+                       (mediapipe / dlib 없이 실행 가능)
+        measure_memory: False이면 메모리 측정 패스 생략
+
+    Returns:
+        결과 딕셔너리
+    """
+    RPPGDetector = load_detector_class(backend)
+
+    def create_detector():
+        return RPPGDetector(fps=video.fps, face_models=use_detection, **(detector_options or {}))
+
+    # 시간 측정 패스 (tracemalloc 없음)
+    stage_times = {"detect": [], "roi": [], "add_signal": [], "spectral": []}
+    detected_frames, pipeline_time, hr_errors, rr_errors = process_video(
+        video, create_detector(), update_interval, use_detection, stage_times)
+
+    # 메모리 측정 패스
+    peak_memory = None
+    if measure_memory:
+        tracemalloc.start()
+        try:
+            process_video(video, create_detector(), update_interval, use_detection)
+            _, peak_memory = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    frames = video.frame_count
+    return {
+        "backend": backend,
+        "resolution": f"{video.width}x{video.height}",
+        "frames": frames,
+        "detection_rate": detected_frames / frames if use_detection and frames else None,
+        "fps": frames / pipeline_time if pipeline_time > 0 else None,
+        "stages": {name: summarize_times(samples) for name, samples in stage_times.items()},
+        "peak_traced_memory_mb": peak_memory / (1024 * 1024) if peak_memory is not None else None,
+        "hr_mae": float(np.mean(hr_errors)) if hr_errors else None,
+        "rr_mae": float(np.mean(rr_errors)) if rr_errors else None,
+        "true_heart_rate": video.heart_rate,
+        "true_respiration_rate": video.respiration_rate
+    }
+
+
+def print_result(name, result):
+    """벤치마크 결과 출력"""
+    def fmt(value, spec):
+        return format(value, spec) if value is not None else "-"
+
+    print(f"\n📊 {name} ({result['backend']}, {result['resolution']}, {result['frames']}프레임)")
+    for stage, summary in result["stages"].items():
+        if summary["count"] == 0:
+            continue
+        print(f"  {stage:<10} 평균 {fmt(summary['mean_ms'], '.3f')} ms | p50 {fmt(summary['p50_ms'], '.3f')} ms"
+              f" | p95 {fmt(summary['p95_ms'], '.3f')} ms | 최대 {fmt(summary['max_ms'], '.3f')} ms"
+              f" ({summary['count']}회)")
+    detection_rate = result["detection_rate"]
+    print(f"  처리 속도: {fmt(result['fps'], '.1f')} fps"
+          + (f" | 얼굴 감지율: {detection_rate * 100:.0f}%" if detection_rate is not None else ""))
+    print(f"  메모리 (tracemalloc 최대, 별도 패스): {fmt(result['peak_traced_memory_mb'], '.1f')} MB")
+    print(f"  심박수 오차: {fmt(result['hr_mae'], '.2f')} BPM (정답 {result['true_heart_rate']:.0f})"
+          f" | 호흡률 오차: {fmt(result['rr_mae'], '.2f')} RPM (정답 {result['true_respiration_rate']:.0f})")
+
+
+def parse_resolution(value):
+    """'1280x720' 형식의 해상도 문자열 파싱"""
+    width, height = value.lower().split('x')
+    return int(width), int(height)
+
+
+def main():
+    """
+    메인 함수
+    """
+    parser = argparse.ArgumentParser(description='rPPG 합성 영상 벤치마크')
+    parser.add_argument('--detector', choices=['mediapipe', 'dlib'], default='mediapipe',
+                        help='얼굴 감지 백엔드 (기본값: mediapipe)')
+    parser.add_argument('--preset', choices=sorted(PRESETS), default=None,
+                        help='미리 정의된 시나리오 묶음 실행 (해상도 / 노이즈 / 움직임 옵션 무시)')
+    parser.add_argument('--resolution', type=parse_resolution, default=(640, 480),
+                        help='영상 해상도 (기본값: 640x480)')
+    parser.add_argument('--fps', type=int, default=30,
+                        help='영상 fps (기본값: 30)')
+    parser.add_argument('--duration', type=float, default=20.0,
+                        help='영상 길이 (초, 기본값: 20)')
+    parser.add_argument('--heart-rate', type=float, default=72.0,
+                        help='정답 심박수 (BPM, 기본값: 72)')
+    parser.add_argument('--respiration-rate', type=float, default=15.0,
+                        help='정답 호흡률 (RPM, 기본값: 15)')
+    parser.add_argument('--noise', type=float, default=2.0,
+                        help='픽셀 노이즈 표준편차 (기본값: 2.0)')
+    parser.add_argument('--motion', type=float, default=0.0,
+                        help='얼굴 흔들림 진폭 (픽셀, 기본값: 0)')
+    parser.add_argument('--no-detection', action='store_true',
+                        help='얼굴 감지 생략 (정답 ROI로 ROI / 스펙트럼 단계만 측정, mediapipe / dlib 불필요)')
+    parser.add_argument('--no-memory', action='store_true',
+                        help='tracemalloc 메모리 측정 패스 생략 (시간 측정 패스만 실행)')
+    parser.add_argument('--buffer-size', type=int, default=300,
+                        help='신호 버퍼 크기 (프레임 수, 기본값: 300)')
+    parser.add_argument('--streaming', action='store_true',
+                        help='스트리밍 필터 모드로 측정')
+    parser.add_argument('--sliding-dft', action='store_true',
+                        help='Sliding DFT 모드로 측정')
+    parser.add_argument('--update-interval', type=float, default=1.0,
+                        help='심박수/호흡률 계산 간격 (영상 시간 기준 초, 기본값: 1.0)')
+    parser.add_argument('--json', type=str, default=None,
+                        help='결과를 JSON 파일로 저장 (CI 비교용)')
+    parser.add_argument('--max-hr-error', type=float, default=None,
+                        help='심박수 평균 절대 오차가 이 값(BPM)을 넘으면 실패 종료')
+    parser.add_argument('--min-fps', type=float, default=None,
+                        help='처리 fps가 이 값보다 낮으면 실패 종료')
+
+    args = parser.parse_args()
+
+    if args.preset:
+        scenarios = PRESETS[args.preset]
+    else:
+        width, height = args.resolution
+        scenarios = [{"name": "custom", "width": width, "height": height,
+                      "noise": args.noise, "motion": args.motion}]
+
+    detector_options = {
+        "buffer_size": args.buffer_size,
+        "streaming": args.streaming,
+        "sliding_dft": args.sliding_dft
+    }
+
+    results = {}
+    failures = []
+    for scenario in scenarios:
+        video = SyntheticFaceVideo(
+            width=scenario["width"], height=scenario["height"], fps=args.fps,
+            duration=args.duration, heart_rate=args.heart_rate,
+            respiration_rate=args.respiration_rate,
+            noise=scenario["noise"], motion=scenario["motion"]
+        )
+        result = run_benchmark(video, args.detector, detector_options, args.update_interval,
+                               use_detection=not args.no_detection,
+                               measure_memory=not args.no_memory)
+        results[scenario["name"]] = result
+        print_result(scenario["name"], result)
+
+        if args.max_hr_error is not None and (result["hr_mae"] is None or result["hr_mae"] > args.max_hr_error):
+            failures.append(f"{scenario['name']}: 심박수 오차 {result['hr_mae']} > {args.max_hr_error} BPM")
+        if args.min_fps is not None and (result["fps"] is None or result["fps"] < args.min_fps):
+            failures.append(f"{scenario['name']}: 처리 속도 {result['fps']} < {args.min_fps} fps")
+
+    if resource is not None:
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux는 KB, macOS는 바이트 단위
+        max_rss_mb = max_rss / (1024 * 1024) if sys.platform == 'darwin' else max_rss / 1024
+        print(f"\n프로세스 최대 RSS: {max_rss_mb:.1f} MB")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"결과를 저장했습니다: {args.json}")
+
+    if failures:
+        print("\n❌ 벤치마크 기준 미달:")
+        for failure in failures:
+            print(f"  - {failure}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+합성 얼굴 영상 생성기
+피부색 얼굴 패치의 색상을 알려진 심박 / 호흡 주파수로 변조하여 정답 심박수가 있는 영상을 만듭니다.
+"""
+
+import cv2
+import numpy as np
+
+
+class SyntheticFaceVideo:
+    # 피부색 (BGR)과 채널별 맥파 변조 비율 (혈중 헤모글로빈 흡수로 녹색 채널 변화가 가장 큼)
+    SKIN_COLOR = (110.0, 140.0, 190.0)
+    PULSE_WEIGHTS = (0.3, 1.0, 0.5)
+
+    def __init__(self, width=640, height=480, fps=30, duration=30.0, heart_rate=72.0,
+                 respiration_rate=15.0, pulse_amplitude=1.0, respiration_amplitude=1.5,
+                 noise=2.0, motion=0.0, seed=0):
+        """
+        합성 얼굴 영상 설정
+
+        Args:
+            width: 영상 너비
+            height: 영상 높이
+            fps: 초당 프레임 수
+            duration: 영상 길이 (초)
+            heart_rate: 정답 심박수 (BPM)
+            respiration_rate: 정답 호흡률 (RPM)
+            pulse_amplitude: 녹색 채널 맥파 진폭 (픽셀 값)
+            respiration_amplitude: 호흡에 따른 밝기 변화 진폭 (픽셀 값)
+            noise: 프레임별 가우시안 픽셀 노이즈 표준편차
+            motion: 얼굴의 좌우/상하 흔들림 진폭 (픽셀)
+            seed: 노이즈 / 움직임 난수 시드
+        """
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.duration = duration
+        self.heart_rate = heart_rate
+        self.respiration_rate = respiration_rate
+        self.pulse_amplitude = pulse_amplitude
+        self.respiration_amplitude = respiration_amplitude
+        self.noise = noise
+        self.motion = motion
+        self.seed = seed
+
+        # 얼굴 타원 (영상 중앙, 높이의 60%)
+        self.face_center = (width // 2, height // 2)
+        self.face_axes = (int(height * 0.22), int(height * 0.3))
+
+        # 배경 + 얼굴 마스크는 한 번만 준비
+        self._background = np.full((height, width, 3), 60.0, dtype=np.float32)
+        self._face_mask = np.zeros((height, width), dtype=np.float32)
+        cv2.ellipse(self._face_mask, self.face_center, self.face_axes, 0, 0, 360, 1.0, -1)
+
+    @property
+    def frame_count(self):
+        """전체 프레임 수"""
+        return int(self.duration * self.fps)
+
+    def offset_at(self, t):
+        """
+        시각 t의 얼굴 이동량 (서로 다른 주기의 좌우/상하 흔들림)
+
+        Args:
+            t: 시각 (초)
+
+        Returns:
+            (dx, dy) 픽셀
+        """
+        if self.motion == 0:
+            return 0, 0
+        dx = self.motion * np.sin(2 * np.pi * 0.13 * t + self.seed)
+        dy = self.motion * np.sin(2 * np.pi * 0.07 * t + 2 * self.seed)
+        return int(round(dx)), int(round(dy))
+
+    def roi_at(self, t):
+        """
+        시각 t의 이마 ROI 다각형 (정답 위치, 얼굴 감지 없이 ROI 단계만 측정할 때 사용)
+
+        Args:
+            t: 시각 (초)
+
+        Returns:
+            ROI 포인트 배열 (4 x 2, int32)
+        """
+        dx, dy = self.offset_at(t)
+        cx, cy = self.face_center[0] + dx, self.face_center[1] + dy
+        ax, ay = self.face_axes
+        return np.array([
+            [cx - ax // 2, cy - 3 * ay // 4],
+            [cx + ax // 2, cy - 3 * ay // 4],
+            [cx + ax // 2, cy - ay // 3],
+            [cx - ax // 2, cy - ay // 3]
+        ], dtype=np.int32)
+
+    def render(self, t, rng=None):
+        """
+        시각 t의 프레임 생성
+
+        Args:
+            t: 시각 (초)
+            rng: 노이즈용 np.random.Generator (None이면 노이즈 없음)
+
+        Returns:
+            BGR 프레임 (uint8)
+        """
+        pulse = self.pulse_amplitude * np.sin(2 * np.pi * self.heart_rate / 60.0 * t)
+        breath = self.respiration_amplitude * np.sin(2 * np.pi * self.respiration_rate / 60.0 * t)
+        color = np.array([c + w * pulse + breath
+                          for c, w in zip(self.SKIN_COLOR, self.PULSE_WEIGHTS)], dtype=np.float32)
+
+        mask = self._face_mask
+        dx, dy = self.offset_at(t)
+        if dx or dy:
+            mask = cv2.warpAffine(mask, np.float32([[1, 0, dx], [0, 1, dy]]), (self.width, self.height))
+
+        frame = self._background + mask[..., None] * (color - self._background[0, 0])
+        if rng is not None and self.noise > 0:
+            frame += rng.normal(0.0, self.noise, size=frame.shape).astype(np.float32)
+
+        return np.clip(frame, 0, 255).astype(np.uint8)
+
+    def frames(self):
+        """
+        (타임스탬프, 프레임) 생성기
+
+        Yields:
+            (시각 (초), BGR 프레임)
+        """
+        rng = np.random.default_rng(self.seed)
+        for i in range(self.frame_count):
+            t = i / self.fps
+            yield t, self.render(t, rng)
+
+    def write(self, path, fourcc='MJPG'):
+        """
+        영상 파일로 저장 (batch_process.py 등 파일 입력 벤치마크용)
+
+        Args:
+            path: 출력 파일 경로
+            fourcc: 코덱 FourCC 문자열
+        """
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc), self.fps, (self.width, self.height))
+        try:
+            for _, frame in self.frames():
+                writer.write(frame)
+        finally:
+            writer.release()
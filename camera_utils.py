@@ -1,49 +1,286 @@
 """
 카메라 유틸리티 함수
 사용 가능한 카메라를 찾고 선택하는 기능을 제공합니다.
+
+Linux에서는 /dev/video* 장치만 후보로 삼고, 후보들을 동시에 열어 보며(모든 장치가 공유하는 전체 시간 제한),
+플랫폼에 맞는 백엔드를 사용합니다. 검색 결과는 작은 JSON 파일에 TTL 동안 캐시되어
+컨테이너를 다시 시작해도 카메라 검색에 시간이 걸리지 않습니다.
 """
 
 import cv2
+import glob
+import json
+import re
+import sys
+import threading
+import time
 import warnings
 import os
+from pathlib import Path
+
 
+# 검색 결과 캐시 (RPPG_CAMERA_CACHE 환경 변수로 경로 변경)
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "rppg", "cameras.json")
+DEFAULT_CACHE_TTL = 600.0
 
-def find_available_cameras(max_index=10):
+
+def get_camera_backend():
     """
-    사용 가능한 모든 카메라를 찾습니다.
-    
+    플랫폼에 맞는 OpenCV 캡처 백엔드
+
+    Returns:
+        cv2.CAP_* 상수 (Windows: DirectShow, macOS: AVFoundation, Linux: V4L2)
+    """
+    if sys.platform == 'win32':
+        return cv2.CAP_DSHOW  # obsensor 에러 방지
+    if sys.platform == 'darwin':
+        return cv2.CAP_AVFOUNDATION
+    if sys.platform.startswith('linux'):
+        return cv2.CAP_V4L2
+    return cv2.CAP_ANY
+
+
+def open_camera(index):
+    """
+    플랫폼에 맞는 백엔드로 카메라 열기
+
     Args:
-        max_index: 검색할 최대 카메라 인덱스
-        
+        index: 카메라 인덱스
+
     Returns:
-        사용 가능한 카메라 인덱스 리스트
+        cv2.VideoCapture 객체
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return cv2.VideoCapture(index, get_camera_backend())
+
+
+def list_candidate_devices(max_index=10):
+    """
+    검색할 카메라 인덱스 후보
+
+    Linux에서는 존재하는 /dev/videoN 중 영상 캡처 노드(sysfs index가 0)만 반환하고,
+    다른 플랫폼에서는 0..max_index를 반환합니다.
+
+    Args:
+        max_index: 장치 목록을 얻을 수 없는 플랫폼에서 검색할 최대 인덱스
+
+    Returns:
+        카메라 인덱스 리스트
+    """
+    if not sys.platform.startswith('linux'):
+        return list(range(max_index + 1))
+
+    candidates = []
+    for path in glob.glob('/dev/video*'):
+        match = re.fullmatch(r'/dev/video(\d+)', path)
+        if match is None:
+            continue
+        index = int(match.group(1))
+
+        # UVC 카메라는 메타데이터 노드를 함께 만드는데, 캡처 노드만 index 0
+        sysfs_index = Path(f'/sys/class/video4linux/video{index}/index')
+        try:
+            if sysfs_index.exists() and sysfs_index.read_text().strip() != '0':
+                continue
+        except OSError:
+            pass
+        candidates.append(index)
+
+    return sorted(candidates)
+
+
+def probe_camera(index, backend=None):
+    """
+    카메라 하나를 열어 프레임을 읽어 보고 정보 반환
+
+    Args:
+        index: 카메라 인덱스
+        backend: cv2.CAP_* 백엔드 (None이면 플랫폼 기본값)
+
+    Returns:
+        {index, device, width, height, fps, backend} 딕셔너리, 사용할 수 없으면 None
+    """
+    if backend is None:
+        backend = get_camera_backend()
+
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            cap = cv2.VideoCapture(index, backend)
+    except Exception:
+        return None
+
+    try:
+        if cap is None or not cap.isOpened():
+            return None
+        ret, _ = cap.read()
+        if not ret:
+            return None
+        return {
+            "index": index,
+            "device": f"/dev/video{index}" if sys.platform.startswith('linux') else str(index),
+            "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            "fps": float(cap.get(cv2.CAP_PROP_FPS)),
+            "backend": cap.getBackendName()
+        }
+    except Exception:
+        return None
+    finally:
+        if cap is not None:
+            cap.release()
+
+
+def probe_cameras(indices, timeout=3.0, backend=None):
+    """
+    여러 카메라를 동시에 확인 (모든 장치가 하나의 전체 시간 제한을 공유)
+
+    모든 장치를 한꺼번에 확인하므로 전체 소요 시간은 장치 수와 관계없이 timeout 이하입니다.
+    그때까지 끝나지 않은 장치는 아직 VideoCapture를 잡고 있을 수 있으므로 결과에 넣지 않고
+    시간 초과 목록으로 따로 돌려줍니다. 확인 스레드는 데몬 스레드라 프로그램 종료를 막지 않습니다.
+
+    Args:
+        indices: 카메라 인덱스 목록
+        timeout: 전체 확인 시간 제한 (초)
+        backend: cv2.CAP_* 백엔드 (None이면 플랫폼 기본값)
+
+    Returns:
+        (사용 가능한 카메라 정보 리스트 (인덱스 순), 시간 제한 안에 확인이 끝나지 않은 인덱스 리스트)
+    """
+    results = {}
+    finished = set()
+    lock = threading.Lock()
+
+    def worker(index):
+        # probe_camera는 장치를 닫은 뒤 반환하므로 finished에 든 인덱스는 바로 다시 열 수 있음
+        info = probe_camera(index, backend)
+        with lock:
+            if info is not None:
+                results[index] = info
+            finished.add(index)
+
+    threads = [threading.Thread(target=worker, args=(index,), name=f"camera-probe-{index}", daemon=True)
+               for index in indices]
+    for thread in threads:
+        thread.start()
+
+    deadline = time.time() + timeout
+    for thread in threads:
+        thread.join(max(0.0, deadline - time.time()))
+
+    # 늦게 끝나는 스레드가 쓰는 중에 읽지 않도록 잠금 안에서 한 번에 복사
+    with lock:
+        cameras = [results[index] for index in sorted(results)]
+        timed_out = [index for index in indices if index not in finished]
+    return cameras, timed_out
+
+
+def _load_cache(cache_path, ttl, candidates):
+    """
+    유효한 캐시가 있으면 카메라 정보 반환
+
+    Args:
+        cache_path: 캐시 파일 경로
+        ttl: 캐시 유효 시간 (초)
+        candidates: 현재 후보 인덱스 목록 (바뀌었으면 캐시 무효)
+
+    Returns:
+        카메라 정보 리스트, 캐시가 없거나 만료되었으면 None
+    """
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if (cache.get("platform") != sys.platform or cache.get("candidates") != candidates
+            or time.time() - cache.get("created", 0) > ttl):
+        return None
+    return cache.get("cameras")
+
+
+def _save_cache(cache_path, candidates, cameras):
+    """
+    검색 결과를 캐시 파일에 저장 (실패해도 무시)
+
+    Args:
+        cache_path: 캐시 파일 경로
+        candidates: 후보 인덱스 목록
+        cameras: 카메라 정보 리스트
+    """
+    cache = {
+        "created": time.time(),
+        "platform": sys.platform,
+        "candidates": candidates,
+        "cameras": cameras
+    }
+    try:
+        os.makedirs(os.path.dirname(cache_path) or '.', exist_ok=True)
+        tmp_path = f"{cache_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass
+
+
+def discover_cameras(max_index=10, timeout=3.0, use_cache=True, refresh=False,
+                     cache_path=None, ttl=None):
+    """
+    사용 가능한 카메라 검색 (캐시 → 동시 확인)
+
+    Args:
+        max_index: 장치 목록을 얻을 수 없는 플랫폼에서 검색할 최대 인덱스
+        timeout: 확인 시간 제한 (초, 넘긴 장치가 있으면 결과를 캐시하지 않음)
+        use_cache: 캐시 파일 사용 여부
+        refresh: True이면 캐시를 무시하고 다시 검색 (결과는 캐시에 저장)
+        cache_path: 캐시 파일 경로 (None이면 RPPG_CAMERA_CACHE 또는 ~/.cache/rppg/cameras.json)
+        ttl: 캐시 유효 시간 (초, None이면 RPPG_CAMERA_CACHE_TTL 또는 600)
+
+    Returns:
+        {index, device, width, height, fps, backend} 딕셔너리 리스트
     """
     # OpenCV 경고 메시지 억제 (obsensor 등 불필요한 에러 메시지)
     # 환경 변수로 OpenCV 로그 레벨 설정
     os.environ['OPENCV_LOG_LEVEL'] = 'ERROR'
+
+    if cache_path is None:
+        cache_path = os.getenv("RPPG_CAMERA_CACHE", DEFAULT_CACHE_PATH)
+    if ttl is None:
+        ttl = float(os.getenv("RPPG_CAMERA_CACHE_TTL", DEFAULT_CACHE_TTL))
+
+    candidates = list_candidate_devices(max_index)
+    if not candidates:
+        return []
+
+    if use_cache and not refresh:
+        cameras = _load_cache(cache_path, ttl, candidates)
+        if cameras is not None:
+            return cameras
+
+    cameras, timed_out = probe_cameras(candidates, timeout)
+    if timed_out:
+        # 느린 장치를 캐시 유효 시간 동안 '없음'으로 기록하지 않도록 저장하지 않음
+        print(f"⚠️  {timeout:.1f}초 안에 응답하지 않은 카메라: {', '.join(str(index) for index in timed_out)} "
+              f"(결과를 캐시하지 않습니다)")
+    elif use_cache:
+        _save_cache(cache_path, candidates, cameras)
+    return cameras
+
+
+def find_available_cameras(max_index=10, use_cache=True):
+    """
+    사용 가능한 모든 카메라를 찾습니다.
     
-    available = []
-    for i in range(max_index + 1):
-        try:
-            # 경고 메시지 억제
-            with warnings.catch_warnings():
-                warnings.simplefilter("ignore")
-                cap = cv2.VideoCapture(i, cv2.CAP_DSHOW)  # Windows에서는 DirectShow 백엔드 사용
-        except:
-            # VideoCapture 생성 실패 시 다음 인덱스로
-            continue
-            
-        if cap is not None and cap.isOpened():
-            try:
-                ret, _ = cap.read()
-                if ret:
-                    available.append(i)
-            except:
-                # 프레임 읽기 실패 시 무시
-                pass
-        if cap is not None:
-            cap.release()
-    return available
+    Args:
+        max_index: 검색할 최대 카메라 인덱스 (Linux에서는 /dev/video* 목록 사용)
+        use_cache: 캐시된 검색 결과 사용 여부
+        
+    Returns:
+        사용 가능한 카메라 인덱스 리스트
+    """
+    return [camera["index"] for camera in discover_cameras(max_index, use_cache=use_cache)]
 
 
 def find_external_webcam(preferred_index=None):
@@ -87,7 +324,8 @@ def select_camera_interactive():
     Returns:
         선택된 카메라 인덱스, 사용 가능한 카메라 목록
     """
-    available = find_available_cameras()
+    cameras = discover_cameras()
+    available = [camera["index"] for camera in cameras]
     
     if len(available) == 0:
         print("❌ 사용 가능한 카메라를 찾을 수 없습니다.")
@@ -97,21 +335,10 @@ def select_camera_interactive():
         print(f"✅ 카메라 인덱스 {available[0]}를 사용합니다.")
         return available[0], available
     
+    # 검색할 때 얻은 해상도 정보 사용 (카메라를 다시 열지 않음)
     print("\n사용 가능한 카메라:")
-    for i, idx in enumerate(available):
-        try:
-            with warnings.catch_warnings():
-                warnings.simplefilter("ignore")
-                cap = cv2.VideoCapture(idx, cv2.CAP_DSHOW)
-            if cap is not None and cap.isOpened():
-                width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-                height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-                cap.release()
-                print(f"  [{i+1}] 카메라 인덱스 {idx} ({width}x{height})")
-            else:
-                print(f"  [{i+1}] 카메라 인덱스 {idx} (정보 확인 불가)")
-        except:
-            print(f"  [{i+1}] 카메라 인덱스 {idx} (정보 확인 불가)")
+    for i, camera in enumerate(cameras):
+        print(f"  [{i+1}] 카메라 인덱스 {camera['index']} ({camera['width']}x{camera['height']}, {camera['device']})")
     
     print(f"  [0] 자동 선택 (인덱스 {max(available)} - 외부 웹캠 추정)")
     
@@ -0,0 +1,250 @@
+"""
+다중 얼굴 추적 유틸리티
+프레임마다 감지된 얼굴을 IoU / 중심점 거리로 이전 트랙과 연결하여 고정된 트랙 ID를 부여하고,
+트랙별 신호 버퍼와 심박수 / 호흡률 추정을 관리합니다.
+"""
+
+import time
+
+import numpy as np
+
+from signal_utils import RingBuffer, get_spectral_plan, measure_analysis_rate, resample_uniform
+
+
+def box_iou(boxes_a, boxes_b):
+    """
+    두 박스 집합 사이의 IoU 행렬 계산
+
+    Args:
+        boxes_a: (N x 4) 배열, (x0, y0, x1, y1)
+        boxes_b: (M x 4) 배열, (x0, y0, x1, y1)
+
+    Returns:
+        (N x M) IoU 행렬
+    """
+    a = np.asarray(boxes_a, dtype=np.float64).reshape(-1, 1, 4)
+    b = np.asarray(boxes_b, dtype=np.float64).reshape(1, -1, 4)
+
+    inter_w = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    inter_h = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    inter = inter_w * inter_h
+
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    return inter / np.maximum(area_a + area_b - inter, 1e-6)
+
+
+class FaceTrack:
+    def __init__(self, track_id, box, buffer_size, timestamp):
+        """
+        얼굴 트랙 하나의 상태 초기화
+
+        Args:
+            track_id: 트랙 ID
+            box: 얼굴 박스 (x0, y0, x1, y1)
+            buffer_size: 트랙 신호 버퍼 크기 (프레임 수)
+            timestamp: 처음 감지된 시각 (초)
+        """
+        self.track_id = track_id
+        self.box = np.asarray(box, dtype=np.float64)
+        self.signal_buffer = RingBuffer(buffer_size)
+        self.timestamp_buffer = RingBuffer(buffer_size)
+        self.first_seen = timestamp
+        self.last_seen = timestamp
+
+
+class FaceTracker:
+    def __init__(self, buffer_size=300, max_tracks=4, iou_threshold=0.3,
+                 max_centroid_distance=0.5, track_timeout=2.0):
+        """
+        다중 얼굴 트래커 초기화
+
+        Args:
+            buffer_size: 트랙별 신호 버퍼 크기 (프레임 수)
+            max_tracks: 동시에 유지할 최대 트랙 수
+            iou_threshold: 같은 얼굴로 볼 최소 IoU
+            max_centroid_distance: IoU가 부족할 때 같은 얼굴로 볼 최대 중심점 거리
+                                   (이전 박스 대각선 길이 대비 비율, 빠른 움직임 대응)
+            track_timeout: 이 시간(초) 동안 감지되지 않은 트랙은 제거 (메모리 상한)
+        """
+        self.buffer_size = buffer_size
+        self.max_tracks = max_tracks
+        self.iou_threshold = iou_threshold
+        self.max_centroid_distance = max_centroid_distance
+        self.track_timeout = track_timeout
+
+        self.tracks = {}
+        self.next_track_id = 1
+        self.evicted_tracks = 0
+
+    def __len__(self):
+        return len(self.tracks)
+
+    def evict(self, timestamp):
+        """
+        track_timeout 이상 감지되지 않은 트랙 제거
+
+        Args:
+            timestamp: 현재 시각 (초)
+        """
+        for track_id in [track_id for track_id, track in self.tracks.items()
+                         if timestamp - track.last_seen > self.track_timeout]:
+            del self.tracks[track_id]
+            self.evicted_tracks += 1
+
+    def update(self, boxes, timestamp=None):
+        """
+        현재 프레임의 얼굴 박스를 기존 트랙과 연결 (IoU 우선, 부족하면 중심점 거리)
+
+        Args:
+            boxes: 얼굴 박스 목록 [(x0, y0, x1, y1), ...]
+            timestamp: 현재 시각 (초, None이면 현재 시간)
+
+        Returns:
+            박스 순서대로의 트랙 ID 목록 (트랙 수 상한을 넘은 새 얼굴은 None)
+        """
+        if timestamp is None:
+            timestamp = time.time()
+
+        self.evict(timestamp)
+
+        track_ids = [None] * len(boxes)
+        if len(boxes) == 0:
+            return track_ids
+
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        existing = list(self.tracks.values())
+
+        if existing:
+            track_boxes = np.array([track.box for track in existing])
+            iou = box_iou(track_boxes, boxes)
+
+            # 중심점 거리 (이전 박스 대각선 대비)
+            track_centers = (track_boxes[:, :2] + track_boxes[:, 2:]) / 2
+            box_centers = (boxes[:, :2] + boxes[:, 2:]) / 2
+            diagonals = np.hypot(track_boxes[:, 2] - track_boxes[:, 0], track_boxes[:, 3] - track_boxes[:, 1])
+            distance = (np.linalg.norm(track_centers[:, None] - box_centers[None], axis=2)
+                        / np.maximum(diagonals[:, None], 1e-6))
+
+            # IoU로 연결 가능한 쌍을 먼저, 그다음 중심점 거리로 연결 가능한 쌍을 탐욕적으로 연결
+            score = np.where(iou >= self.iou_threshold, 1.0 + iou,
+                             np.where(distance <= self.max_centroid_distance, 1.0 - distance, 0.0))
+
+            used_tracks, used_boxes = set(), set()
+            for flat_index in np.argsort(score, axis=None)[::-1]:
+                track_index, box_index = np.unravel_index(flat_index, score.shape)
+                if score[track_index, box_index] <= 0:
+                    break
+                if track_index in used_tracks or box_index in used_boxes:
+                    continue
+                used_tracks.add(track_index)
+                used_boxes.add(box_index)
+
+                track = existing[track_index]
+                track.box = boxes[box_index]
+                track.last_seen = timestamp
+                track_ids[box_index] = track.track_id
+
+        # 연결되지 않은 얼굴은 새 트랙 (트랙 수 상한까지)
+        for box_index, box in enumerate(boxes):
+            if track_ids[box_index] is None and len(self.tracks) < self.max_tracks:
+                track = FaceTrack(self.next_track_id, box, self.buffer_size, timestamp)
+                self.tracks[track.track_id] = track
+                track_ids[box_index] = track.track_id
+                self.next_track_id += 1
+
+        return track_ids
+
+    def add_samples(self, values, timestamp=None):
+        """
+        트랙별 신호 값 추가
+
+        Args:
+            values: {트랙 ID: 신호 값} 딕셔너리
+            timestamp: 프레임 캡처 시각 (초, None이면 현재 시간)
+        """
+        if timestamp is None:
+            timestamp = time.time()
+
+        for track_id, value in values.items():
+            track = self.tracks.get(track_id)
+            if track is not None and value is not None:
+                track.signal_buffer.append(value)
+                track.timestamp_buffer.append(timestamp)
+
+    def get_primary_track_id(self, track_ids):
+        """
+        주 트랙 선택 (가장 오래 추적된 트랙, 같으면 ID가 작은 트랙. 기존 단일 출력용)
+
+        Args:
+            track_ids: 후보 트랙 ID 목록
+
+        Returns:
+            주 트랙 ID, 후보가 없으면 None
+        """
+        candidates = [self.tracks[track_id] for track_id in track_ids
+                      if track_id is not None and track_id in self.tracks]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda track: (track.first_seen, track.track_id)).track_id
+
+    def calculate_vitals(self, fps, min_bpm=40, max_bpm=200, min_rpm=8, max_rpm=30, use_timestamps=False):
+        """
+        모든 트랙의 심박수와 호흡률을 한 번에 계산
+
+        (샘플링 주파수, 버퍼 길이)가 같은 트랙들을 (트랙 수 x 윈도우) 배열로 쌓아 한 번의 디트렌딩,
+        한 번의 실수 FFT, 한 번의 벡터화된 피크 / 신뢰도 계산으로 처리합니다. 버퍼가 가득 찬
+        정상 상태에서는 모든 트랙이 하나의 배치로 처리됩니다.
+
+        Args:
+            fps: 샘플링 주파수 (Hz)
+            min_bpm: 최소 심박수
+            max_bpm: 최대 심박수
+            min_rpm: 최소 호흡률 (분당 호흡 수)
+            max_rpm: 최대 호흡률 (분당 호흡 수)
+            use_timestamps: True이면 트랙별 타임스탬프로 측정한 fps의 균일 격자로 재샘플링하여 분석
+
+        Returns:
+            {트랙 ID: ((심박수, 신뢰도), (호흡률, 신뢰도))} 딕셔너리
+        """
+        results = {}
+        groups = {}
+        for track_id, track in self.tracks.items():
+            n = len(track.signal_buffer)
+            if n < 60:  # 최소 2초 데이터 필요
+                results[track_id] = ((None, 0.0), (None, 0.0))
+                continue
+
+            signal_array, track_fps = track.signal_buffer.view(), fps
+            if use_timestamps:
+                measured_fps = measure_analysis_rate(track.timestamp_buffer.view())
+                if measured_fps is not None:
+                    track_fps = measured_fps
+                    signal_array = resample_uniform(track.timestamp_buffer.view(), signal_array, track_fps)
+            # 호흡률 최소 데이터(6초) 기준은 단일 얼굴 분석과 같이 원본 샘플 수로 판단
+            key = (track_fps, len(signal_array), n >= 180)
+            groups.setdefault(key, []).append((track, signal_array))
+
+        for (fps, window_size, has_respiration), members in groups.items():
+            tracks = [track for track, _ in members]
+            stacked = np.stack([signal_array for _, signal_array in members])
+            stacked = stacked - stacked.mean(axis=1, keepdims=True)
+
+            hr_plan = get_spectral_plan(fps, window_size, min_bpm / 60.0, max_bpm / 60.0, 0.7, 4.0)
+            spectra = hr_plan.spectrum(stacked)
+            heart_freqs, heart_confidences = hr_plan.estimate_batch(spectra, 1.0, 5.0, apply_filter_gain=True)
+
+            if has_respiration:
+                rr_plan = get_spectral_plan(fps, window_size, min_rpm / 60.0, max_rpm / 60.0, 0.1, 0.5)
+                resp_freqs, resp_confidences = rr_plan.estimate_batch(spectra, 0.8, 4.0, apply_filter_gain=True)
+            else:
+                resp_freqs, resp_confidences = np.full(len(tracks), np.nan), np.zeros(len(tracks))
+
+            for i, track in enumerate(tracks):
+                heart_result = ((heart_freqs[i] * 60, heart_confidences[i])
+                                if not np.isnan(heart_freqs[i]) else (None, 0.0))
+                respiration_result = ((resp_freqs[i] * 60, resp_confidences[i])
+                                      if not np.isnan(resp_freqs[i]) else (None, 0.0))
+                results[track.track_id] = (heart_result, respiration_result)
+
+        return results
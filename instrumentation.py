@@ -0,0 +1,199 @@
+"""
+처리 단계별 지연 시간 계측
+단조 시계(time.perf_counter)로 단계별 실행 시간을 재고 고정 버킷 히스토그램에 누적하여
+p50 / p95 / p99를 계산합니다. 샘플을 저장하지 않으므로 메모리가 일정하고, 운영 환경에서 켜 두어도 부담이 적습니다.
+"""
+
+import bisect
+import functools
+import threading
+import time
+
+
+# 기본 버킷 상한 (초): 10µs부터 약 1.26배 간격으로 약 10초까지 (60개)
+DEFAULT_BUCKETS = tuple(1e-5 * (10 ** (i / 10)) for i in range(61))
+
+
+class LatencyHistogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        """
+        고정 버킷 지연 시간 히스토그램 초기화
+
+        Args:
+            buckets: 오름차순 버킷 상한 목록 (초). 마지막 상한을 넘는 값은 초과 버킷에 집계
+        """
+        self.buckets = tuple(buckets)
+        self.reset()
+
+    def reset(self):
+        """누적값 초기화"""
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        """
+        지연 시간 하나 기록
+
+        Args:
+            seconds: 지연 시간 (초)
+        """
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q):
+        """
+        백분위수 추정 (해당 버킷의 상한, 관측 최대값을 넘지 않음)
+
+        Args:
+            q: 백분위 (0-100)
+
+        Returns:
+            지연 시간 (초), 기록이 없으면 None
+        """
+        if self.count == 0:
+            return None
+
+        target = q / 100.0 * self.count
+        cumulative = 0
+        for index, count in enumerate(list(self.counts)):
+            cumulative += count
+            if count and cumulative >= target:
+                upper = self.buckets[index] if index < len(self.buckets) else self.max
+                return min(upper, self.max)
+        return self.max
+
+    def snapshot(self):
+        """
+        현재 통계 반환
+
+        Returns:
+            호출 수, 평균 / p50 / p95 / p99 / 최대 (ms) 딕셔너리
+        """
+        def ms(value):
+            return value * 1000.0 if value is not None else None
+
+        return {
+            "count": self.count,
+            "mean_ms": ms(self.total / self.count) if self.count else None,
+            "p50_ms": ms(self.percentile(50)),
+            "p95_ms": ms(self.percentile(95)),
+            "p99_ms": ms(self.percentile(99)),
+            "max_ms": ms(self.max) if self.count else None
+        }
+
+
+class StageTimer:
+    def __init__(self, enabled=True, buckets=DEFAULT_BUCKETS):
+        """
+        단계별 지연 시간 계측기 초기화
+
+        사용법:
+            start = timer.now()
+            ...  # 계측할 단계
+            timer.record('detect', start)
+
+        비활성화 상태에서는 now()가 0을 반환하고 record()는 바로 반환합니다.
+
+        Args:
+            enabled: 계측 활성화 여부
+            buckets: 히스토그램 버킷 상한 목록 (초)
+        """
+        self.enabled = enabled
+        self.buckets = buckets
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def now(self):
+        """단조 시계 현재값 (비활성화 시 0)"""
+        return time.perf_counter() if self.enabled else 0.0
+
+    def record(self, stage, start):
+        """
+        now()로 받은 시작 시각부터 지금까지의 시간을 단계에 기록
+
+        Args:
+            stage: 단계 이름
+            start: now()의 반환값
+        """
+        if not self.enabled:
+            return
+
+        elapsed = time.perf_counter() - start
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(stage, LatencyHistogram(self.buckets))
+        histogram.record(elapsed)
+
+    def reset(self):
+        """모든 단계 통계 초기화"""
+        with self._lock:
+            self.histograms = {}
+
+    def get_histograms(self):
+        """
+        단계별 히스토그램 복사본 반환 (메트릭 서버의 버킷 노출용)
+
+        Returns:
+            {단계 이름: LatencyHistogram}
+        """
+        with self._lock:
+            return dict(self.histograms)
+
+    def snapshot(self):
+        """
+        단계별 통계 반환
+
+        Returns:
+            {단계 이름: 통계 딕셔너리}
+        """
+        with self._lock:
+            histograms = dict(self.histograms)
+        return {stage: histogram.snapshot() for stage, histogram in histograms.items()}
+
+    def format_summary(self):
+        """
+        단계별 통계 요약 문자열 (주기적 로그 출력용)
+
+        Returns:
+            여러 줄 요약 문자열
+        """
+        snapshot = self.snapshot()
+        if not snapshot:
+            return "⏱️  단계별 처리 시간: 기록 없음"
+
+        lines = ["⏱️  단계별 처리 시간 (ms)"]
+        for stage, stats in sorted(snapshot.items()):
+            lines.append(
+                f"  {stage:<22} p50 {stats['p50_ms']:8.3f} | p95 {stats['p95_ms']:8.3f} | "
+                f"p99 {stats['p99_ms']:8.3f} | 최대 {stats['max_ms']:8.3f} ({stats['count']}회)"
+            )
+        return "\n".join(lines)
+
+
+def timed(stage):
+    """
+    메서드 전체 실행 시간을 self.timer에 기록하는 데코레이터
+
+    Args:
+        stage: 단계 이름
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            timer = self.timer
+            if not timer.enabled:
+                return method(self, *args, **kwargs)
+
+            start = time.perf_counter()
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                timer.record(stage, start)
+        return wrapper
+    return decorator
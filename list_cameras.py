@@ -3,9 +3,10 @@
 연결된 모든 카메라를 찾아서 표시합니다.
 """
 
-import cv2
 import sys
 
+from camera_utils import discover_cameras, list_candidate_devices, open_camera
+
 
 def list_available_cameras():
     """
@@ -16,38 +17,17 @@ def list_available_cameras():
     print("=" * 60)
     print()
     
-    available_cameras = []
+    # 후보 장치를 동시에 확인 (캐시를 무시하고 다시 검색한 뒤 결과를 캐시에 저장)
+    candidates = list_candidate_devices()
+    print(f"카메라 인덱스 {candidates}를 확인 중...")
+    available_cameras = discover_cameras(refresh=True)
     
-    # 0부터 10까지 카메라 인덱스 테스트
-    print("카메라 인덱스 0-10을 확인 중...")
-    for i in range(11):
-        cap = cv2.VideoCapture(i)
-        if cap.isOpened():
-            # 카메라 정보 가져오기
-            width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-            height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-            fps = int(cap.get(cv2.CAP_PROP_FPS))
-            
-            # 카메라 이름 가져오기 시도
-            backend = cap.getBackendName()
-            
-            # 프레임 읽기 테스트
-            ret, frame = cap.read()
-            if ret:
-                available_cameras.append({
-                    'index': i,
-                    'width': width,
-                    'height': height,
-                    'fps': fps,
-                    'backend': backend,
-                    'working': True
-                })
-                print(f"✅ 카메라 인덱스 {i}: {width}x{height} @ {fps}fps ({backend})")
-            else:
-                print(f"⚠️  카메라 인덱스 {i}: 연결됐지만 프레임 읽기 실패")
-            
-            cap.release()
-        else:
+    found = {cam['index'] for cam in available_cameras}
+    for cam in available_cameras:
+        print(f"✅ 카메라 인덱스 {cam['index']} ({cam['device']}): "
+              f"{cam['width']}x{cam['height']} @ {cam['fps']:.0f}fps ({cam['backend']})")
+    for i in candidates:
+        if i not in found:
             print(f"❌ 카메라 인덱스 {i}: 사용 불가")
     
     print()
@@ -62,7 +42,7 @@ def list_available_cameras():
     print(f"\n총 {len(available_cameras)}개의 카메라를 찾았습니다:\n")
     
     for i, cam in enumerate(available_cameras):
-        print(f"  [{cam['index']}] 해상도: {cam['width']}x{cam['height']}, FPS: {cam['fps']}, 백엔드: {cam['backend']}")
+        print(f"  [{cam['index']}] 해상도: {cam['width']}x{cam['height']}, FPS: {cam['fps']:.0f}, 백엔드: {cam['backend']}")
     
     print()
     print("=" * 60)
@@ -85,7 +65,7 @@ def test_camera(camera_index):
     특정 카메라 인덱스를 테스트합니다.
     """
     print(f"\n카메라 인덱스 {camera_index} 테스트 중...")
-    cap = cv2.VideoCapture(camera_index)
+    cap = open_camera(camera_index)
     
     if not cap.isOpened():
         print(f"❌ 카메라 인덱스 {camera_index}를 열 수 없습니다.")
@@ -6,10 +6,14 @@ rPPG 심박수 측정 메인 프로그램 (MediaPipe 버전)
 import cv2
 import numpy as np
 from rppg_mediapipe import RPPGDetector
-from camera_utils import find_external_webcam, select_camera_interactive
+from camera_utils import find_external_webcam, select_camera_interactive, open_camera
 from mqtt_client import MQTTClient, create_mqtt_client_from_config, create_mqtt_client_from_env
+from pipeline import RPPGPipeline
+from metrics_server import ServiceMetrics, MetricsServer
+from signal_utils import check_timestamp_options
 import time
 import sys
+import signal
 import argparse
 
 
@@ -40,6 +44,28 @@ def draw_text_with_background(img, text, position, font_scale=0.7,
     )
 
 
+def handle_sigterm(signum, frame):
+    """
+    SIGTERM(docker stop 등)을 Ctrl+C와 같이 처리하여 정리 코드가 실행되도록 함
+    """
+    raise KeyboardInterrupt
+
+
+def print_capture_failure(max_failures):
+    """
+    연속 프레임 읽기 실패 시 원인과 해결 방법 출력
+    """
+    print(f"\n❌ 오류: {max_failures}번 연속으로 프레임을 읽을 수 없습니다.")
+    print("\n가능한 원인:")
+    print("- 다른 프로그램에서 웹캠을 사용 중입니다")
+    print("- 웹캠 연결이 끊어졌습니다")
+    print("- 웹캠 드라이버 문제")
+    print("\n해결 방법:")
+    print("1. 다른 프로그램에서 웹캠을 닫으세요")
+    print("2. 웹캠을 다시 연결하세요")
+    print("3. 프로그램을 재시작하세요")
+
+
 def main():
     """
     메인 함수
@@ -58,18 +84,70 @@ def main():
                         help='MQTT 사용자명')
     parser.add_argument('--mqtt-password', type=str, default=None,
                         help='MQTT 비밀번호')
+    parser.add_argument('--mqtt-spool', type=str, default=None,
+                        help='브로커 연결이 끊긴 동안의 메시지를 보관할 스풀 파일 경로 (재연결 후 나누어 전송)')
+    parser.add_argument('--device-id', type=str, default=None,
+                        help='MQTT 메시지에 넣을 장치 ID (기본값: 설정 파일 또는 호스트 이름, 재시작해도 유지)')
+    parser.add_argument('--waveform', action='store_true',
+                        help='프레임별 ROI 색상 평균(원시 파형)을 {토픽}/waveform 토픽으로 전송 (중앙 서버 분석용)')
+    parser.add_argument('--waveform-chunk', type=float, default=1.0,
+                        help='파형 메시지 하나에 담을 구간 길이 (초, 기본값: 1.0)')
     parser.add_argument('--no-mqtt', action='store_true',
                         help='MQTT 전송 비활성화')
+    parser.add_argument('--buffer-size', type=int, default=300,
+                        help='신호 버퍼 크기 (프레임 수, 기본값: 300 = 30fps 기준 10초)')
+    parser.add_argument('--streaming', action='store_true',
+                        help='스트리밍 필터 모드 (프레임마다 상태 유지 필터 적용, 매초 재필터링 생략)')
+    parser.add_argument('--sliding-dft', action='store_true',
+                        help='Sliding DFT 모드 (대역 내 스펙트럼을 프레임마다 갱신)')
+    parser.add_argument('--respiration-window', type=float, default=None,
+                        help='호흡률 전용 장기 버퍼 길이 (초, 예: 60). 지정 시 데시메이션된 신호로 호흡률 계산')
+    parser.add_argument('--use-timestamps', action='store_true',
+                        help='실제 프레임 타임스탬프로 측정한 fps로 재샘플링하여 분석 (부하로 fps가 떨어질 때 권장)')
+    parser.add_argument('--rois', type=str, default='forehead',
+                        help='사용할 얼굴 ROI (쉼표로 구분: forehead,left_cheek,right_cheek, 기본값: forehead)')
+    parser.add_argument('--detection-scale', type=float, default=1.0,
+                        help='얼굴 감지 해상도 축소 비율 (예: 0.5, 기본값: 1.0). ROI는 원본 해상도에서 추출')
+    parser.add_argument('--no-refine-landmarks', action='store_true',
+                        help='FaceMesh 홍채 랜드마크 정밀화 비활성화 (추론 비용 감소)')
+    parser.add_argument('--multi-face', action='store_true',
+                        help='여러 얼굴을 트랙 ID로 구분하여 얼굴별 심박수/호흡률 측정')
+    parser.add_argument('--max-faces', type=int, default=4,
+                        help='다중 얼굴 모드에서 동시에 추적할 최대 얼굴 수 (기본값: 4)')
+    parser.add_argument('--track-timeout', type=float, default=2.0,
+                        help='다중 얼굴 모드에서 보이지 않는 얼굴 트랙을 제거할 시간 (초, 기본값: 2.0)')
+    parser.add_argument('--threaded', action='store_true',
+                        help='캡처 / 분석 / 표시를 별도 스레드로 분리 (분석이 느려도 카메라는 기본 속도 유지, 밀린 프레임은 버림)')
+    parser.add_argument('--headless', action='store_true',
+                        help='헤드리스 서비스 모드 (화면 표시 / 오버레이 / ROI 그리기 생략, 측정값은 콘솔에 출력)')
+    parser.add_argument('--update-interval', type=float, default=1.0,
+                        help='심박수/호흡률 갱신 간격 (초, 기본값: 1.0)')
+    parser.add_argument('--timing', action='store_true',
+                        help='단계별 처리 시간 계측 (감지 / ROI / 신호 처리 등의 p50/p95/p99를 주기적으로 출력)')
+    parser.add_argument('--timing-interval', type=float, default=10.0,
+                        help='단계별 처리 시간 출력 간격 (초, 기본값: 10.0)')
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help='Prometheus 형식 메트릭 HTTP 포트 (예: 9100, 지정 시 /metrics 노출 및 단계별 시간 계측)')
+    parser.add_argument('--metrics-host', type=str, default='0.0.0.0',
+                        help='메트릭 서버 바인딩 주소 (기본값: 0.0.0.0)')
     
     args = parser.parse_args()
     
+    error = check_timestamp_options(args.use_timestamps, args.streaming, args.sliding_dft,
+                                    args.respiration_window)
+    if error is not None:
+        parser.error(error)
+    
     print("rPPG 심박수 측정 프로그램 시작 (MediaPipe 버전)")
     print("=" * 50)
     print("사용법:")
     print("- 웹캠 앞에 얼굴을 위치시키세요")
     print("- 조명이 충분한 환경에서 사용하세요")
     print("- 움직임을 최소화하세요")
-    print("- 'q' 키를 눌러 종료하세요")
+    if args.headless:
+        print("- 헤드리스 모드: Ctrl+C 또는 SIGTERM으로 종료하세요")
+    else:
+        print("- 'q' 키를 눌러 종료하세요")
     print("=" * 50)
     
     # MQTT 클라이언트 초기화
@@ -100,8 +178,20 @@ def main():
         
         # MQTT 연결 시도
         if mqtt_client:
+            if args.device_id:
+                mqtt_client.device_id = args.device_id
+            if args.mqtt_spool and mqtt_client.spool is None:
+                mqtt_client.enable_spool(args.mqtt_spool)
+            if args.waveform and mqtt_client.waveform_topic is None:
+                mqtt_client.enable_waveform(chunk_duration=args.waveform_chunk)
             mqtt_client.connect()
     
+    # 원시 파형 전송 (신호를 얻은 프레임마다 호출)
+    waveform_callback = None
+    if mqtt_client and mqtt_client.waveform_topic is not None:
+        waveform_callback = mqtt_client.publish_waveform_sample
+        print(f"📡 원시 파형 전송: {mqtt_client.waveform_topic}")
+    
     # 카메라 선택
     camera_index = args.camera_index
     
@@ -118,7 +208,8 @@ def main():
     
     # 웹캠 초기화
     print(f"\n📹 카메라 인덱스 {camera_index}를 사용합니다...")
-    cap = cv2.VideoCapture(camera_index)
+    # 플랫폼에 맞는 백엔드 사용 (Windows: DirectShow, macOS: AVFoundation, Linux: V4L2)
+    cap = open_camera(camera_index)
     
     if not cap.isOpened():
         print(f"❌ 오류: 카메라 인덱스 {camera_index}를 열 수 없습니다.")
@@ -139,6 +230,11 @@ def main():
     
     print(f"웹캠 해상도: {width}x{height}, FPS: {fps}")
     
+    # 일부 드라이버는 FPS를 0으로 보고함 → 명목값 30 사용 (실제 값은 --use-timestamps로 측정)
+    if fps <= 0:
+        print("⚠️  카메라가 FPS를 보고하지 않습니다. 30 FPS로 가정합니다.")
+        fps = 30
+    
     # 카메라 초기화 대기 (몇 프레임 버리기)
     print("카메라 초기화 중...")
     for i in range(10):
@@ -159,62 +255,126 @@ def main():
     print("✅ 카메라가 준비되었습니다.")
     
     # rPPG 감지기 초기화
-    rppg = RPPGDetector(buffer_size=300, fps=fps)
+    rppg = RPPGDetector(buffer_size=args.buffer_size, fps=fps, streaming=args.streaming,
+                        sliding_dft=args.sliding_dft,
+                        respiration_window=args.respiration_window,
+                        use_timestamps=args.use_timestamps,
+                        roi_names=tuple(name.strip() for name in args.rois.split(',') if name.strip()),
+                        detection_scale=args.detection_scale,
+                        refine_landmarks=not args.no_refine_landmarks,
+                        multi_face=args.multi_face, max_faces=args.max_faces,
+                        track_timeout=args.track_timeout,
+                        draw_roi=not args.headless,
+                        timing=args.timing or args.metrics_port is not None)
+    
+    # 메트릭 HTTP 서버 (백그라운드 스레드)
+    metrics = None
+    metrics_server = None
+    if args.metrics_port is not None:
+        metrics = ServiceMetrics()
+        metrics.set_timer(rppg.timer)
+        metrics.set_mqtt_client(mqtt_client)
+        metrics_server = MetricsServer(metrics, host=args.metrics_host, port=args.metrics_port)
+        metrics_server.start()
     
     # 심박수 및 호흡률 표시를 위한 변수
     heart_rate_history = []
     respiration_rate_history = []
     last_update_time = time.time()
     last_mqtt_send_time = time.time()
-    update_interval = 1.0  # 1초마다 업데이트
+    last_timing_time = time.time()
+    update_interval = args.update_interval  # 기본 1초마다 업데이트
     mqtt_send_interval = 1.0  # MQTT 전송 간격: 1초
     
     print("\n측정을 시작합니다...")
     print("얼굴을 웹캠 앞에 위치시키고 조명이 충분한지 확인하세요.\n")
     
     frame_count = 0
+    detected_frames = 0
     consecutive_failures = 0
+    effective_fps = None
     max_failures = 10
     
+    # 스레드 파이프라인: 캡처 스레드 → 분석 워커 → 표시/출력 (이 스레드)
+    pipeline = None
+    if args.threaded:
+        pipeline = RPPGPipeline(cap, rppg, update_interval=update_interval, max_failures=max_failures,
+                                sample_callback=waveform_callback)
+        pipeline.start()
+    
+    # SIGTERM으로 종료해도 카메라 / 파이프라인 / MQTT 정리
+    signal.signal(signal.SIGTERM, handle_sigterm)
+    
     try:
         while True:
-            ret, frame = cap.read()
-            
-            if not ret:
-                consecutive_failures += 1
-                if consecutive_failures >= max_failures:
-                    print(f"\n❌ 오류: {max_failures}번 연속으로 프레임을 읽을 수 없습니다.")
-                    print("\n가능한 원인:")
-                    print("- 다른 프로그램에서 웹캠을 사용 중입니다")
-                    print("- 웹캠 연결이 끊어졌습니다")
-                    print("- 웹캠 드라이버 문제")
-                    print("\n해결 방법:")
-                    print("1. 다른 프로그램에서 웹캠을 닫으세요")
-                    print("2. 웹캠을 다시 연결하세요")
-                    print("3. 프로그램을 재시작하세요")
-                    break
-                else:
-                    # 일시적 오류는 무시하고 계속 시도
-                    time.sleep(0.1)
+            if pipeline is not None:
+                # 분석 워커의 최신 결과 받기
+                result = pipeline.get_result(timeout=0.5)
+                if result is None:
+                    if pipeline.capture.failed:
+                        print_capture_failure(max_failures)
+                        break
+                    if not pipeline.is_running():
+                        print(f"\n❌ 오류: 분석 스레드가 중단되었습니다: {pipeline.worker.error}")
+                        break
                     continue
+                
+                frame_count += 1
+                processed_frame = result.frame
+                current_time = result.capture_time
+                vitals = result.vitals
+                if vitals is not None:
+                    effective_fps = result.effective_fps
+            else:
+                ret, frame = cap.read()
+                capture_time = time.time()
+                
+                if not ret:
+                    consecutive_failures += 1
+                    if consecutive_failures >= max_failures:
+                        print_capture_failure(max_failures)
+                        break
+                    else:
+                        # 일시적 오류는 무시하고 계속 시도
+                        time.sleep(0.1)
+                        continue
+                
+                # 성공적으로 프레임을 읽었으면 실패 카운터 리셋
+                consecutive_failures = 0
+                
+                frame_count += 1
+                
+                # 프레임 처리
+                processed_frame, roi_points, signal_value = rppg.process_frame(frame, capture_time)
+                
+                # 신호 추가
+                if signal_value is not None:
+                    rppg.add_signal(signal_value, capture_time, roi_values=rppg.last_roi_values)
+                    detected_frames += 1
+                    if waveform_callback is not None:
+                        waveform_callback(capture_time, rppg.last_roi_means)
+                
+                # 주기적으로 심박수 및 호흡률 계산
+                current_time = time.time()
+                vitals = None
+                if current_time - last_update_time >= update_interval:
+                    vitals = rppg.calculate_vitals()
+                    effective_fps = rppg.get_effective_fps()
             
-            # 성공적으로 프레임을 읽었으면 실패 카운터 리셋
-            consecutive_failures = 0
-            
-            frame_count += 1
-            
-            # 프레임 처리
-            processed_frame, roi_points, signal_value = rppg.process_frame(frame)
-            
-            # 신호 추가
-            if signal_value is not None:
-                rppg.add_signal(signal_value)
+            # 메트릭 갱신
+            if metrics is not None:
+                if pipeline is not None:
+                    stats = pipeline.get_stats()
+                    metrics.update_frames(stats['captured_frames'], stats['processed_frames'],
+                                          stats['dropped_frames'], stats['detected_frames'], current_time)
+                else:
+                    metrics.update_frames(frame_count, frame_count, 0, detected_frames, current_time)
+                metrics.update_buffer(len(rppg.signal_buffer), rppg.signal_buffer.maxlen, effective_fps)
             
-            # 주기적으로 심박수 및 호흡률 계산
-            current_time = time.time()
-            if current_time - last_update_time >= update_interval:
-                heart_rate, hr_confidence = rppg.calculate_heart_rate()
-                respiration_rate, rr_confidence = rppg.calculate_respiration_rate()
+            if vitals is not None:
+                (heart_rate, hr_confidence), (respiration_rate, rr_confidence) = vitals
+                if metrics is not None:
+                    metrics.update_vitals(heart_rate, hr_confidence, respiration_rate, rr_confidence, current_time)
                 
                 # 심박수 처리
                 if heart_rate is not None:
@@ -234,8 +394,9 @@ def main():
                 else:
                     avg_respiration_rate = None
                 
-                # MQTT 전송: 정확히 1초에 한번씩만 전송
-                if mqtt_client and mqtt_client.connected:
+                # MQTT 전송: 정확히 1초에 한번씩만 전송 (전송 큐에 넣기만 하고 대기하지 않음,
+                # 연결이 끊긴 동안의 레코드는 큐에 보관되었다가 재연결 후 전송)
+                if mqtt_client:
                     if current_time - last_mqtt_send_time >= mqtt_send_interval:
                         mqtt_client.publish_vital_signs(
                             heart_rate=avg_heart_rate,
@@ -260,27 +421,48 @@ def main():
                     info_text.append("Respiration: 측정 중... (6초 이상 필요)")
                 
                 info_text.extend([
-                    f"Buffer: {len(rppg.signal_buffer)}/{rppg.buffer_size}",
-                    f"Frame: {frame_count}",
+                    f"Buffer: {len(rppg.signal_buffer)}/{rppg.buffer_size}"
+                    + (f" ({effective_fps:.1f} fps)" if effective_fps else ""),
+                    f"Frame: {frame_count}"
+                    + (f" (Dropped: {pipeline.capture.dropped_frames})" if pipeline is not None else ""),
                     mqtt_status
                 ])
                 
-                # 정보 표시
-                y_offset = 30
-                for i, text in enumerate(info_text):
-                    if i == 0:  # 심박수
-                        color = (0, 255, 0)
-                    elif i == 1:  # 호흡률
-                        color = (0, 255, 255)
+                # 다중 얼굴 모드: 트랙별 심박수
+                for track_id, ((track_hr, track_conf), _) in sorted(rppg.last_track_vitals.items()):
+                    if track_hr is not None:
+                        info_text.append(f"Face {track_id}: {track_hr:.1f} BPM (Conf: {track_conf*100:.0f}%)")
                     else:
-                        color = (255, 255, 255)
-                    draw_text_with_background(
-                        processed_frame, text, (10, y_offset + i * 30),
-                        font_scale=0.6, font_color=color
-                    )
+                        info_text.append(f"Face {track_id}: 측정 중...")
+                
+                # 정보 표시 (헤드리스 모드는 콘솔 출력)
+                if args.headless:
+                    print(" | ".join(info_text))
+                else:
+                    y_offset = 30
+                    for i, text in enumerate(info_text):
+                        if i == 0:  # 심박수
+                            color = (0, 255, 0)
+                        elif i == 1:  # 호흡률
+                            color = (0, 255, 255)
+                        else:
+                            color = (255, 255, 255)
+                        draw_text_with_background(
+                            processed_frame, text, (10, y_offset + i * 30),
+                            font_scale=0.6, font_color=color
+                        )
                 
                 last_update_time = current_time
             
+            # 단계별 처리 시간 주기적 출력
+            if args.timing and current_time - last_timing_time >= args.timing_interval:
+                print(rppg.timer.format_summary())
+                last_timing_time = current_time
+            
+            # 헤드리스 모드: 안내 메시지 / 화면 표시 생략
+            if args.headless:
+                continue
+            
             # 안내 메시지 표시
             if len(rppg.signal_buffer) < 60:
                 progress = len(rppg.signal_buffer) / 60 * 100
@@ -327,14 +509,27 @@ def main():
     
     finally:
         # 정리
+        if pipeline is not None:
+            pipeline.stop()
+            stats = pipeline.get_stats()
+            print(f"\n📊 캡처 {stats['captured_frames']}프레임 / 처리 {stats['processed_frames']}프레임 "
+                  f"/ 버려진 프레임 {stats['dropped_frames']}")
         cap.release()
-        cv2.destroyAllWindows()
+        if not args.headless:
+            cv2.destroyAllWindows()
+        if metrics_server is not None:
+            metrics_server.stop()
+        
+        if args.timing:
+            print("\n" + rppg.timer.format_summary())
         
         # MQTT 연결 해제
         if mqtt_client:
             mqtt_client.disconnect()
             if mqtt_client.publish_count > 0:
                 print(f"\n📤 총 {mqtt_client.publish_count}개의 메시지를 MQTT로 전송했습니다.")
+            if mqtt_client.queue.dropped > 0:
+                print(f"⚠️  전송 큐가 가득 차 {mqtt_client.queue.dropped}개의 메시지를 버렸습니다.")
         
         # 최종 결과 출력
         if len(heart_rate_history) > 0:
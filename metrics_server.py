@@ -0,0 +1,316 @@
+"""
+측정 서비스 메트릭 HTTP 서버
+표준 라이브러리 HTTP 서버를 백그라운드 스레드로 실행하여 Prometheus 텍스트 형식으로
+프레임레이트, 버려진 프레임, 얼굴 감지율, 버퍼 상태, 단계별 처리 시간, MQTT 전송 현황,
+마지막 심박수 / 호흡률을 노출합니다.
+
+사용 예:
+    metrics = ServiceMetrics()
+    server = MetricsServer(metrics, port=9100)
+    server.start()
+    # curl http://localhost:9100/metrics
+"""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 단계별 히스토그램은 계측기 버킷 중 5개마다 하나만 노출 (10µs ~ 10초, 반 자릿수 간격)
+HISTOGRAM_BUCKET_STEP = 5
+
+
+def format_value(value):
+    """
+    메트릭 값을 Prometheus 텍스트 형식 숫자로 변환
+
+    Args:
+        value: 숫자, bool 또는 None
+
+    Returns:
+        문자열 (None이면 NaN)
+    """
+    if value is None:
+        return "NaN"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+class ServiceMetrics:
+    def __init__(self, fps_window=1.0):
+        """
+        측정 서비스 메트릭 저장소 초기화
+
+        메인 루프가 update_* 메서드로 값을 갱신하고, HTTP 서버 스레드가 render()로 읽습니다.
+
+        Args:
+            fps_window: 캡처 / 처리 fps를 계산하는 최소 구간 (초)
+        """
+        self.fps_window = fps_window
+        self.start_time = time.time()
+        self.timer = None
+        self.mqtt_client = None
+        self._lock = threading.Lock()
+
+        self.captured_frames = 0
+        self.processed_frames = 0
+        self.dropped_frames = 0
+        self.detected_frames = 0
+        self.capture_fps = 0.0
+        self.processed_fps = 0.0
+        self.effective_fps = None
+        self.buffer_length = 0
+        self.buffer_capacity = 0
+        self.heart_rate = None
+        self.heart_rate_confidence = None
+        self.respiration_rate = None
+        self.respiration_rate_confidence = None
+        self.last_vitals_time = None
+
+        # fps 계산용 직전 표본 (시각, 캡처 수, 처리 수)
+        self._fps_sample = None
+
+    def set_timer(self, timer):
+        """
+        단계별 처리 시간 계측기 연결
+
+        Args:
+            timer: instrumentation.StageTimer
+        """
+        self.timer = timer
+
+    def set_mqtt_client(self, mqtt_client):
+        """
+        MQTT 전송 현황을 읽을 클라이언트 연결
+
+        Args:
+            mqtt_client: MQTTClient (None이면 MQTT 메트릭 생략)
+        """
+        self.mqtt_client = mqtt_client
+
+    def update_frames(self, captured, processed, dropped=0, detected=0, timestamp=None):
+        """
+        누적 프레임 수 갱신 (fps_window 이상 지나면 캡처 / 처리 fps 재계산)
+
+        Args:
+            captured: 누적 캡처 프레임 수
+            processed: 누적 처리 프레임 수
+            dropped: 누적 버려진 프레임 수
+            detected: 얼굴(ROI 신호)을 얻은 누적 프레임 수
+            timestamp: 현재 시각 (None이면 time.time())
+        """
+        if timestamp is None:
+            timestamp = time.time()
+
+        with self._lock:
+            self.captured_frames = captured
+            self.processed_frames = processed
+            self.dropped_frames = dropped
+            self.detected_frames = detected
+
+            if self._fps_sample is None:
+                self._fps_sample = (timestamp, captured, processed)
+                return
+
+            last_time, last_captured, last_processed = self._fps_sample
+            elapsed = timestamp - last_time
+            if elapsed >= self.fps_window:
+                self.capture_fps = (captured - last_captured) / elapsed
+                self.processed_fps = (processed - last_processed) / elapsed
+                self._fps_sample = (timestamp, captured, processed)
+
+    def update_buffer(self, length, capacity, effective_fps=None):
+        """
+        신호 버퍼 상태 갱신
+
+        Args:
+            length: 현재 버퍼 샘플 수
+            capacity: 버퍼 용량
+            effective_fps: 측정된 유효 샘플링 주파수 (None이면 이전 값 유지)
+        """
+        with self._lock:
+            self.buffer_length = length
+            self.buffer_capacity = capacity
+            if effective_fps is not None:
+                self.effective_fps = effective_fps
+
+    def update_vitals(self, heart_rate, heart_rate_confidence, respiration_rate,
+                      respiration_rate_confidence, timestamp=None):
+        """
+        마지막 심박수 / 호흡률 갱신
+
+        Args:
+            heart_rate: 심박수 (BPM, 없으면 None)
+            heart_rate_confidence: 심박수 신뢰도
+            respiration_rate: 호흡률 (RPM, 없으면 None)
+            respiration_rate_confidence: 호흡률 신뢰도
+            timestamp: 계산 시각 (None이면 time.time())
+        """
+        with self._lock:
+            self.heart_rate = heart_rate
+            self.heart_rate_confidence = heart_rate_confidence
+            self.respiration_rate = respiration_rate
+            self.respiration_rate_confidence = respiration_rate_confidence
+            self.last_vitals_time = timestamp if timestamp is not None else time.time()
+
+    def render(self):
+        """
+        Prometheus 텍스트 형식 메트릭 생성
+
+        Returns:
+            메트릭 텍스트
+        """
+        lines = []
+
+        def add(name, metric_type, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for labels, value in samples:
+                lines.append(f"{name}{labels} {format_value(value)}")
+
+        with self._lock:
+            detection_rate = (self.detected_frames / self.processed_frames
+                              if self.processed_frames else None)
+            buffer_fill = (self.buffer_length / self.buffer_capacity
+                           if self.buffer_capacity else None)
+
+            add("rppg_uptime_seconds", "gauge", "Seconds since the service started.",
+                [("", time.time() - self.start_time)])
+            add("rppg_frames_captured_total", "counter", "Frames read from the camera.",
+                [("", self.captured_frames)])
+            add("rppg_frames_processed_total", "counter", "Frames analysed by the detector.",
+                [("", self.processed_frames)])
+            add("rppg_frames_dropped_total", "counter", "Frames dropped before analysis.",
+                [("", self.dropped_frames)])
+            add("rppg_frames_detected_total", "counter", "Analysed frames that yielded a face ROI signal.",
+                [("", self.detected_frames)])
+            add("rppg_capture_fps", "gauge", "Camera capture frame rate.",
+                [("", self.capture_fps)])
+            add("rppg_processed_fps", "gauge", "Detector processing frame rate.",
+                [("", self.processed_fps)])
+            add("rppg_effective_fps", "gauge", "Measured sampling rate of the signal buffer.",
+                [("", self.effective_fps)])
+            add("rppg_detection_ratio", "gauge", "Fraction of analysed frames with a detected face.",
+                [("", detection_rate)])
+            add("rppg_buffer_samples", "gauge", "Samples in the signal buffer.",
+                [("", self.buffer_length)])
+            add("rppg_buffer_fill_ratio", "gauge", "Signal buffer fill ratio.",
+                [("", buffer_fill)])
+            add("rppg_heart_rate_bpm", "gauge", "Last estimated heart rate.",
+                [("", self.heart_rate)])
+            add("rppg_heart_rate_confidence", "gauge", "Confidence of the last heart rate.",
+                [("", self.heart_rate_confidence)])
+            add("rppg_respiration_rate_rpm", "gauge", "Last estimated respiration rate.",
+                [("", self.respiration_rate)])
+            add("rppg_respiration_rate_confidence", "gauge", "Confidence of the last respiration rate.",
+                [("", self.respiration_rate_confidence)])
+            add("rppg_last_vitals_timestamp_seconds", "gauge", "Unix time of the last vitals update.",
+                [("", self.last_vitals_time)])
+
+        if self.mqtt_client is not None:
+            status = self.mqtt_client.get_status()
+            add("rppg_mqtt_connected", "gauge", "Whether the MQTT client is connected.",
+                [("", status.get("connected", False))])
+            add("rppg_mqtt_published_total", "counter", "Messages acknowledged by the MQTT client.",
+                [("", status.get("publish_count", 0))])
+            add("rppg_mqtt_publish_failures_total", "counter", "Failed MQTT publish attempts.",
+                [("", status.get("publish_failures", 0))])
+            add("rppg_mqtt_queue_depth", "gauge", "Messages waiting to be sent to the broker.",
+                [("", status.get("queue_depth", 0))])
+            add("rppg_mqtt_dropped_total", "counter", "Messages dropped because the outbound queue was full.",
+                [("", status.get("dropped", 0))])
+            add("rppg_mqtt_spool_depth", "gauge", "Messages stored on disk while the broker was unreachable.",
+                [("", status.get("spool_depth", 0))])
+            add("rppg_mqtt_spool_evicted_total", "counter", "Spooled messages evicted by the size cap.",
+                [("", status.get("spool_evicted", 0))])
+
+        if self.timer is not None:
+            self._render_stage_histograms(lines)
+
+        return "\n".join(lines) + "\n"
+
+    def _render_stage_histograms(self, lines):
+        """
+        단계별 처리 시간 히스토그램을 Prometheus histogram 형식으로 추가
+
+        Args:
+            lines: 출력 줄 목록 (이 목록에 추가)
+        """
+        histograms = self.timer.get_histograms()
+
+        name = "rppg_stage_duration_seconds"
+        lines.append(f"# HELP {name} Time spent in each processing stage.")
+        lines.append(f"# TYPE {name} histogram")
+
+        for stage, histogram in sorted(histograms.items()):
+            counts = list(histogram.counts)
+            cumulative = 0
+            for index, upper in enumerate(histogram.buckets):
+                cumulative += counts[index]
+                if index % HISTOGRAM_BUCKET_STEP == 0:
+                    lines.append(f'{name}_bucket{{stage="{stage}",le="{upper:.6g}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {sum(counts)}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {format_value(histogram.total)}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {sum(counts)}')
+
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    """/metrics 요청에 ServiceMetrics.render() 결과를 응답"""
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0] not in ('/metrics', '/'):
+            self.send_error(404)
+            return
+
+        body = self.server.metrics.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # 스크레이프마다 콘솔에 접근 로그를 남기지 않음
+        pass
+
+
+class MetricsServer:
+    def __init__(self, metrics, host='0.0.0.0', port=9100):
+        """
+        메트릭 HTTP 서버 초기화
+
+        Args:
+            metrics: ServiceMetrics 인스턴스
+            host: 바인딩 주소
+            port: 포트 (0이면 임의 포트)
+        """
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self.httpd = None
+        self.thread = None
+
+    def start(self):
+        """백그라운드 스레드에서 서버 시작"""
+        self.httpd = ThreadingHTTPServer((self.host, self.port), MetricsRequestHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.metrics = self.metrics
+        self.port = self.httpd.server_address[1]
+
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="MetricsServer", daemon=True)
+        self.thread.start()
+        print(f"📈 메트릭 서버 시작: http://{self.host}:{self.port}/metrics")
+
+    def stop(self):
+        """서버 종료"""
+        if self.httpd is None:
+            return
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.thread.join(timeout=2.0)
+        self.httpd = None
@@ -1,16 +1,111 @@
 """
 MQTT 클라이언트 유틸리티
 rPPG 측정 데이터를 MQTT 브로커로 전송합니다.
+
+측정 루프는 작은 레코드를 크기가 제한된 전송 큐에 넣기만 하고,
+백그라운드 전송 스레드가 JSON 직렬화와 발행을 수행하므로 브로커가 느려도 프레임 처리가 멈추지 않습니다.
 """
 
 import json
+import threading
 import time
 import os
-from datetime import datetime
+import socket
+from collections import deque
 from pathlib import Path
 import paho.mqtt.client as mqtt
 from typing import Optional, Callable, Dict, Any
 
+from mqtt_payload import (PAYLOAD_FORMATS, KIND_HEART_RATE, KIND_VITAL_SIGNS, KIND_WAVEFORM,
+                          MAX_WAVEFORM_TIME_DELTA, make_record, encode_json, encode_binary, encode_waveform)
+from mqtt_spool import MessageSpool
+
+
+# 전송 큐가 가득 찼을 때의 처리 방식
+DROP_POLICIES = ("drop_oldest", "drop_newest")
+
+
+class OutboundQueue:
+    def __init__(self, maxsize: int = 100, drop_policy: str = "drop_oldest"):
+        """
+        크기가 제한된 전송 큐 초기화
+
+        Args:
+            maxsize: 최대 레코드 수
+            drop_policy: 가득 찼을 때 처리 방식
+                         ('drop_oldest': 가장 오래된 레코드를 버리고 추가,
+                          'drop_newest': 새 레코드를 버림)
+        """
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(f"지원하지 않는 drop_policy: {drop_policy} (사용 가능: {', '.join(DROP_POLICIES)})")
+
+        self.maxsize = maxsize
+        self.drop_policy = drop_policy
+        self._items = deque()
+        self._condition = threading.Condition()
+        self.dropped = 0
+
+    def put(self, item) -> bool:
+        """
+        레코드 추가 (대기하지 않음)
+
+        Args:
+            item: 추가할 레코드
+
+        Returns:
+            새 레코드가 큐에 들어갔는지 여부 ('drop_newest'로 버려지면 False)
+        """
+        with self._condition:
+            if len(self._items) >= self.maxsize:
+                self.dropped += 1
+                if self.drop_policy == "drop_newest":
+                    return False
+                self._items.popleft()
+            self._items.append(item)
+            self._condition.notify()
+            return True
+
+    def get(self, timeout: Optional[float] = None):
+        """
+        레코드 꺼내기
+
+        Args:
+            timeout: 대기 시간 (초, None이면 무한 대기)
+
+        Returns:
+            레코드, 시간 초과 시 None
+        """
+        with self._condition:
+            if not self._items:
+                self._condition.wait(timeout)
+            if not self._items:
+                return None
+            return self._items.popleft()
+
+    def put_front(self, item):
+        """
+        발행하지 못한 레코드를 큐 앞에 되돌려 놓기 (가득 찼으면 버림)
+
+        Args:
+            item: 되돌릴 레코드
+        """
+        with self._condition:
+            if len(self._items) >= self.maxsize:
+                self.dropped += 1
+                return
+            self._items.appendleft(item)
+            self._condition.notify()
+
+    def wake(self):
+        """대기 중인 get() 깨우기 (종료 시 사용)"""
+        with self._condition:
+            self._condition.notify_all()
+
+    def qsize(self) -> int:
+        """현재 레코드 수"""
+        with self._condition:
+            return len(self._items)
+
 
 class MQTTClient:
     def __init__(self, broker_host: str = "203.250.148.52", 
@@ -19,7 +114,16 @@ class MQTTClient:
                  client_id: Optional[str] = None,
                  username: Optional[str] = None,
                  password: Optional[str] = None,
-                 qos: int = 0):
+                 qos: int = 0,
+                 queue_size: int = 100,
+                 drop_policy: str = "drop_oldest",
+                 reconnect_min_delay: int = 1,
+                 reconnect_max_delay: int = 60,
+                 keepalive: int = 60,
+                 payload_format: str = "json",
+                 batch_size: int = 10,
+                 batch_max_delay: float = 10.0,
+                 device_id: Optional[str] = None):
         """
         MQTT 클라이언트 초기화
         
@@ -31,16 +135,37 @@ class MQTTClient:
             username: MQTT 인증 사용자명 (선택사항)
             password: MQTT 인증 비밀번호 (선택사항)
             qos: Quality of Service 레벨 (0, 1, 2)
+            queue_size: 전송 큐 크기 (레코드 수)
+            drop_policy: 전송 큐가 가득 찼을 때 처리 방식 ('drop_oldest' 또는 'drop_newest')
+            reconnect_min_delay: 재연결 대기 시간 최소값 (초, 실패할 때마다 두 배로 증가)
+            reconnect_max_delay: 재연결 대기 시간 최대값 (초)
+            keepalive: MQTT keepalive 간격 (초)
+            payload_format: 'json' (레코드마다 JSON 메시지) 또는
+                            'binary' (batch_size개 레코드를 헤더 + 고정 길이 레코드로 묶은 메시지,
+                            형식은 mqtt_payload.py 참고)
+            batch_size: 바이너리 형식에서 한 메시지에 묶을 레코드 수
+            batch_max_delay: 바이너리 묶음이 다 차지 않아도 발행하는 최대 대기 시간 (초)
+            device_id: 바이너리 헤더에 넣을 장치 ID (None이면 호스트 이름,
+                       재시작해도 바뀌지 않아야 서버가 같은 장치로 묶을 수 있음)
         """
         self.broker_host = broker_host
         self.broker_port = broker_port
         self.topic = topic
         self.qos = qos
+        self.keepalive = keepalive
         self.connected = False
         
+        if payload_format not in PAYLOAD_FORMATS:
+            raise ValueError(f"지원하지 않는 payload_format: {payload_format} (사용 가능: {', '.join(PAYLOAD_FORMATS)})")
+        self.payload_format = payload_format
+        self.batch_size = max(1, min(batch_size, 65535))
+        self.batch_max_delay = batch_max_delay
+        self._batches = {}
+        
         # MQTT 클라이언트 생성
         if client_id is None:
             client_id = f"rppg_client_{int(time.time())}"
+        self.device_id = device_id or socket.gethostname()
         
         self.client = mqtt.Client(client_id=client_id)
         
@@ -48,22 +173,58 @@ class MQTTClient:
         if username and password:
             self.client.username_pw_set(username, password)
         
+        # 연결이 끊기면 paho 네트워크 스레드가 지수 백오프로 재연결
+        self.client.reconnect_delay_set(min_delay=reconnect_min_delay, max_delay=reconnect_max_delay)
+        
         # 콜백 함수 설정
         self.client.on_connect = self._on_connect
         self.client.on_disconnect = self._on_disconnect
         self.client.on_publish = self._on_publish
+        self.client.on_message = self._on_message
+        
+        # 구독 목록 {토픽 필터: 콜백} (재연결 시 다시 구독)
+        self.subscriptions = {}
+        
+        # 전송 큐와 전송 스레드
+        self.queue = OutboundQueue(maxsize=queue_size, drop_policy=drop_policy)
+        self._connected_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._publisher = None
+        self._loop_started = False
+        
+        # 원시 파형 채널 (enable_waveform()으로 활성화)
+        self.waveform_topic = None
+        self.waveform_chunk_duration = 1.0
+        self.waveform_scale = 1.0 / 64
+        self._waveform_timestamps = []
+        self._waveform_values = []
+        self.waveform_chunks = 0
+        
+        # 디스크 스풀 (enable_spool()로 활성화)
+        self.spool = None
+        self.drain_rate = 10.0
+        self.drain_burst = 5
         
         # 연결 상태 추적
         self.last_publish_time = None
         self.publish_count = 0
+        self.publish_failures = 0
+        self.enqueued_count = 0
+        self.sent_count = 0
+        self.spooled_count = 0
+        self.drained_count = 0
     
     def _on_connect(self, client, userdata, flags, rc):
         """연결 콜백"""
         if rc == 0:
             self.connected = True
+            self._connected_event.set()
             print(f"✅ MQTT 브로커에 연결되었습니다: {self.broker_host}:{self.broker_port}")
+            for topic_filter in self.subscriptions:
+                client.subscribe(topic_filter, qos=self.qos)
         else:
             self.connected = False
+            self._connected_event.clear()
             error_messages = {
                 1: "잘못된 프로토콜 버전",
                 2: "잘못된 클라이언트 식별자",
@@ -77,6 +238,7 @@ class MQTTClient:
     def _on_disconnect(self, client, userdata, rc):
         """연결 해제 콜백"""
         self.connected = False
+        self._connected_event.clear()
         if rc != 0:
             print(f"⚠️  MQTT 연결이 예기치 않게 끊어졌습니다. 재연결 시도 중...")
     
@@ -84,91 +246,395 @@ class MQTTClient:
         """발행 콜백"""
         self.publish_count += 1
     
+    def _on_message(self, client, userdata, msg):
+        """수신 콜백: 토픽 필터가 일치하는 구독 콜백 호출 (paho 네트워크 스레드)"""
+        for topic_filter, callback in self.subscriptions.items():
+            if mqtt.topic_matches_sub(topic_filter, msg.topic):
+                try:
+                    callback(msg.topic, msg.payload)
+                except Exception as e:
+                    print(f"⚠️  MQTT 메시지 처리 오류 ({msg.topic}): {e}")
+    
+    def subscribe(self, topic_filter: str, callback: Callable[[str, bytes], None]):
+        """
+        토픽 구독 (연결 전에 호출해도 되며, 재연결할 때마다 다시 구독)
+        
+        Args:
+            topic_filter: 구독할 토픽 필터 (+, # 와일드카드 사용 가능)
+            callback: callback(토픽, 페이로드 bytes), paho 네트워크 스레드에서 호출
+        """
+        self.subscriptions[topic_filter] = callback
+        if self.connected:
+            self.client.subscribe(topic_filter, qos=self.qos)
+    
     def connect(self, timeout: int = 5):
         """
-        MQTT 브로커에 연결
+        MQTT 브로커에 비동기로 연결 시작 (대기하지 않음)
+        
+        연결은 paho 네트워크 스레드에서 진행되고, 실패하거나 끊기면
+        reconnect_min_delay부터 reconnect_max_delay까지 두 배씩 늘려 가며 재연결합니다.
+        연결 전에 발행한 레코드는 전송 큐에 보관되었다가 연결되면 전송됩니다.
         
         Args:
-            timeout: 연결 타임아웃 (초)
+            timeout: 사용 안 함 (이전 버전 호환용)
             
         Returns:
-            연결 성공 여부
+            연결 시작 성공 여부
         """
         try:
-            print(f"MQTT 브로커 연결 중... ({self.broker_host}:{self.broker_port})")
-            self.client.connect(self.broker_host, self.broker_port, timeout)
-            self.client.loop_start()  # 백그라운드 스레드 시작
-            
-            # 연결 확인을 위해 잠시 대기
-            time.sleep(0.5)
-            
-            if self.connected:
-                return True
-            else:
-                print("⚠️  MQTT 연결에 실패했습니다. 데이터 전송 없이 계속 진행합니다.")
-                return False
+            print(f"MQTT 브로커 연결 시작... ({self.broker_host}:{self.broker_port})")
+            self.client.connect_async(self.broker_host, self.broker_port, self.keepalive)
+            self.client.loop_start()  # 백그라운드 네트워크 스레드 시작
+            self._loop_started = True
         except Exception as e:
             print(f"⚠️  MQTT 연결 오류: {e}")
             print("⚠️  MQTT 없이 프로그램을 계속 실행합니다.")
             return False
+        
+        self._stop_event.clear()
+        self._publisher = threading.Thread(target=self._publish_loop, name="mqtt-publisher", daemon=True)
+        self._publisher.start()
+        return True
     
-    def disconnect(self):
-        """MQTT 브로커 연결 해제"""
-        if self.connected:
-            self.client.loop_stop()
+    def disconnect(self, flush_timeout: float = 1.0):
+        """
+        MQTT 브로커 연결 해제
+        
+        Args:
+            flush_timeout: 남은 레코드 전송을 기다리는 최대 시간 (초)
+        """
+        if self._publisher is not None:
+            deadline = time.time() + flush_timeout
+            while self.connected and self.queue.qsize() > 0 and time.time() < deadline:
+                time.sleep(0.05)
+            self._stop_event.set()
+            self._connected_event.set()
+            self.queue.wake()
+            self._publisher.join(timeout=2.0)
+            self._publisher = None
+            
+            # 아직 묶음을 채우지 못한 바이너리 레코드 발행
+            if self.spool is None:
+                self._flush_expired_batches(force=True)
+        
+        # 보내지 못한 레코드는 다음 실행에서 전송하도록 스풀에 보관
+        if self.spool is not None:
+            while True:
+                item = self.queue.get(timeout=0)
+                if item is None:
+                    break
+                topic, kind, record = item
+                if kind == KIND_WAVEFORM:
+                    timestamps, values = record
+                    self.spool.append(topic, encode_waveform(timestamps, values, self.device_id,
+                                                             self.waveform_scale))
+                    self.spooled_count += 1
+                elif self.payload_format == "binary":
+                    self._batches.setdefault((topic, kind), (time.time(), []))[1].append(record)
+                else:
+                    self.spool.append(topic, encode_json(kind, record))
+                    self.spooled_count += 1
+            self._flush_expired_batches(force=True)
+            if len(self.spool) > 0:
+                print(f"📦 전송하지 못한 메시지 {len(self.spool)}개를 스풀에 보관했습니다: {self.spool.path}")
+            self.spool.close()
+            self.spool = None
+        
+        if self._loop_started:
             self.client.disconnect()
+            self.client.loop_stop()
+            self._loop_started = False
             self.connected = False
             print("MQTT 연결이 해제되었습니다.")
     
-    def publish_heart_rate(self, heart_rate: float, confidence: float = 0.0, 
-                          timestamp: Optional[float] = None):
+    def _enqueue(self, topic: str, kind: str, record: tuple) -> bool:
         """
-        심박수 데이터를 MQTT로 전송
+        발행할 레코드를 전송 큐에 추가 (측정 루프에서 호출, 대기하지 않음)
         
         Args:
-            heart_rate: 심박수 (BPM)
-            confidence: 신뢰도 (0.0-1.0)
-            timestamp: 타임스탬프 (None이면 현재 시간)
+            topic: 발행할 토픽
+            kind: 레코드 종류 (KIND_VITAL_SIGNS / KIND_HEART_RATE)
+            record: make_record() 결과 (직렬화는 전송 스레드에서 수행)
+            
+        Returns:
+            큐에 들어갔는지 여부
         """
-        if not self.connected:
+        if self._publisher is None:
             return False
         
-        if timestamp is None:
-            timestamp = time.time()
+        self.enqueued_count += 1
+        return self.queue.put((topic, kind, record))
+    
+    def enable_spool(self, path: str, max_records: int = 100000, max_bytes: int = 50 * 1024 * 1024,
+                     drain_rate: float = 10.0, drain_burst: int = 5):
+        """
+        연결이 끊긴 동안의 메시지를 디스크 스풀에 보관하고 재연결 후 나누어 전송 (connect() 전에 호출)
         
-        # JSON 메시지 생성
-        message = {
-            "heart_rate": round(heart_rate, 2),
-            "confidence": round(confidence, 3),
-            "timestamp": timestamp,
-            "datetime": datetime.fromtimestamp(timestamp).isoformat(),
-            "unit": "BPM"
-        }
+        Args:
+            path: 스풀 SQLite 파일 경로
+            max_records: 스풀에 보관할 최대 메시지 수 (넘으면 오래된 것부터 삭제)
+            max_bytes: 스풀에 보관할 최대 페이로드 크기 합계 (바이트)
+            drain_rate: 재연결 후 스풀 메시지 전송 속도 상한 (메시지/초, 실시간 메시지가 우선)
+            drain_burst: 연달아 보낼 수 있는 최대 스풀 메시지 수 (토큰 버킷 크기)
+        """
+        self.spool = MessageSpool(path, max_records=max_records, max_bytes=max_bytes)
+        self.drain_rate = drain_rate
+        self.drain_burst = max(1, drain_burst)
+        if len(self.spool) > 0:
+            print(f"📦 MQTT 스풀에 전송하지 못한 메시지 {len(self.spool)}개가 있습니다: {path}")
+    
+    def enable_waveform(self, topic: Optional[str] = None, chunk_duration: float = 1.0,
+                        scale: float = 1.0 / 64):
+        """
+        프레임별 ROI 색상 평균(원시 파형)을 별도 토픽으로 전송하는 채널 활성화
         
-        try:
-            result = self.client.publish(
-                self.topic,
-                json.dumps(message, ensure_ascii=False),
-                qos=self.qos
-            )
+        샘플은 chunk_duration초씩 모아 양자화 + 차분 부호화한 바이너리 메시지 하나로 보냅니다
+        (형식은 mqtt_payload.encode_waveform 참고).
+        
+        Args:
+            topic: 파형 토픽 (None이면 '{기본 토픽}/waveform')
+            chunk_duration: 메시지 하나에 담을 구간 길이 (초, MAX_WAVEFORM_TIME_DELTA 이하)
+            scale: 양자화 간격 (픽셀 값 단위, 작을수록 정밀하지만 데이터가 커짐)
+        """
+        if not 0 < chunk_duration <= MAX_WAVEFORM_TIME_DELTA:
+            raise ValueError(f"chunk_duration은 0 ~ {MAX_WAVEFORM_TIME_DELTA}초여야 합니다: {chunk_duration}")
+        self.waveform_topic = topic or f"{self.topic}/waveform"
+        self.waveform_chunk_duration = chunk_duration
+        self.waveform_scale = scale
+    
+    def publish_waveform_sample(self, timestamp: float, means) -> bool:
+        """
+        프레임 하나의 ROI 색상 평균 추가 (측정 루프에서 프레임마다 호출, 대기하지 않음)
+        
+        chunk_duration만큼 모이면 묶음 하나를 전송 큐에 넣습니다. 얼굴을 놓쳐 샘플이
+        chunk_duration보다 오래 끊겼거나 시각이 거꾸로 가면, 모아 둔 묶음을 먼저 보내고 새 묶음을 시작합니다.
+        
+        Args:
+            timestamp: 프레임 캡처 시각 (초)
+            means: ROI 채널 평균 (B, G, R), None이면 무시
             
-            if result.rc == mqtt.MQTT_ERR_SUCCESS:
-                self.last_publish_time = timestamp
-                return True
+        Returns:
+            이번 호출에서 묶음을 전송 큐에 넣었는지 여부
+        """
+        if self.waveform_topic is None or means is None:
+            return False
+        
+        queued = False
+        if self._waveform_timestamps:
+            gap = timestamp - self._waveform_timestamps[-1]
+            if gap < 0 or gap > self.waveform_chunk_duration:
+                queued = self._flush_waveform()
+        
+        self._waveform_timestamps.append(timestamp)
+        self._waveform_values.append(means)
+        
+        if timestamp - self._waveform_timestamps[0] < self.waveform_chunk_duration:
+            return queued
+        
+        return self._flush_waveform() or queued
+    
+    def _flush_waveform(self) -> bool:
+        """
+        모아 둔 파형 샘플을 묶음 하나로 전송 큐에 넣기
+        
+        Returns:
+            묶음이 전송 큐에 들어갔는지 여부
+        """
+        chunk = (self._waveform_timestamps, self._waveform_values)
+        self._waveform_timestamps = []
+        self._waveform_values = []
+        self.waveform_chunks += 1
+        return self._enqueue(self.waveform_topic, KIND_WAVEFORM, chunk)
+    
+    def _publish_loop(self):
+        """
+        전송 스레드: 큐의 레코드를 직렬화하여 발행
+        
+        연결되어 있으면 실시간 레코드를 먼저 보내고, 큐가 비어 있을 때만 스풀 메시지를
+        토큰 버킷(초당 drain_rate개, 최대 drain_burst개)으로 하나씩 보냅니다.
+        연결이 끊겨 있으면 레코드를 스풀에 보관하고,
+        스풀이 없으면 연결될 때까지 큐에 둡니다.
+        바이너리 형식이면 토픽별로 batch_size개씩(또는 batch_max_delay초마다) 묶어 한 메시지로 보냅니다.
+        """
+        drain_tokens = 0.0
+        last_refill = time.time()
+        while not self._stop_event.is_set():
+            if self.spool is None and not self.connected:
+                # 스풀이 없으면 재연결될 때까지 큐에 보관
+                self._connected_event.wait(timeout=0.5)
+                continue
+            
+            pending = self.spool is not None and len(self.spool) > 0
+            if pending and self.connected:
+                timeout = min(0.1, 1.0 / self.drain_rate)
             else:
-                print(f"⚠️  MQTT 발행 실패 (코드: {result.rc})")
-                return False
+                timeout = 0.1 if self._batches else 0.5
+            item = self.queue.get(timeout=timeout)
+            
+            if item is not None:
+                topic, kind, record = item
+                if kind == KIND_WAVEFORM:
+                    timestamps, values = record
+                    payload = encode_waveform(timestamps, values, self.device_id, self.waveform_scale)
+                    self._send_or_spool(topic, payload, timestamps[-1])
+                elif self.payload_format == "binary":
+                    # 묶음별 (시작 시각, 레코드 목록)
+                    _, batch = self._batches.setdefault((topic, kind), (time.time(), []))
+                    if len(batch) >= self.batch_size:
+                        # 이전 발행이 실패해 묶음이 차 있으면 전송 큐와 같은 정책으로 레코드를 버림
+                        self.queue.dropped += 1
+                        if self.queue.drop_policy == "drop_oldest":
+                            del batch[0]
+                            batch.append(record)
+                    else:
+                        batch.append(record)
+                    if len(batch) >= self.batch_size:
+                        self._flush_batch(topic, kind)
+                elif not self._send_or_spool(topic, encode_json(kind, record), record[0]):
+                    if not self.connected:
+                        self.queue.put_front(item)
+            
+            self._flush_expired_batches()
+            
+            # 토큰은 초당 drain_rate개씩 drain_burst개까지 쌓이고, 토큰 하나로 스풀 메시지 하나를 보냄
+            now = time.time()
+            drain_tokens = min(self.drain_burst, drain_tokens + (now - last_refill) * self.drain_rate)
+            last_refill = now
+            
+            # 실시간 레코드가 밀려 있지 않을 때만 스풀 전송 (발행 실패도 토큰 하나를 소모)
+            if pending and self.connected and self.queue.qsize() == 0 and drain_tokens >= 1:
+                drained = self._drain_spool(int(drain_tokens))
+                drain_tokens -= max(drained, 1)
+    
+    def _send_or_spool(self, topic: str, payload, timestamp: Optional[float] = None) -> bool:
+        """
+        페이로드를 발행하고, 실패하면 스풀에 보관 (전송 스레드)
+        
+        Args:
+            topic: 발행할 토픽
+            payload: 직렬화된 페이로드
+            timestamp: 마지막 레코드 타임스탬프
+            
+        Returns:
+            발행 또는 스풀 보관 성공 여부
+        """
+        if self.connected and self._publish_payload(topic, payload, timestamp):
+            return True
+        if self.spool is not None:
+            self.spool.append(topic, payload)
+            self.spooled_count += 1
+            return True
+        return False
+    
+    def _flush_batch(self, topic: str, kind: str):
+        """
+        묶어 둔 레코드를 바이너리 메시지 하나로 발행
+        (실패하고 스풀도 없으면 다음에 다시 시도하며, 그동안 묶음은 batch_size개를 넘지 않음)
+        
+        Args:
+            topic: 발행할 토픽
+            kind: 레코드 종류
+        """
+        _, records = self._batches.get((topic, kind), (None, None))
+        if not records:
+            return
+        
+        payload = encode_binary(kind, records, self.device_id)
+        if self._send_or_spool(topic, payload, records[-1][0]):
+            del self._batches[(topic, kind)]
+    
+    def _flush_expired_batches(self, force: bool = False):
+        """
+        batch_max_delay보다 오래 기다린 묶음 발행
+        
+        Args:
+            force: True이면 기다린 시간과 관계없이 모두 발행 (종료 시)
+        """
+        if not self._batches:
+            return
+        
+        now = time.time()
+        for (topic, kind), (started, _) in list(self._batches.items()):
+            if force or now - started >= self.batch_max_delay:
+                self._flush_batch(topic, kind)
+    
+    def _drain_spool(self, limit: int) -> int:
+        """
+        스풀에서 가장 오래된 메시지를 최대 limit개 전송하고 전송한 만큼 삭제 (전송 스레드)
+        
+        Args:
+            limit: 전송할 최대 메시지 수 (남은 토큰 수)
+            
+        Returns:
+            전송한 메시지 수
+        """
+        sent_ids = []
+        for record_id, topic, payload in self.spool.peek(limit):
+            if not self._publish_payload(topic, payload):
+                break
+            sent_ids.append(record_id)
+        
+        self.spool.remove(sent_ids)
+        self.drained_count += len(sent_ids)
+        return len(sent_ids)
+    
+    def _publish_payload(self, topic: str, payload, timestamp: Optional[float] = None) -> bool:
+        """
+        직렬화된 페이로드 하나를 발행 (전송 스레드)
+        
+        Args:
+            topic: 발행할 토픽
+            payload: 직렬화된 페이로드
+            timestamp: 메시지 타임스탬프 (last_publish_time 갱신용)
+            
+        Returns:
+            발행 성공 여부
+        """
+        try:
+            result = self.client.publish(topic, payload, qos=self.qos)
         except Exception as e:
+            self.publish_failures += 1
             print(f"⚠️  MQTT 발행 오류: {e}")
             return False
+        
+        if result.rc == mqtt.MQTT_ERR_SUCCESS:
+            self.sent_count += 1
+            if timestamp is not None:
+                self.last_publish_time = timestamp
+            return True
+        
+        self.publish_failures += 1
+        if result.rc != mqtt.MQTT_ERR_NO_CONN:
+            print(f"⚠️  MQTT 발행 실패 (코드: {result.rc})")
+        return False
+    
+    def publish_heart_rate(self, heart_rate: float, confidence: float = 0.0, 
+                          timestamp: Optional[float] = None):
+        """
+        심박수 데이터를 MQTT 전송 큐에 추가
+        
+        Args:
+            heart_rate: 심박수 (BPM)
+            confidence: 신뢰도 (0.0-1.0)
+            timestamp: 타임스탬프 (None이면 현재 시간)
+            
+        Returns:
+            전송 큐에 들어갔는지 여부
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        
+        return self._enqueue(self.topic, KIND_HEART_RATE,
+                             make_record(timestamp, float(heart_rate), float(confidence)))
     
     def publish_vital_signs(self, heart_rate: Optional[float] = None, 
                            respiration_rate: Optional[float] = None,
                            heart_confidence: float = 0.0,
                            respiration_confidence: float = 0.0,
-                           timestamp: Optional[float] = None):
+                           timestamp: Optional[float] = None,
+                           topic: Optional[str] = None):
         """
-        생체 신호 데이터(심박수, 호흡률)를 MQTT로 전송
+        생체 신호 데이터(심박수, 호흡률)를 MQTT 전송 큐에 추가
         심박수 신뢰도만 전송합니다.
         
         Args:
@@ -177,44 +643,22 @@ class MQTTClient:
             heart_confidence: 심박수 신뢰도 (0.0-1.0)
             respiration_confidence: 호흡률 신뢰도 (사용 안 함)
             timestamp: 타임스탬프 (None이면 현재 시간)
+            topic: 발행할 토픽 (None이면 기본 토픽, 카메라별 토픽 발행 시 사용)
+            
+        Returns:
+            전송 큐에 들어갔는지 여부
         """
-        if not self.connected:
-            return False
-        
         if timestamp is None:
             timestamp = time.time()
         
-        # JSON 메시지 생성
-        message = {
-            "timestamp": timestamp,
-            "datetime": datetime.fromtimestamp(timestamp).isoformat()
-        }
-        
-        if heart_rate is not None:
-            message["hr"] = round(heart_rate, 2)  # heart_rate → hr
-            message["q"] = round(heart_confidence, 4)  # heart_rate_confidence → q (심박수 신뢰도만)
-            message["hr_unit"] = "BPM"
-        
-        if respiration_rate is not None:
-            message["rr"] = round(respiration_rate, 2)  # respiration_rate → rr
-            message["rr_unit"] = "RPM"
-        
-        try:
-            result = self.client.publish(
-                self.topic,
-                json.dumps(message, ensure_ascii=False),
-                qos=self.qos
-            )
-            
-            if result.rc == mqtt.MQTT_ERR_SUCCESS:
-                self.last_publish_time = timestamp
-                return True
-            else:
-                print(f"⚠️  MQTT 발행 실패 (코드: {result.rc})")
-                return False
-        except Exception as e:
-            print(f"⚠️  MQTT 발행 오류: {e}")
-            return False
+        # 메시지 직렬화(JSON / 바이너리)는 전송 스레드에서 수행
+        record = make_record(
+            timestamp,
+            float(heart_rate) if heart_rate is not None else None,
+            float(heart_confidence),
+            float(respiration_rate) if respiration_rate is not None else None
+        )
+        return self._enqueue(topic or self.topic, KIND_VITAL_SIGNS, record)
     
     def get_status(self):
         """MQTT 연결 상태 반환"""
@@ -223,6 +667,16 @@ class MQTTClient:
             "broker": f"{self.broker_host}:{self.broker_port}",
             "topic": self.topic,
             "publish_count": self.publish_count,
+            "publish_failures": self.publish_failures,
+            "enqueued": self.enqueued_count,
+            "sent": self.sent_count,
+            "dropped": self.queue.dropped,
+            "queue_depth": self.queue.qsize(),
+            "spooled": self.spooled_count,
+            "drained": self.drained_count,
+            "spool_depth": len(self.spool) if self.spool is not None else 0,
+            "spool_evicted": self.spool.evicted if self.spool is not None else 0,
+            "waveform_chunks": self.waveform_chunks,
             "last_publish": self.last_publish_time
         }
 
@@ -285,18 +739,54 @@ def create_mqtt_client_from_config(config_path: str = "mqtt_config.json") -> Opt
     # 토픽 설정
     topic_config = config.get("topic", {})
     topic_name = topic_config.get("name", "rppg/vital_signs")
+    payload_format = topic_config.get("format", "json")
+    batch_config = config.get("batch", {})
     
     # QoS 설정
     qos = config.get("qos", 0)
     
-    return MQTTClient(
+    # 전송 큐 / 재연결 설정
+    queue_config = config.get("queue", {})
+    reconnect_config = config.get("reconnect", {})
+    
+    client = MQTTClient(
         broker_host=broker_host,
         broker_port=broker_port,
         topic=topic_name,
         username=username,
         password=password,
-        qos=qos
+        qos=qos,
+        queue_size=queue_config.get("size", 100),
+        drop_policy=queue_config.get("drop_policy", "drop_oldest"),
+        reconnect_min_delay=reconnect_config.get("min_delay", 1),
+        reconnect_max_delay=reconnect_config.get("max_delay", 60),
+        payload_format=payload_format,
+        batch_size=batch_config.get("size", 10),
+        batch_max_delay=batch_config.get("max_delay", 10.0),
+        device_id=config.get("device_id")
     )
+    
+    # 원시 파형 채널 설정
+    waveform_config = config.get("waveform", {})
+    if waveform_config.get("enabled", False):
+        client.enable_waveform(
+            topic=waveform_config.get("topic"),
+            chunk_duration=waveform_config.get("chunk_duration", 1.0),
+            scale=waveform_config.get("scale", 1.0 / 64)
+        )
+    
+    # 디스크 스풀 설정 (path가 있을 때만 사용)
+    spool_config = config.get("spool", {})
+    if spool_config.get("path"):
+        client.enable_spool(
+            spool_config["path"],
+            max_records=spool_config.get("max_records", 100000),
+            max_bytes=spool_config.get("max_bytes", 50 * 1024 * 1024),
+            drain_rate=spool_config.get("drain_rate", 10.0),
+            drain_burst=spool_config.get("burst", 5)
+        )
+    
+    return client
 
 
 def create_mqtt_client_from_env():
@@ -310,6 +800,8 @@ def create_mqtt_client_from_env():
         MQTT_USERNAME: 사용자명 (선택사항)
         MQTT_PASSWORD: 비밀번호 (선택사항)
         MQTT_ENABLED: MQTT 사용 여부 (true/false, 기본값: false)
+        MQTT_SPOOL_PATH: 연결이 끊긴 동안의 메시지를 보관할 스풀 파일 경로 (선택사항)
+        MQTT_DEVICE_ID: 장치 ID (기본값: 호스트 이름)
     
     Returns:
         MQTTClient 인스턴스 또는 None
@@ -324,12 +816,20 @@ def create_mqtt_client_from_env():
     topic = os.getenv("MQTT_TOPIC", "rppg/heart_rate")
     username = os.getenv("MQTT_USERNAME", None)
     password = os.getenv("MQTT_PASSWORD", None)
+    spool_path = os.getenv("MQTT_SPOOL_PATH", None)
+    device_id = os.getenv("MQTT_DEVICE_ID", None)
     
-    return MQTTClient(
+    client = MQTTClient(
         broker_host=broker_host,
         broker_port=broker_port,
         topic=topic,
         username=username,
-        password=password
+        password=password,
+        device_id=device_id
     )
+    
+    if spool_path:
+        client.enable_spool(spool_path)
+    
+    return client
 
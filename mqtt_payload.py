@@ -0,0 +1,252 @@
+"""
+MQTT 페이로드 인코딩
+측정 레코드를 기존 JSON 메시지 또는 여러 레코드를 묶은 고정 길이 바이너리 메시지로 변환합니다.
+
+바이너리 메시지 구조 (리틀 엔디언):
+    헤더: 매직 b'RP' (2), 스키마 버전 (uint8), 레코드 종류 (uint8),
+          레코드 수 (uint16), 장치 ID 길이 (uint8), 장치 ID (UTF-8)
+    레코드 (20바이트씩): 타임스탬프 (float64), 심박수 (float32), 심박수 신뢰도 (float32), 호흡률 (float32)
+    값이 없으면 NaN으로 기록합니다.
+
+파형 메시지 구조 (리틀 엔디언, 프레임별 ROI BGR 평균):
+    헤더: 매직 b'RW' (2), 스키마 버전 (uint8), 플래그 (uint8, bit0 = zlib 압축), 채널 수 (uint8),
+          샘플 수 (uint16), 장치 ID 길이 (uint8), 첫 샘플 시각 (float64), 양자화 간격 (float32), 장치 ID (UTF-8)
+    본문 (플래그에 따라 zlib 압축):
+        시각 차분 (uint16 ms, 샘플 수 - 1개, 샘플 간격은 0 ~ MAX_WAVEFORM_TIME_DELTA초)
+        첫 샘플 (int32, 채널 수개)
+        샘플 차분 (int16, (샘플 수 - 1) x 채널 수개)
+"""
+
+import json
+import math
+import struct
+import zlib
+from datetime import datetime
+
+import numpy as np
+
+
+PAYLOAD_FORMATS = ("json", "binary")
+
+MAGIC = b"RP"
+SCHEMA_VERSION = 1
+
+# 레코드 종류
+KIND_VITAL_SIGNS = "vital_signs"
+KIND_HEART_RATE = "heart_rate"
+KIND_CODES = {KIND_VITAL_SIGNS: 1, KIND_HEART_RATE: 2}
+
+HEADER = struct.Struct("<2sBBHB")
+RECORD = struct.Struct("<dfff")
+
+# 파형
+KIND_WAVEFORM = "waveform"
+WAVEFORM_MAGIC = b"RW"
+WAVEFORM_HEADER = struct.Struct("<2sBBBHBdf")
+WAVEFORM_COMPRESSED = 0x01
+# 0-255 범위 평균값의 차분이 int16에 항상 들어가도록 하는 최소 양자화 간격
+MIN_WAVEFORM_SCALE = 255.0 / 32767
+# uint16 ms 시각 차분으로 표현할 수 있는 최대 샘플 간격 (초)
+MAX_WAVEFORM_TIME_DELTA = 65.535
+
+
+def make_record(timestamp, heart_rate=None, heart_confidence=0.0, respiration_rate=None):
+    """
+    전송 큐에 넣을 측정 레코드 생성 (직렬화는 전송 스레드에서 수행)
+
+    Args:
+        timestamp: 타임스탬프 (초)
+        heart_rate: 심박수 (BPM)
+        heart_confidence: 심박수 신뢰도
+        respiration_rate: 호흡률 (RPM)
+
+    Returns:
+        (timestamp, heart_rate, heart_confidence, respiration_rate) 튜플
+    """
+    return (timestamp, heart_rate, heart_confidence, respiration_rate)
+
+
+def encode_json(kind, record):
+    """
+    레코드를 기존 JSON 메시지 형식으로 변환
+
+    Args:
+        kind: KIND_VITAL_SIGNS 또는 KIND_HEART_RATE
+        record: make_record() 결과
+
+    Returns:
+        JSON 문자열
+    """
+    timestamp, heart_rate, heart_confidence, respiration_rate = record
+
+    if kind == KIND_HEART_RATE:
+        message = {
+            "heart_rate": round(heart_rate, 2),
+            "confidence": round(heart_confidence, 3),
+            "timestamp": timestamp,
+            "datetime": datetime.fromtimestamp(timestamp).isoformat(),
+            "unit": "BPM"
+        }
+        return json.dumps(message, ensure_ascii=False)
+
+    message = {
+        "timestamp": timestamp,
+        "datetime": datetime.fromtimestamp(timestamp).isoformat()
+    }
+
+    if heart_rate is not None:
+        message["hr"] = round(heart_rate, 2)  # heart_rate → hr
+        message["q"] = round(heart_confidence, 4)  # heart_rate_confidence → q (심박수 신뢰도만)
+        message["hr_unit"] = "BPM"
+
+    if respiration_rate is not None:
+        message["rr"] = round(respiration_rate, 2)  # respiration_rate → rr
+        message["rr_unit"] = "RPM"
+
+    return json.dumps(message, ensure_ascii=False)
+
+
+def encode_binary(kind, records, device_id=""):
+    """
+    여러 레코드를 바이너리 메시지 하나로 묶기
+
+    Args:
+        kind: KIND_VITAL_SIGNS 또는 KIND_HEART_RATE
+        records: make_record() 결과 목록 (최대 65535개)
+        device_id: 장치 ID (UTF-8 최대 255바이트)
+
+    Returns:
+        bytes
+    """
+    device = device_id.encode("utf-8")[:255]
+    nan = float("nan")
+
+    parts = [HEADER.pack(MAGIC, SCHEMA_VERSION, KIND_CODES[kind], len(records), len(device)), device]
+    for timestamp, heart_rate, heart_confidence, respiration_rate in records:
+        parts.append(RECORD.pack(
+            timestamp,
+            heart_rate if heart_rate is not None else nan,
+            heart_confidence if heart_rate is not None else nan,
+            respiration_rate if respiration_rate is not None else nan
+        ))
+    return b"".join(parts)
+
+
+def decode_binary(payload):
+    """
+    바이너리 메시지 해석 (수신 측 / 디버깅용)
+
+    Args:
+        payload: encode_binary() 결과
+
+    Returns:
+        {"version", "kind", "device_id", "records": [{"timestamp", "hr", "q", "rr"}, ...]}
+    """
+    magic, version, kind_code, count, device_length = HEADER.unpack_from(payload, 0)
+    if magic != MAGIC:
+        raise ValueError("rPPG 바이너리 페이로드가 아닙니다")
+    if version != SCHEMA_VERSION:
+        raise ValueError(f"지원하지 않는 스키마 버전: {version}")
+
+    offset = HEADER.size
+    device_id = payload[offset:offset + device_length].decode("utf-8")
+    offset += device_length
+
+    kinds = {code: kind for kind, code in KIND_CODES.items()}
+    records = []
+    for timestamp, heart_rate, heart_confidence, respiration_rate in RECORD.iter_unpack(
+            payload[offset:offset + count * RECORD.size]):
+        records.append({
+            "timestamp": timestamp,
+            "hr": None if math.isnan(heart_rate) else heart_rate,
+            "q": None if math.isnan(heart_confidence) else heart_confidence,
+            "rr": None if math.isnan(respiration_rate) else respiration_rate
+        })
+
+    return {"version": version, "kind": kinds.get(kind_code), "device_id": device_id, "records": records}
+
+
+def encode_waveform(timestamps, values, device_id="", scale=1.0 / 64, compress=True):
+    """
+    프레임별 ROI 색상 평균 묶음을 양자화 + 차분 부호화
+
+    Args:
+        timestamps: 샘플 시각 목록 (초)
+        values: 샘플별 채널 평균 목록 (N x 채널, 보통 BGR 3채널)
+        device_id: 장치 ID (UTF-8 최대 255바이트)
+        scale: 양자화 간격 (픽셀 값 단위, MIN_WAVEFORM_SCALE 이상)
+        compress: zlib 압축 여부
+
+    Returns:
+        bytes
+
+    Raises:
+        ValueError: 샘플 시각이 거꾸로 가거나 간격이 MAX_WAVEFORM_TIME_DELTA초를 넘는 경우
+    """
+    scale = max(float(scale), MIN_WAVEFORM_SCALE)
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64).reshape(len(timestamps), -1)
+    count, channels = values.shape
+
+    # 시각: 첫 샘플 기준 ms 오프셋을 정수화한 뒤 차분 (누적 오차 없음)
+    offsets = np.round((timestamps - timestamps[0]) * 1000.0).astype(np.int64)
+    time_deltas = np.diff(offsets)
+    if len(time_deltas) > 0 and (time_deltas.min() < 0 or time_deltas.max() > 65535):
+        raise ValueError(f"파형 샘플 간격은 0 ~ {MAX_WAVEFORM_TIME_DELTA}초여야 합니다 "
+                         f"(최소 {time_deltas.min() / 1000.0:.3f}초, 최대 {time_deltas.max() / 1000.0:.3f}초)")
+    time_deltas = time_deltas.astype('<u2')
+
+    # 값: 양자화한 뒤 첫 샘플은 절대값, 나머지는 직전 샘플과의 차분
+    quantized = np.round(values / scale).astype(np.int64)
+    first = quantized[0].astype('<i4')
+    value_deltas = np.clip(np.diff(quantized, axis=0), -32768, 32767).astype('<i2')
+
+    body = time_deltas.tobytes() + first.tobytes() + value_deltas.tobytes()
+    flags = 0
+    if compress:
+        body = zlib.compress(body)
+        flags |= WAVEFORM_COMPRESSED
+
+    device = device_id.encode("utf-8")[:255]
+    header = WAVEFORM_HEADER.pack(WAVEFORM_MAGIC, SCHEMA_VERSION, flags, channels, count,
+                                  len(device), float(timestamps[0]), scale)
+    return header + device + body
+
+
+def decode_waveform(payload):
+    """
+    파형 메시지 해석
+
+    Args:
+        payload: encode_waveform() 결과
+
+    Returns:
+        {"version", "device_id", "timestamps": (N,) 배열, "values": (N, 채널) 배열}
+    """
+    magic, version, flags, channels, count, device_length, t0, scale = WAVEFORM_HEADER.unpack_from(payload, 0)
+    if magic != WAVEFORM_MAGIC:
+        raise ValueError("rPPG 파형 페이로드가 아닙니다")
+    if version != SCHEMA_VERSION:
+        raise ValueError(f"지원하지 않는 스키마 버전: {version}")
+
+    offset = WAVEFORM_HEADER.size
+    device_id = payload[offset:offset + device_length].decode("utf-8")
+    body = payload[offset + device_length:]
+    if flags & WAVEFORM_COMPRESSED:
+        body = zlib.decompress(body)
+
+    time_size = 2 * (count - 1)
+    first_size = 4 * channels
+    time_deltas = np.frombuffer(body, dtype='<u2', count=count - 1)
+    first = np.frombuffer(body, dtype='<i4', count=channels, offset=time_size)
+    value_deltas = np.frombuffer(body, dtype='<i2', offset=time_size + first_size).reshape(count - 1, channels)
+
+    offsets = np.concatenate(([0], np.cumsum(time_deltas, dtype=np.int64)))
+    quantized = np.vstack((first, first + np.cumsum(value_deltas, axis=0, dtype=np.int64)))
+
+    return {
+        "version": version,
+        "device_id": device_id,
+        "timestamps": t0 + offsets / 1000.0,
+        "values": quantized * float(scale)
+    }
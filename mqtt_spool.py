@@ -0,0 +1,124 @@
+"""
+MQTT 메시지 저장 후 전송(store-and-forward) 스풀
+브로커에 연결되지 않은 동안의 메시지를 SQLite(WAL 모드) 파일에 보관하고,
+재연결 후 전송 스레드가 일정 속도로 나누어 전송할 수 있도록 오래된 순서로 꺼내 줍니다.
+용량 상한을 넘으면 가장 오래된 메시지부터 지웁니다.
+"""
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+
+class MessageSpool:
+    def __init__(self, path, max_records=100000, max_bytes=50 * 1024 * 1024):
+        """
+        디스크 스풀 열기 (파일이 없으면 생성)
+
+        Args:
+            path: SQLite 파일 경로
+            max_records: 보관할 최대 메시지 수
+            max_bytes: 보관할 최대 페이로드 크기 합계 (바이트)
+        """
+        self.path = Path(path)
+        self.max_records = max_records
+        self.max_bytes = max_bytes
+        self.evicted = 0
+        self._lock = threading.Lock()
+
+        if self.path.parent and not self.path.parent.exists():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        # 측정 루프 / 전송 스레드 / 메트릭 스레드가 함께 쓰므로 잠금으로 직렬화
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS spool ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "topic TEXT NOT NULL, "
+            "payload BLOB NOT NULL, "
+            "size INTEGER NOT NULL, "
+            "created REAL NOT NULL)"
+        )
+
+        # 매번 COUNT / SUM 쿼리를 하지 않도록 개수와 크기를 메모리에 유지
+        self._count, self._bytes = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM spool").fetchone()
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def size_bytes(self):
+        """보관 중인 페이로드 크기 합계 (바이트)"""
+        return self._bytes
+
+    def append(self, topic, payload):
+        """
+        메시지 하나 보관 (상한을 넘으면 가장 오래된 메시지부터 삭제)
+
+        Args:
+            topic: 발행할 토픽
+            payload: 직렬화된 페이로드 (str 또는 bytes)
+        """
+        size = len(payload)
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO spool (topic, payload, size, created) VALUES (?, ?, ?, ?)",
+                (topic, payload, size, time.time())
+            )
+            self._count += 1
+            self._bytes += size
+            self._evict()
+
+    def _evict(self):
+        """상한을 넘은 만큼 가장 오래된 메시지 삭제 (잠금 안에서 호출)"""
+        while self._count > self.max_records or (self._bytes > self.max_bytes and self._count > 1):
+            excess = max(self._count - self.max_records, 1)
+            rows = self._conn.execute(
+                "SELECT id, size FROM spool ORDER BY id LIMIT ?", (excess,)).fetchall()
+            if not rows:
+                break
+            self._conn.execute("DELETE FROM spool WHERE id <= ?", (rows[-1][0],))
+            self._count -= len(rows)
+            self._bytes -= sum(size for _, size in rows)
+            self.evicted += len(rows)
+
+    def peek(self, limit=50):
+        """
+        가장 오래된 메시지부터 limit개 조회 (삭제하지 않음)
+
+        Args:
+            limit: 최대 개수
+
+        Returns:
+            [(id, 토픽, 페이로드)] 목록
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, topic, payload FROM spool ORDER BY id LIMIT ?", (limit,)).fetchall()
+
+    def remove(self, ids):
+        """
+        전송한 메시지 삭제
+
+        Args:
+            ids: peek()로 받은 id 목록
+        """
+        if not ids:
+            return
+        with self._lock:
+            placeholders = ",".join("?" * len(ids))
+            removed = self._conn.execute(
+                f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM spool WHERE id IN ({placeholders})",
+                ids).fetchone()
+            self._conn.execute(f"DELETE FROM spool WHERE id IN ({placeholders})", ids)
+            self._count -= removed[0]
+            self._bytes -= removed[1]
+
+    def close(self):
+        """파일 닫기"""
+        with self._lock:
+            self._conn.close()
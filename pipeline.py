@@ -0,0 +1,299 @@
+"""
+rPPG 스레드 파이프라인
+캡처 스레드 → 분석 워커 → 표시/출력(호출 스레드)을 크기가 제한된 큐로 연결합니다.
+캡처는 항상 최신 프레임만 유지하고 밀린 프레임은 버리며(drop) 개수를 집계합니다.
+"""
+
+import queue
+import threading
+import time
+
+
+class LatestQueue:
+    def __init__(self, maxsize=1):
+        """
+        크기가 제한된 큐 초기화 (가득 차면 가장 오래된 항목을 버림)
+
+        Args:
+            maxsize: 최대 항목 수
+        """
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def put(self, item):
+        """
+        항목 추가 (가득 찬 경우 가장 오래된 항목을 버리고 추가)
+
+        Args:
+            item: 추가할 항목
+        """
+        with self._lock:
+            while True:
+                try:
+                    self._queue.put_nowait(item)
+                    return
+                except queue.Full:
+                    try:
+                        self._queue.get_nowait()
+                        self.dropped += 1
+                    except queue.Empty:
+                        pass
+
+    def get(self, timeout=None):
+        """
+        항목 꺼내기
+
+        Args:
+            timeout: 대기 시간 (초, None이면 무한 대기)
+
+        Returns:
+            항목, 시간 초과 시 None
+        """
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def qsize(self):
+        """현재 항목 수"""
+        return self._queue.qsize()
+
+
+class FrameResult:
+    def __init__(self, frame_id, capture_time, frame, roi_points, signal_value,
+                 vitals=None, effective_fps=None):
+        """
+        분석 워커가 표시/출력 단계로 넘기는 프레임 처리 결과
+
+        Args:
+            frame_id: 캡처 순번
+            capture_time: 프레임 캡처 시각 (초)
+            frame: 처리된 프레임
+            roi_points: ROI 포인트
+            signal_value: 현재 신호 값
+            vitals: ((심박수, 신뢰도), (호흡률, 신뢰도)), 직전 결과 이후 새로 계산되지 않았으면 None
+                    (RPPGPipeline.get_result가 워커의 최신 값을 붙임)
+            effective_fps: 측정된 유효 샘플링 주파수 (vitals가 있을 때만 설정)
+        """
+        self.frame_id = frame_id
+        self.capture_time = capture_time
+        self.frame = frame
+        self.roi_points = roi_points
+        self.signal_value = signal_value
+        self.vitals = vitals
+        self.effective_fps = effective_fps
+
+
+class CaptureThread(threading.Thread):
+    def __init__(self, cap, output_queue, max_failures=10):
+        """
+        카메라 캡처 스레드 초기화
+
+        카메라의 기본 속도로 계속 읽어 최신 프레임만 출력 큐에 넣고,
+        프레임마다 정확한 캡처 시각을 함께 전달합니다.
+
+        Args:
+            cap: cv2.VideoCapture 객체
+            output_queue: 최신 프레임을 넣을 LatestQueue
+            max_failures: 연속 읽기 실패 허용 횟수 (초과 시 스레드 종료)
+        """
+        super().__init__(name="rppg-capture", daemon=True)
+        self.cap = cap
+        self.output_queue = output_queue
+        self.max_failures = max_failures
+        self.stop_event = threading.Event()
+
+        self.captured_frames = 0
+        self.failed = False
+
+    @property
+    def dropped_frames(self):
+        """분석이 따라가지 못해 버려진 프레임 수"""
+        return self.output_queue.dropped
+
+    def run(self):
+        consecutive_failures = 0
+        while not self.stop_event.is_set():
+            ret, frame = self.cap.read()
+            capture_time = time.time()
+
+            if not ret:
+                consecutive_failures += 1
+                if consecutive_failures >= self.max_failures:
+                    self.failed = True
+                    break
+                # 일시적 오류는 무시하고 계속 시도
+                time.sleep(0.1)
+                continue
+
+            consecutive_failures = 0
+            self.captured_frames += 1
+            self.output_queue.put((self.captured_frames, capture_time, frame))
+
+    def stop(self):
+        """캡처 중지 요청"""
+        self.stop_event.set()
+
+
+class AnalysisWorker(threading.Thread):
+    def __init__(self, detector, input_queue, output_queue, update_interval=1.0, sample_callback=None):
+        """
+        분석 워커 스레드 초기화
+
+        최신 프레임을 꺼내 ROI 신호를 추출하고 캡처 시각과 함께 버퍼에 추가하며,
+        update_interval마다 심박수/호흡률을 계산합니다.
+
+        Args:
+            detector: RPPGDetector 인스턴스 (dlib / MediaPipe)
+            input_queue: 캡처 스레드의 LatestQueue
+            output_queue: 표시/출력 단계로 결과를 넘길 LatestQueue
+            update_interval: 심박수/호흡률 계산 간격 (초)
+            sample_callback: 신호를 얻은 프레임마다 (캡처 시각, ROI 채널 평균)으로 호출할 함수 (선택)
+        """
+        super().__init__(name="rppg-analysis", daemon=True)
+        self.detector = detector
+        self.input_queue = input_queue
+        self.output_queue = output_queue
+        self.update_interval = update_interval
+        self.sample_callback = sample_callback
+        self.stop_event = threading.Event()
+
+        self.processed_frames = 0
+        self.detected_frames = 0
+        self.error = None
+
+        # 최신 심박수/호흡률은 버려질 수 있는 프레임 결과가 아닌 별도 필드에 보관
+        self._vitals_lock = threading.Lock()
+        self._latest_vitals = None
+
+    def run(self):
+        last_update_time = None
+        try:
+            while not self.stop_event.is_set():
+                item = self.input_queue.get(timeout=0.1)
+                if item is None:
+                    continue
+
+                frame_id, capture_time, frame = item
+                processed_frame, roi_points, signal_value = self.detector.process_frame(frame, capture_time)
+
+                if signal_value is not None:
+                    self.detector.add_signal(signal_value, capture_time,
+                                             roi_values=self.detector.last_roi_values)
+                    self.detected_frames += 1
+                    if self.sample_callback is not None:
+                        self.sample_callback(capture_time, self.detector.last_roi_means)
+                self.processed_frames += 1
+
+                if last_update_time is None or capture_time - last_update_time >= self.update_interval:
+                    vitals = self.detector.calculate_vitals()
+                    effective_fps = self.detector.get_effective_fps()
+                    with self._vitals_lock:
+                        self._latest_vitals = (vitals, effective_fps)
+                    last_update_time = capture_time
+
+                self.output_queue.put(FrameResult(frame_id, capture_time, processed_frame,
+                                                  roi_points, signal_value))
+        except Exception as e:
+            self.error = e
+
+    def take_vitals(self):
+        """
+        아직 가져가지 않은 최신 심박수/호흡률 꺼내기
+
+        결과 큐에서 프레임이 버려져도 계산된 값은 유지되며, 다음 결과를 받을 때 전달됩니다.
+
+        Returns:
+            (vitals, effective_fps), 새로 계산된 값이 없으면 None
+        """
+        with self._vitals_lock:
+            latest, self._latest_vitals = self._latest_vitals, None
+        return latest
+
+    def stop(self):
+        """분석 중지 요청"""
+        self.stop_event.set()
+
+
+class RPPGPipeline:
+    def __init__(self, cap, detector, update_interval=1.0, max_failures=10, result_queue_size=2,
+                 sample_callback=None):
+        """
+        캡처 / 분석 / 표시·출력 3단계 파이프라인 초기화
+
+        표시·출력 단계(cv2.imshow, MQTT 전송)는 GUI 제약 때문에 호출 스레드에서
+        get_result()로 결과를 받아 수행합니다.
+
+        Args:
+            cap: cv2.VideoCapture 객체
+            detector: RPPGDetector 인스턴스
+            update_interval: 심박수/호흡률 계산 간격 (초)
+            max_failures: 연속 캡처 실패 허용 횟수
+            result_queue_size: 표시 단계로 넘기는 결과 큐 크기
+            sample_callback: 신호를 얻은 프레임마다 (캡처 시각, ROI 채널 평균)으로 호출할 함수
+                             (분석 스레드에서 호출, 예: MQTTClient.publish_waveform_sample)
+        """
+        self.frame_queue = LatestQueue(maxsize=1)
+        self.result_queue = LatestQueue(maxsize=result_queue_size)
+        self.capture = CaptureThread(cap, self.frame_queue, max_failures)
+        self.worker = AnalysisWorker(detector, self.frame_queue, self.result_queue, update_interval,
+                                     sample_callback)
+
+    def start(self):
+        """캡처 스레드와 분석 워커 시작"""
+        self.capture.start()
+        self.worker.start()
+
+    def stop(self, timeout=2.0):
+        """
+        파이프라인 중지 및 스레드 종료 대기
+
+        Args:
+            timeout: 스레드별 종료 대기 시간 (초)
+        """
+        self.capture.stop()
+        self.worker.stop()
+        self.capture.join(timeout)
+        self.worker.join(timeout)
+
+    def is_running(self):
+        """캡처와 분석이 모두 동작 중인지 여부"""
+        return self.capture.is_alive() and self.worker.is_alive()
+
+    def get_result(self, timeout=None):
+        """
+        분석 결과 하나 꺼내기 (표시/출력 단계)
+
+        직전 호출 이후 새로 계산된 심박수/호흡률이 있으면 결과에 붙여 반환하므로,
+        표시 단계가 밀려 결과 큐에서 프레임이 버려져도 측정값은 잃지 않습니다.
+
+        Args:
+            timeout: 대기 시간 (초)
+
+        Returns:
+            FrameResult, 시간 초과 시 None
+        """
+        result = self.result_queue.get(timeout=timeout)
+        if result is None:
+            return None
+
+        latest = self.worker.take_vitals()
+        if latest is not None:
+            result.vitals, result.effective_fps = latest
+        return result
+
+    def get_stats(self):
+        """
+        파이프라인 통계 반환
+
+        Returns:
+            캡처/처리/얼굴 감지 프레임 수, 버려진 프레임 수 딕셔너리
+        """
+        return {
+            "captured_frames": self.capture.captured_frames,
+            "processed_frames": self.worker.processed_frames,
+            "detected_frames": self.worker.detected_frames,
+            "dropped_frames": self.capture.dropped_frames,
+            "dropped_results": self.result_queue.dropped
+        }
@@ -0,0 +1,139 @@
+"""
+ROI 유틸리티
+얼굴 ROI 다각형 영역의 평균 색상을 프레임 전체가 아닌 ROI 크기에 비례하는 비용으로 추출합니다.
+"""
+
+import cv2
+import numpy as np
+
+
+def clip_bounding_rect(points, frame_shape):
+    """
+    다각형의 외접 사각형을 프레임 경계 안으로 자름
+
+    Args:
+        points: 다각형 포인트 배열 (N x 2, int32)
+        frame_shape: 프레임 shape
+
+    Returns:
+        (x0, y0, x1, y1) 또는 영역이 비어 있으면 None
+    """
+    x, y, w, h = cv2.boundingRect(points)
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + w, frame_shape[1]), min(y + h, frame_shape[0])
+
+    if x1 <= x0 or y1 <= y0:
+        return None
+
+    return x0, y0, x1, y1
+
+
+class ROIExtractor:
+    def __init__(self):
+        """
+        ROI 평균 색상 추출기 초기화
+
+        다각형의 외접 사각형만 잘라낸 뒤 그 크기의 마스크만 래스터화하고,
+        cv2.mean 한 번으로 세 채널 평균을 계산합니다. 마스크 버퍼는 크기가 같으면 재사용합니다.
+        """
+        self._mask = None
+
+    def _get_mask(self, height, width):
+        """크기가 같으면 캐시된 마스크 버퍼를 재사용하여 0으로 초기화"""
+        if self._mask is None or self._mask.shape != (height, width):
+            self._mask = np.zeros((height, width), dtype=np.uint8)
+        else:
+            self._mask.fill(0)
+        return self._mask
+
+    def extract_means(self, frame, roi_points):
+        """
+        ROI 다각형 영역의 채널별 평균 색상 추출
+
+        Args:
+            frame: 비디오 프레임 (BGR)
+            roi_points: ROI 포인트 (N x 2, int32)
+
+        Returns:
+            (B, G, R) 평균값 튜플, ROI가 비어 있으면 None
+        """
+        if roi_points is None or len(roi_points) < 3:
+            return None
+
+        rect = clip_bounding_rect(roi_points, frame.shape)
+        if rect is None:
+            return None
+        x0, y0, x1, y1 = rect
+
+        # 외접 사각형 크기만큼만 마스크 래스터화 (좌표를 crop 기준으로 이동)
+        crop = frame[y0:y1, x0:x1]
+        mask = self._get_mask(y1 - y0, x1 - x0)
+        cv2.fillPoly(mask, [roi_points - np.array([x0, y0], dtype=roi_points.dtype)], 255)
+
+        if cv2.countNonZero(mask) == 0:
+            return None
+
+        b, g, r, _ = cv2.mean(crop, mask=mask)
+        return b, g, r
+
+
+class MultiROIExtractor:
+    def __init__(self):
+        """
+        다중 ROI 평균 색상 추출기 초기화
+
+        모든 ROI의 합집합 외접 사각형 크기의 레이블 이미지 하나에 ROI별 번호를 래스터화하고,
+        np.bincount 한 번으로 ROI별 (B, G, R) 평균을 계산합니다.
+        레이블 버퍼는 크기가 같으면 재사용합니다.
+        """
+        self._labels = None
+
+    def _get_labels(self, height, width):
+        """크기가 같으면 캐시된 레이블 버퍼를 재사용하여 0으로 초기화"""
+        if self._labels is None or self._labels.shape != (height, width):
+            self._labels = np.zeros((height, width), dtype=np.uint8)
+        else:
+            self._labels.fill(0)
+        return self._labels
+
+    def extract_means(self, frame, roi_polygons):
+        """
+        이름이 붙은 ROI 다각형들의 채널별 평균 색상을 한 번에 추출
+
+        Args:
+            frame: 비디오 프레임 (BGR)
+            roi_polygons: {ROI 이름: 포인트 배열 (N x 2, int32)} 딕셔너리
+
+        Returns:
+            {ROI 이름: (B, G, R) 평균값 또는 None} 딕셔너리
+        """
+        names = [name for name, points in roi_polygons.items()
+                 if points is not None and len(points) >= 3]
+        result = {name: None for name in roi_polygons}
+        if not names:
+            return result
+
+        rect = clip_bounding_rect(np.concatenate([roi_polygons[name] for name in names]), frame.shape)
+        if rect is None:
+            return result
+        x0, y0, x1, y1 = rect
+
+        # ROI별 레이블(1부터)을 합집합 사각형 크기의 레이블 이미지에 래스터화
+        labels = self._get_labels(y1 - y0, x1 - x0)
+        offset = np.array([x0, y0], dtype=np.int32)
+        for label, name in enumerate(names, start=1):
+            cv2.fillPoly(labels, [roi_polygons[name].astype(np.int32) - offset], label)
+
+        # (레이블, 채널) 조합을 하나의 인덱스로 만들어 bincount 한 번으로 채널별 합계 계산
+        crop = frame[y0:y1, x0:x1].reshape(-1, 3)
+        num_labels = len(names) + 1
+        index = (labels.reshape(-1, 1).astype(np.intp) * 3 + np.arange(3)).ravel()
+        sums = np.bincount(index, weights=crop.ravel(), minlength=num_labels * 3).reshape(num_labels, 3)
+        counts = np.bincount(labels.ravel(), minlength=num_labels)
+
+        for label, name in enumerate(names, start=1):
+            if counts[label] > 0:
+                b, g, r = sums[label] / counts[label]
+                result[name] = (float(b), float(g), float(r))
+
+        return result
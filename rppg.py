@@ -5,49 +5,180 @@ rPPG (remote Photoplethysmography) 측정 모듈
 
 import cv2
 import numpy as np
-from scipy import signal
-from scipy.fft import fft, fftfreq
-import dlib
-from collections import deque
 import time
 
+try:
+    import dlib
+except ImportError:
+    # 얼굴 모델 없이 신호 처리만 사용하는 경우 (face_models=False, 예: 합성 영상 벤치마크)
+    dlib = None
+
+from signal_utils import (StreamingBandpassFilter, Decimator, RingBuffer, SlidingDFT,
+                          check_timestamp_options, get_spectral_plan, measure_analysis_rate,
+                          measure_sampling_rate, resample_uniform)
+from roi_utils import ROIExtractor, MultiROIExtractor
+from face_tracks import FaceTracker
+from instrumentation import StageTimer, timed
+
 
 class RPPGDetector:
-    def __init__(self, buffer_size=300, fps=30):
+    # 볼 ROI 랜드마크 인덱스 (68개 포인트, 얼굴 기준 좌/우)
+    # 1-4 / 12-15: 턱선, 48 / 54: 입꼬리, 31 / 35: 콧볼, 41 / 46: 아래 눈꺼풀
+    CHEEK_LANDMARKS = {
+        'right_cheek': [1, 2, 3, 4, 48, 31, 41],
+        'left_cheek': [15, 14, 13, 12, 54, 35, 46],
+    }
+    
+    def __init__(self, buffer_size=300, fps=30, streaming=False, sliding_dft=False,
+                 respiration_window=None, respiration_fps=4.0, use_timestamps=False,
+                 roi_names=('forehead',), detect_interval=1, min_tracking_quality=0.6,
+                 detection_scale=1.0, multi_face=False, max_faces=4, track_timeout=2.0,
+                 draw_roi=False, timing=False, face_models=True):
         """
         rPPG 감지기 초기화
         
         Args:
             buffer_size: 신호 버퍼 크기 (프레임 수)
             fps: 초당 프레임 수
+            streaming: True이면 샘플마다 상태 유지 필터를 적용하여
+                       필터링된 신호를 점진적으로 유지 (매초 전체 재필터링 생략)
+            sliding_dft: True이면 심박수/호흡률 대역의 DFT 빈만 샘플마다 갱신하여
+                         매 프레임 최신 추정값을 제공 (전체 FFT 생략)
+            respiration_window: 호흡률 전용 장기 버퍼 길이 (초, 예: 60-120).
+                                지정하면 신호를 데시메이션하여 별도 버퍼로 호흡률을 계산
+            respiration_fps: 호흡률 분기의 목표 샘플링 주파수 (Hz)
+            use_timestamps: True이면 배치 분석 시 명목 fps 대신 실제 타임스탬프로
+                            측정한 샘플링 주파수의 균일 격자로 재샘플링하여 분석
+                            (ROI별 / 트랙별 분석 포함, streaming / sliding_dft /
+                            respiration_window와는 함께 사용할 수 없음)
+            roi_names: 사용할 얼굴 ROI 이름 목록 ('forehead', 'left_cheek', 'right_cheek').
+                       둘 이상이면 레이블 이미지 한 장으로 ROI별 평균을 한 번에 추출하고
+                       ROI별 신호 버퍼를 유지
+            detect_interval: 얼굴 감지 주기 (프레임 수). 1이면 매 프레임 감지,
+                             N이면 N 프레임마다 감지하고 그 사이에는 광류(optical flow)로 추적,
+                             None이면 추적 품질이 떨어질 때만 다시 감지
+            min_tracking_quality: 추적 성공 포인트 비율이 이 값보다 낮으면 즉시 다시 감지
+            detection_scale: 얼굴 감지/랜드마크/추적에 사용할 축소 비율 (예: 0.5).
+                             결과 좌표는 원본 해상도로 되돌려 ROI는 원본 픽셀에서 추출
+            multi_face: True이면 감지된 모든 얼굴에 트랙 ID를 부여하고 트랙별 신호 버퍼 /
+                        심박수 / 호흡률을 유지 (매 프레임 감지, 광류 추적은 사용하지 않음).
+                        기존 단일 출력(signal_buffer 등)은 가장 오래 추적된 얼굴을 따름
+            max_faces: 다중 얼굴 모드에서 동시에 추적할 최대 얼굴 수
+            track_timeout: 다중 얼굴 모드에서 이 시간(초) 동안 보이지 않은 트랙은 제거
+            draw_roi: True이면 process_frame에서 ROI 다각형 / 트랙 ID를 프레임에 그림
+                      (False이면 입력 프레임을 수정하지 않음, 헤드리스 모드용)
+            timing: True이면 process_frame 단계별 / calculate_* 호출별 실행 시간을
+                    고정 버킷 히스토그램으로 계측 (get_timing_stats로 p50/p95/p99 조회)
+            face_models: False이면 얼굴 감지기 / 랜드마크 예측기를 만들지 않음.
+                         ROI 포인트를 직접 지정하여 extract_roi_signal / add_signal / calculate_*만
+                         사용하는 경우용이며 dlib 없이 동작 (process_frame은 사용할 수 없음)
         """
+        error = check_timestamp_options(use_timestamps, streaming, sliding_dft, respiration_window)
+        if error is not None:
+            raise ValueError(error)
+        
         self.buffer_size = buffer_size
         self.fps = fps
+        self.streaming = streaming
+        self.sliding_dft = sliding_dft
+        self.respiration_window = respiration_window
+        self.use_timestamps = use_timestamps
+        self.roi_names = tuple(roi_names)
+        self.multi_roi = self.roi_names != ('forehead',)
+        self.detect_interval = detect_interval
+        self.min_tracking_quality = min_tracking_quality
+        self.detection_scale = detection_scale
+        
+        # 감지용 축소 프레임 버퍼 (해상도가 같으면 재사용)
+        self._detection_buffer = None
+        # 감지용 그레이 프레임 버퍼 (추적기가 직전 프레임을 참조하므로 두 개를 번갈아 사용)
+        self._gray_buffers = [None, None]
+        self._gray_index = 0
+        
+        self.face_detector = None
+        self.landmark_predictor = None
+        if face_models:
+            if dlib is None:
+                raise RuntimeError("얼굴 감지에는 dlib이 필요합니다: pip install dlib")
+            
+            # 얼굴 감지기 초기화
+            self.face_detector = dlib.get_frontal_face_detector()
+            
+            # 얼굴 랜드마크 예측기 (68개 포인트)
+            try:
+                self.landmark_predictor = dlib.shape_predictor("shape_predictor_68_face_landmarks.dat")
+            except:
+                print("경고: shape_predictor_68_face_landmarks.dat 파일을 찾을 수 없습니다.")
+                print("다운로드: http://dlib.net/files/shape_predictor_68_face_landmarks.dat.bz2")
+        
+        # 감지-추적 모드 상태 (이전 그레이 프레임, 추적 포인트, 추적 중인 얼굴 영역)
+        self._prev_gray = None
+        self._track_points = None
+        self._track_face = None
+        self._track_landmarks = False
+        self._frames_since_detection = 0
+        self.tracking_quality = 0.0
+        self.detected_frames = 0
+        self.tracked_frames = 0
+        
+        # 신호 버퍼 (고정 용량 링 버퍼, 프레임마다 파이썬 객체를 할당하지 않음)
+        self.signal_buffer = RingBuffer(buffer_size)
+        self.timestamp_buffer = RingBuffer(buffer_size)
+        
+        # 스트리밍 / Sliding DFT 모드: 심박수(0.7-4 Hz) / 호흡률(0.1-0.5 Hz) 대역 필터
+        if streaming or sliding_dft:
+            self.hr_filter = StreamingBandpassFilter(0.7, 4.0, fps)
+            self.rr_filter = StreamingBandpassFilter(0.1, 0.5, fps)
+        
+        # 스트리밍 모드: 필터링된 신호 버퍼
+        if streaming:
+            self.filtered_hr_buffer = RingBuffer(buffer_size)
+            self.filtered_rr_buffer = RingBuffer(buffer_size)
+        
+        # Sliding DFT 모드: 심박수(40-200 BPM) / 호흡률(8-30 RPM) 대역 빈만 유지
+        if sliding_dft:
+            self.hr_sdft = SlidingDFT(buffer_size, fps, 40 / 60.0, 200 / 60.0)
+            self.rr_sdft = SlidingDFT(buffer_size, fps, 8 / 60.0, 30 / 60.0)
+        
+        # 다중 속도 호흡률 분기: 안티앨리어싱 + 다운샘플링 후 장기 링 버퍼에 저장
+        if respiration_window is not None:
+            self.rr_decimator = Decimator(fps, respiration_fps)
+            self.rr_fps = self.rr_decimator.fps
+            self.rr_buffer = RingBuffer(int(round(respiration_window * self.rr_fps)))
         
-        # 얼굴 감지기 초기화
-        self.face_detector = dlib.get_frontal_face_detector()
+        # ROI 영역 (이마 부분)
+        self.roi_points = None
         
-        # 얼굴 랜드마크 예측기 (68개 포인트)
-        try:
-            self.landmark_predictor = dlib.shape_predictor("shape_predictor_68_face_landmarks.dat")
-        except:
-            print("경고: shape_predictor_68_face_landmarks.dat 파일을 찾을 수 없습니다.")
-            print("다운로드: http://dlib.net/files/shape_predictor_68_face_landmarks.dat.bz2")
-            self.landmark_predictor = None
+        # ROI 평균 색상 추출기 (외접 사각형 crop + 캐시된 마스크) 및 마지막 (B, G, R) 평균값
+        self.roi_extractor = ROIExtractor()
+        self.last_roi_means = None
         
-        # 신호 버퍼
-        self.signal_buffer = deque(maxlen=buffer_size)
-        self.timestamp_buffer = deque(maxlen=buffer_size)
+        # 다중 ROI: 레이블 이미지 기반 추출기와 ROI별 신호 버퍼 / 마지막 ROI별 값
+        if self.multi_roi:
+            self.multi_roi_extractor = MultiROIExtractor()
+            self.roi_buffers = {name: RingBuffer(buffer_size) for name in self.roi_names}
+        self.last_multi_roi_means = None
+        self.last_roi_values = None
         
-        # ROI 영역 (이마 부분)
-        self.roi_points = None
+        # 다중 얼굴: 트랙 ID별 신호 버퍼 / 이번 프레임의 트랙별 신호 값 / 마지막 트랙별 심박수·호흡률
+        self.multi_face = multi_face
+        if multi_face:
+            self.face_tracker = FaceTracker(buffer_size, max_tracks=max_faces, track_timeout=track_timeout)
+        self.last_face_values = {}
+        self.last_track_vitals = {}
+        
+        # ROI 그리기 여부 (화면 표시가 없으면 그리지 않음)
+        self.draw_roi = draw_roi
+        
+        # 단계별 실행 시간 계측기 (비활성화 시 거의 비용 없음)
+        self.timer = StageTimer(enabled=timing)
         
     def get_forehead_roi(self, landmarks, face_rect):
         """
         얼굴 랜드마크에서 이마 영역(ROI) 추출
         
         Args:
-            landmarks: dlib 랜드마크 객체
+            landmarks: 랜드마크 좌표 배열 (68 x 2)
             face_rect: 얼굴 영역
             
         Returns:
@@ -73,16 +204,51 @@ class RPPGDetector:
         
         # 이마 영역 추출 (눈썹 위쪽)
         for i in [17, 18, 19, 20, 21, 22, 23, 24, 25, 26]:
-            point = landmarks.part(i)
-            points.append([point.x, point.y])
+            points.append([landmarks[i][0], landmarks[i][1]])
         
         # 이마 상단 중앙점 추가
-        top_y = min([landmarks.part(i).y for i in [17, 18, 19, 20, 21, 22, 23, 24, 25, 26]])
+        top_y = min([landmarks[i][1] for i in [17, 18, 19, 20, 21, 22, 23, 24, 25, 26]])
         center_x = face_rect.center().x
         points.append([center_x, top_y - 20])
         
         return np.array(points, dtype=np.int32)
     
+    def get_roi_polygons(self, landmarks, face_rect):
+        """
+        설정된 ROI 이름별 다각형 추출
+        
+        Args:
+            landmarks: 랜드마크 좌표 배열 (68 x 2)
+            face_rect: 얼굴 영역
+            
+        Returns:
+            {ROI 이름: ROI 포인트} 딕셔너리
+        """
+        polygons = {}
+        for name in self.roi_names:
+            if name == 'forehead':
+                polygons[name] = self.get_forehead_roi(landmarks, face_rect)
+            elif name in self.CHEEK_LANDMARKS:
+                if landmarks is None:
+                    # 랜드마크가 없으면 얼굴 영역 중간 높이의 좌/우 부분 사용
+                    x = face_rect.left()
+                    y = face_rect.top()
+                    w = face_rect.width()
+                    h = face_rect.height()
+                    x_start = x + w // 8 if name == 'right_cheek' else x + 5 * w // 8
+                    polygons[name] = np.array([
+                        [x_start, y + h // 2],
+                        [x_start + w // 4, y + h // 2],
+                        [x_start + w // 4, y + 3 * h // 4],
+                        [x_start, y + 3 * h // 4]
+                    ], dtype=np.int32)
+                else:
+                    polygons[name] = np.array(landmarks[self.CHEEK_LANDMARKS[name]], dtype=np.int32)
+            else:
+                polygons[name] = None
+        return polygons
+    
+    @timed('roi')
     def extract_roi_signal(self, frame, roi_points):
         """
         ROI 영역에서 색상 신호 추출
@@ -94,73 +260,408 @@ class RPPGDetector:
         Returns:
             평균 녹색 채널 값
         """
-        if roi_points is None or len(roi_points) < 3:
+        # ROI 외접 사각형 안에서만 마스크를 만들어 세 채널 평균을 한 번에 계산
+        means = self.roi_extractor.extract_means(frame, roi_points)
+        self.last_roi_means = means
+        
+        if means is None:
             return None
         
-        # ROI 마스크 생성
-        mask = np.zeros(frame.shape[:2], dtype=np.uint8)
-        cv2.fillPoly(mask, [roi_points], 255)
+        # 녹색 채널이 가장 민감함 (BGR에서 녹색 채널)
+        return means[1]
+    
+    @timed('roi')
+    def extract_multi_roi_signal(self, frame, roi_polygons):
+        """
+        여러 ROI 영역에서 색상 신호를 한 번에 추출
         
-        # ROI 영역에서 평균 색상 추출 (녹색 채널이 가장 민감함)
-        roi_region = cv2.bitwise_and(frame, frame, mask=mask)
-        green_channel = roi_region[:, :, 1]  # BGR에서 녹색 채널
+        Args:
+            frame: 비디오 프레임
+            roi_polygons: {ROI 이름: ROI 포인트} 딕셔너리
+            
+        Returns:
+            유효한 ROI들의 평균 녹색 채널 값 (ROI별 값은 last_roi_values에 저장)
+        """
+        means = self.multi_roi_extractor.extract_means(frame, roi_polygons)
+        self.last_multi_roi_means = means
         
-        # 마스크된 영역의 평균값 계산
-        masked_green = green_channel[mask > 0]
-        if len(masked_green) > 0:
-            return np.mean(masked_green)
+        valid_means = {name: value for name, value in means.items() if value is not None}
+        if not valid_means:
+            self.last_roi_values = None
+            self.last_roi_means = None
+            return None
         
-        return None
+        # ROI별 녹색 채널 값과 전체 평균
+        self.last_roi_values = {name: value[1] for name, value in valid_means.items()}
+        self.last_roi_means = tuple(float(v) for v in np.mean(list(valid_means.values()), axis=0))
+        return float(np.mean(list(self.last_roi_values.values())))
     
-    def process_frame(self, frame):
+    @timed('process_frame')
+    def process_frame(self, frame, timestamp=None):
         """
         프레임 처리 및 신호 추출
         
         Args:
             frame: 비디오 프레임
+            timestamp: 프레임 캡처 시각 (초, None이면 현재 시간).
+                       다중 얼굴 모드에서 트랙 제거와 트랙별 신호 기록에 사용
             
         Returns:
             처리된 프레임, ROI 포인트, 현재 신호 값
         """
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if self.multi_face:
+            return self._process_multi_face_frame(frame, timestamp)
+        
+        gray = self._get_detection_gray(frame)
+        
+        tracking_enabled = self.detect_interval is None or self.detect_interval > 1
+        face, landmarks = None, None
+        
+        # 감지 주기 사이에는 이전 프레임의 얼굴/랜드마크를 광류로 추적
+        if tracking_enabled and self._track_points is not None and (
+                self.detect_interval is None
+                or self._frames_since_detection < self.detect_interval - 1):
+            face, landmarks = self._track_face_points(gray)
+            if face is not None:
+                self._frames_since_detection += 1
+                self.tracked_frames += 1
+        
+        # 추적하지 않았거나 추적 품질이 떨어지면 얼굴 감지
+        if face is None:
+            face, landmarks = self._detect_face(gray)
+            self.detected_frames += 1
+            self._frames_since_detection = 0
+            
+            if face is None:
+                self._track_points = None
+                return frame, None, None
+            
+            if tracking_enabled:
+                self._start_tracking(gray, face, landmarks)
+        
+        # 감지 해상도의 좌표를 원본 해상도로 변환
+        if self.detection_scale != 1.0:
+            face, landmarks = self._scale_to_frame(face, landmarks)
+        
+        # ROI 추출 및 신호 추출
+        if self.multi_roi:
+            roi_polygons = self.get_roi_polygons(landmarks, face)
+            roi_points = roi_polygons.get('forehead')
+            signal_value = self.extract_multi_roi_signal(frame, roi_polygons)
+        else:
+            roi_points = self.get_forehead_roi(landmarks, face)
+            roi_polygons = {'forehead': roi_points}
+            signal_value = self.extract_roi_signal(frame, roi_points)
+        
+        # ROI 그리기
+        if self.draw_roi:
+            start = self.timer.now()
+            for points in roi_polygons.values():
+                if points is not None:
+                    cv2.polylines(frame, [points], True, (0, 255, 0), 2)
+            self.timer.record('draw', start)
         
-        # 얼굴 감지
-        faces = self.face_detector(gray)
+        return frame, roi_points, signal_value
+    
+    def _process_multi_face_frame(self, frame, timestamp=None):
+        """
+        다중 얼굴 모드 프레임 처리 (모든 얼굴 감지 후 트랙별 신호 추출)
         
-        if len(faces) == 0:
-            return frame, None, None
+        Args:
+            frame: 비디오 프레임
+            timestamp: 프레임 캡처 시각 (초, None이면 현재 시간)
+            
+        Returns:
+            처리된 프레임, 주 트랙의 ROI 포인트, 주 트랙의 신호 값
+        """
+        gray = self._get_detection_gray(frame)
+        detections = self._detect_faces(gray)
+        self.detected_frames += 1
+        
+        faces = []
+        for face, landmarks in detections:
+            if self.detection_scale != 1.0:
+                face, landmarks = self._scale_to_frame(face, landmarks)
+            if self.multi_roi:
+                roi_polygons = self.get_roi_polygons(landmarks, face)
+            else:
+                roi_polygons = {'forehead': self.get_forehead_roi(landmarks, face)}
+            faces.append(((face.left(), face.top(), face.right(), face.bottom()), roi_polygons))
+        
+        return self._process_tracked_faces(frame, faces, timestamp)
+    
+    def _process_tracked_faces(self, frame, faces, timestamp=None):
+        """
+        얼굴들을 트랙과 연결하고 트랙별 신호 추출 및 ROI / 트랙 ID 그리기
         
+        Args:
+            frame: 비디오 프레임
+            faces: [(얼굴 박스 (x0, y0, x1, y1), {ROI 이름: ROI 포인트}), ...]
+            timestamp: 프레임 캡처 시각 (초, None이면 현재 시간)
+            
+        Returns:
+            처리된 프레임, 주 트랙의 ROI 포인트, 주 트랙의 신호 값
+            (트랙별 신호 값은 last_face_values에 저장)
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        
+        track_ids = self.face_tracker.update([box for box, _ in faces], timestamp)
+        primary_id = self.face_tracker.get_primary_track_id(track_ids)
+        
+        roi_points, signal_value = None, None
+        primary_means, primary_roi_values = None, None
+        values = {}
+        
+        for (box, roi_polygons), track_id in zip(faces, track_ids):
+            if track_id is None:
+                continue
+            
+            if self.multi_roi:
+                values[track_id] = self.extract_multi_roi_signal(frame, roi_polygons)
+            else:
+                values[track_id] = self.extract_roi_signal(frame, roi_polygons['forehead'])
+            
+            # 기존 단일 출력 (last_roi_means / last_roi_values 포함)은 주 트랙 기준
+            if track_id == primary_id:
+                roi_points, signal_value = roi_polygons.get('forehead'), values[track_id]
+                primary_means, primary_roi_values = self.last_roi_means, self.last_roi_values
+            
+            if self.draw_roi:
+                start = self.timer.now()
+                for points in roi_polygons.values():
+                    if points is not None:
+                        cv2.polylines(frame, [points], True, (0, 255, 0), 2)
+                cv2.putText(frame, f"ID {track_id}", (int(box[0]), int(box[1]) - 10),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+                self.timer.record('draw', start)
+        
+        self.last_roi_means, self.last_roi_values = primary_means, primary_roi_values
+        self.last_face_values = values
+        
+        # 주 트랙의 신호 유무와 관계없이 모든 트랙 버퍼에 이번 프레임 값 추가
+        self.face_tracker.add_samples(values, timestamp)
+        return frame, roi_points, signal_value
+    
+    @timed('color_convert')
+    def _get_detection_gray(self, frame):
+        """
+        감지용 그레이스케일 프레임 생성
+        
+        detection_scale에 따라 먼저 미리 할당된 버퍼로 축소한 뒤 축소된 이미지만 그레이로 변환하고,
+        변환 결과도 미리 할당된 버퍼에 기록하여 프레임마다 배열을 새로 만들지 않습니다.
+        
+        Args:
+            frame: 비디오 프레임
+            
+        Returns:
+            그레이스케일 프레임 (감지 해상도, 다음다음 프레임에서 덮어씀)
+        """
+        source = frame
+        if self.detection_scale != 1.0:
+            height, width = frame.shape[:2]
+            size = (max(1, int(width * self.detection_scale)), max(1, int(height * self.detection_scale)))
+            if self._detection_buffer is None or self._detection_buffer.shape[:2] != (size[1], size[0]):
+                self._detection_buffer = np.empty((size[1], size[0], 3), dtype=frame.dtype)
+            
+            cv2.resize(frame, size, dst=self._detection_buffer, interpolation=cv2.INTER_AREA)
+            source = self._detection_buffer
+        
+        # 직전 프레임의 그레이 버퍼(_prev_gray)는 건드리지 않도록 다른 버퍼에 기록
+        self._gray_index ^= 1
+        gray = self._gray_buffers[self._gray_index]
+        if gray is None or gray.shape != source.shape[:2]:
+            gray = np.empty(source.shape[:2], dtype=source.dtype)
+            self._gray_buffers[self._gray_index] = gray
+        
+        cv2.cvtColor(source, cv2.COLOR_BGR2GRAY, dst=gray)
+        return gray
+    
+    def _scale_to_frame(self, face, landmarks):
+        """
+        감지 해상도의 얼굴 영역 / 랜드마크를 원본 해상도 좌표로 변환
+        
+        Args:
+            face: 얼굴 영역 (감지 해상도)
+            landmarks: 랜드마크 좌표 배열 (감지 해상도) 또는 None
+            
+        Returns:
+            얼굴 영역, 랜드마크 좌표 배열 (원본 해상도)
+        """
+        scale = 1.0 / self.detection_scale
+        face = dlib.rectangle(int(face.left() * scale), int(face.top() * scale),
+                              int(face.right() * scale), int(face.bottom() * scale))
+        if landmarks is not None:
+            landmarks = landmarks * scale
+        return face, landmarks
+    
+    def _detect_face(self, gray):
+        """
+        얼굴 감지 및 랜드마크 예측
+        
+        Args:
+            gray: 그레이스케일 프레임
+            
+        Returns:
+            얼굴 영역, 랜드마크 좌표 배열 (68 x 2, 예측기가 없으면 None). 얼굴이 없으면 (None, None)
+        """
         # 첫 번째 얼굴 사용
-        face = faces[0]
+        detections = self._detect_faces(gray, max_faces=1)
         
-        # 랜드마크 감지
-        landmarks = None
-        if self.landmark_predictor is not None:
-            landmarks = self.landmark_predictor(gray, face)
+        if len(detections) == 0:
+            return None, None
         
-        # ROI 추출
-        roi_points = self.get_forehead_roi(landmarks, face)
+        return detections[0]
+    
+    def _detect_faces(self, gray, max_faces=None):
+        """
+        여러 얼굴 감지 및 얼굴별 랜드마크 예측
         
-        # 신호 추출
-        signal_value = self.extract_roi_signal(frame, roi_points)
+        Args:
+            gray: 그레이스케일 프레임
+            max_faces: 랜드마크를 예측할 최대 얼굴 수 (None이면 모두)
+            
+        Returns:
+            [(얼굴 영역, 랜드마크 좌표 배열 또는 None), ...]
+        """
+        start = self.timer.now()
+        faces = list(self.face_detector(gray))[:max_faces]
+        self.timer.record('detect', start)
+        
+        detections = []
+        for face in faces:
+            # 랜드마크 감지
+            landmarks = None
+            if self.landmark_predictor is not None:
+                start = self.timer.now()
+                shape = self.landmark_predictor(gray, face)
+                landmarks = np.array([[p.x, p.y] for p in shape.parts()], dtype=np.float32)
+                self.timer.record('landmarks', start)
+            detections.append((face, landmarks))
+        
+        return detections
+    
+    @timed('track_init')
+    def _start_tracking(self, gray, face, landmarks):
+        """
+        감지 결과로 추적 상태 초기화
         
-        # ROI 그리기
-        if roi_points is not None:
-            cv2.polylines(frame, [roi_points], True, (0, 255, 0), 2)
+        랜드마크가 있으면 랜드마크 자체를, 없으면 얼굴 영역 안의 특징점을 추적합니다.
         
-        return frame, roi_points, signal_value
+        Args:
+            gray: 그레이스케일 프레임
+            face: 얼굴 영역
+            landmarks: 랜드마크 좌표 배열 또는 None
+        """
+        if landmarks is not None:
+            points = landmarks.reshape(-1, 1, 2)
+        else:
+            left, top = max(face.left(), 0), max(face.top(), 0)
+            right, bottom = min(face.right(), gray.shape[1]), min(face.bottom(), gray.shape[0])
+            points = None
+            if right > left and bottom > top:
+                points = cv2.goodFeaturesToTrack(gray[top:bottom, left:right], maxCorners=40,
+                                                 qualityLevel=0.01, minDistance=5)
+            if points is None:
+                self._track_points = None
+                return
+            points = points + np.array([left, top], dtype=np.float32)
+        
+        self._prev_gray = gray
+        self._track_points = points.astype(np.float32)
+        self._track_face = face
+        self._track_landmarks = landmarks is not None
     
-    def add_signal(self, signal_value):
+    @timed('track')
+    def _track_face_points(self, gray):
+        """
+        이전 프레임의 추적 포인트를 피라미드 Lucas-Kanade 광류로 현재 프레임에 전파
+        
+        Args:
+            gray: 그레이스케일 프레임
+            
+        Returns:
+            얼굴 영역, 랜드마크 좌표 배열. 추적 품질이 min_tracking_quality 미만이면 (None, None)
+        """
+        next_points, status, _ = cv2.calcOpticalFlowPyrLK(
+            self._prev_gray, gray, self._track_points, None, winSize=(21, 21), maxLevel=3
+        )
+        good = status.ravel() == 1
+        self.tracking_quality = float(np.mean(good)) if len(good) > 0 else 0.0
+        
+        if self.tracking_quality < self.min_tracking_quality:
+            return None, None
+        
+        # 얼굴 영역은 성공한 포인트의 중앙값 이동량만큼 평행 이동
+        displacement = np.median(next_points[good] - self._track_points[good], axis=0).ravel()
+        next_points[~good] = self._track_points[~good] + displacement
+        dx, dy = int(round(displacement[0])), int(round(displacement[1]))
+        
+        face = dlib.rectangle(self._track_face.left() + dx, self._track_face.top() + dy,
+                              self._track_face.right() + dx, self._track_face.bottom() + dy)
+        
+        self._prev_gray = gray
+        self._track_points = next_points
+        self._track_face = face
+        
+        landmarks = next_points.reshape(-1, 2) if self._track_landmarks else None
+        return face, landmarks
+    
+    def get_tracking_stats(self):
+        """
+        감지-추적 통계 반환
+        
+        Returns:
+            감지 주기, 감지한 프레임 수, 추적한 프레임 수, 마지막 추적 품질 딕셔너리
+        """
+        return {
+            "detect_interval": self.detect_interval,
+            "detected_frames": self.detected_frames,
+            "tracked_frames": self.tracked_frames,
+            "tracking_quality": self.tracking_quality
+        }
+    
+    @timed('add_signal')
+    def add_signal(self, signal_value, timestamp=None, roi_values=None):
         """
         신호 버퍼에 값 추가
         
         Args:
             signal_value: 신호 값
+            timestamp: 프레임 캡처 시각 (초, None이면 현재 시간)
+            roi_values: {ROI 이름: 신호 값} (다중 ROI 모드, 값이 없는 ROI는 signal_value로 채움)
         """
         if signal_value is not None:
+            if timestamp is None:
+                timestamp = time.time()
+            
             self.signal_buffer.append(signal_value)
-            self.timestamp_buffer.append(time.time())
+            self.timestamp_buffer.append(timestamp)
+            
+            if self.multi_roi:
+                # ROI별 버퍼를 공통 타임스탬프와 같은 길이로 유지
+                for name, buffer in self.roi_buffers.items():
+                    value = roi_values.get(name) if roi_values else None
+                    buffer.append(signal_value if value is None else value)
+            
+            if self.respiration_window is not None:
+                decimated_value = self.rr_decimator.process(signal_value)
+                if decimated_value is not None:
+                    self.rr_buffer.append(decimated_value)
+            
+            if self.streaming or self.sliding_dft:
+                hr_value = self.hr_filter.process(signal_value)
+                rr_value = self.rr_filter.process(signal_value)
+                
+                if self.streaming:
+                    self.filtered_hr_buffer.append(hr_value)
+                    self.filtered_rr_buffer.append(rr_value)
+                
+                if self.sliding_dft:
+                    self.hr_sdft.update(hr_value)
+                    self.rr_sdft.update(rr_value)
     
+    @timed('calculate_heart_rate')
     def calculate_heart_rate(self, min_bpm=40, max_bpm=200):
         """
         수집된 신호로부터 심박수 계산
@@ -175,81 +676,87 @@ class RPPGDetector:
         if len(self.signal_buffer) < 60:  # 최소 2초 데이터 필요
             return None, 0.0
         
-        # 신호를 numpy 배열로 변환
-        signal_array = np.array(self.signal_buffer)
-        
-        # 신호 정규화 및 디트렌딩
-        signal_array = signal_array - np.mean(signal_array)
-        
-        # 밴드패스 필터 적용 (0.7-4 Hz, 심박수 범위)
-        nyquist = self.fps / 2
-        low = 0.7 / nyquist
-        high = 4.0 / nyquist
-        b, a = signal.butter(3, [low, high], btype='band')
-        filtered_signal = signal.filtfilt(b, a, signal_array)
-        
-        # FFT를 통한 주파수 분석
-        fft_values = fft(filtered_signal)
-        fft_freq = fftfreq(len(filtered_signal), 1.0 / self.fps)
-        
-        # 심박수 범위에 해당하는 주파수만 고려
-        min_freq = min_bpm / 60.0
-        max_freq = max_bpm / 60.0
-        
-        # 해당 범위의 인덱스 찾기
-        freq_mask = (fft_freq >= min_freq) & (fft_freq <= max_freq)
-        
-        if not np.any(freq_mask):
+        if self.sliding_dft:
+            # Sliding DFT 모드: 샘플마다 갱신된 대역 스펙트럼에서 바로 추정
+            dominant_freq, confidence = self.hr_sdft.estimate(
+                min_bpm / 60.0, max_bpm / 60.0, 1.0, 5.0
+            )
+            if dominant_freq is None:
+                return None, 0.0
+            return dominant_freq * 60, confidence
+        
+        if self.streaming:
+            # 스트리밍 모드: add_signal에서 이미 필터링된 신호 사용
+            filtered_signal = self.filtered_hr_buffer.view()
+            plan = get_spectral_plan(self.fps, len(filtered_signal),
+                                     min_bpm / 60.0, max_bpm / 60.0, 0.7, 4.0)
+        else:
+            # 캐시된 스펙트럼 계획 (0.7-4 Hz 밴드패스, 심박수 범위)
+            signal_array, fps = self._get_analysis_signal()
+            plan = get_spectral_plan(fps, len(signal_array),
+                                     min_bpm / 60.0, max_bpm / 60.0, 0.7, 4.0)
+            filtered_signal = plan.filter(signal_array)
+        
+        # FFT를 통한 주파수 분석 및 SNR/prominence 기반 신뢰도 계산
+        # (SNR이 1 이하면 낮은 신뢰도, 5 이상이면 높은 신뢰도)
+        dominant_freq, confidence = plan.estimate(plan.spectrum(filtered_signal), 1.0, 5.0)
+        if dominant_freq is None:
             return None, 0.0
         
-        # 주파수 범위 내에서 최대 파워를 가진 주파수 찾기
-        power_spectrum = np.abs(fft_values)
-        power_spectrum[~freq_mask] = 0
-        
-        max_power_idx = np.argmax(power_spectrum)
-        dominant_freq = abs(fft_freq[max_power_idx])
-        
         # BPM으로 변환
-        heart_rate = dominant_freq * 60
+        return dominant_freq * 60, confidence
+    
+    @timed('calculate_respiration_rate')
+    def calculate_respiration_rate(self, min_rpm=8, max_rpm=30):
+        """
+        수집된 신호로부터 호흡률 계산
         
-        # 신뢰도 계산 (개선된 방식)
-        max_power = power_spectrum[max_power_idx]
+        Args:
+            min_rpm: 최소 호흡률 (분당 호흡 수)
+            max_rpm: 최대 호흡률 (분당 호흡 수)
+            
+        Returns:
+            계산된 호흡률 (RPM), 신뢰도 점수
+        """
+        if self.respiration_window is not None:
+            return self._calculate_decimated_respiration_rate(min_rpm, max_rpm)
         
-        # 피크 주변의 파워 제외하고 평균 계산 (노이즈 추정)
-        # 피크 주변 ±2개 인덱스 제외
-        peak_window = 2
-        noise_mask = freq_mask.copy()
-        if max_power_idx - peak_window >= 0 and max_power_idx + peak_window < len(noise_mask):
-            noise_mask[max(0, max_power_idx - peak_window):min(len(noise_mask), max_power_idx + peak_window + 1)] = False
+        if len(self.signal_buffer) < 180:  # 최소 6초 데이터 필요 (호흡률은 더 긴 시간 필요)
+            return None, 0.0
         
-        if np.any(noise_mask):
-            noise_power = np.mean(power_spectrum[noise_mask])
+        if self.sliding_dft:
+            # Sliding DFT 모드: 샘플마다 갱신된 대역 스펙트럼에서 바로 추정
+            dominant_freq, confidence = self.rr_sdft.estimate(
+                min_rpm / 60.0, max_rpm / 60.0, 0.8, 4.0
+            )
+            if dominant_freq is None:
+                return None, 0.0
+            return dominant_freq * 60, confidence
+        
+        if self.streaming:
+            # 스트리밍 모드: add_signal에서 이미 필터링된 신호 사용
+            filtered_signal = self.filtered_rr_buffer.view()
+            plan = get_spectral_plan(self.fps, len(filtered_signal),
+                                     min_rpm / 60.0, max_rpm / 60.0, 0.1, 0.5)
         else:
-            # 피크 주변만 있으면 전체 평균 사용
-            noise_power = np.mean(power_spectrum[freq_mask])
-        
-        # Signal-to-Noise Ratio (SNR) 기반 신뢰도
-        snr = max_power / (noise_power + 1e-6)
-        
-        # SNR을 0-1 범위로 정규화 (경험적 임계값 사용)
-        # SNR이 2 이상이면 높은 신뢰도, 1 이하면 낮은 신뢰도
-        snr_threshold_low = 1.0
-        snr_threshold_high = 5.0
-        confidence = np.clip((snr - snr_threshold_low) / (snr_threshold_high - snr_threshold_low), 0.0, 1.0)
-        
-        # 추가: 피크의 두드러짐 (peak prominence) 고려
-        # 최대값이 두 번째 최대값보다 얼마나 큰지
-        sorted_powers = np.sort(power_spectrum[freq_mask])[::-1]
-        if len(sorted_powers) > 1:
-            peak_prominence = (max_power - sorted_powers[1]) / (max_power + 1e-6)
-            # prominence를 신뢰도에 반영 (가중 평균)
-            confidence = 0.7 * confidence + 0.3 * peak_prominence
-        
-        return heart_rate, confidence
+            # 캐시된 스펙트럼 계획 (0.1-0.5 Hz 밴드패스, 호흡률 범위)
+            signal_array, fps = self._get_analysis_signal()
+            plan = get_spectral_plan(fps, len(signal_array),
+                                     min_rpm / 60.0, max_rpm / 60.0, 0.1, 0.5)
+            filtered_signal = plan.filter(signal_array)
+        
+        # FFT를 통한 주파수 분석 및 SNR/prominence 기반 신뢰도 계산
+        # 호흡률은 더 낮은 주파수이므로 임계값 조정 (0.8-4.0)
+        dominant_freq, confidence = plan.estimate(plan.spectrum(filtered_signal), 0.8, 4.0)
+        if dominant_freq is None:
+            return None, 0.0
+        
+        # RPM으로 변환
+        return dominant_freq * 60, confidence
     
-    def calculate_respiration_rate(self, min_rpm=8, max_rpm=30):
+    def _calculate_decimated_respiration_rate(self, min_rpm, max_rpm):
         """
-        수집된 신호로부터 호흡률 계산
+        데시메이션된 장기 버퍼로 호흡률 계산 (긴 윈도우로 주파수 해상도 향상)
         
         Args:
             min_rpm: 최소 호흡률 (분당 호흡 수)
@@ -258,79 +765,167 @@ class RPPGDetector:
         Returns:
             계산된 호흡률 (RPM), 신뢰도 점수
         """
-        if len(self.signal_buffer) < 180:  # 최소 6초 데이터 필요 (호흡률은 더 긴 시간 필요)
+        n = len(self.rr_buffer)
+        if n < 6 * self.rr_fps:  # 최소 6초 데이터 필요
             return None, 0.0
         
-        # 신호를 numpy 배열로 변환
-        signal_array = np.array(self.signal_buffer)
+        plan = get_spectral_plan(self.rr_fps, n, min_rpm / 60.0, max_rpm / 60.0, 0.1, 0.5)
+        signal_array = self.rr_buffer.view() - self.rr_buffer.mean()
         
-        # 신호 정규화 및 디트렌딩
-        signal_array = signal_array - np.mean(signal_array)
+        dominant_freq, confidence = plan.estimate(plan.spectrum(plan.filter(signal_array)), 0.8, 4.0)
+        if dominant_freq is None:
+            return None, 0.0
         
-        # 밴드패스 필터 적용 (0.1-0.5 Hz, 호흡률 범위)
-        nyquist = self.fps / 2
-        low = 0.1 / nyquist
-        high = 0.5 / nyquist
-        b, a = signal.butter(3, [low, high], btype='band')
-        filtered_signal = signal.filtfilt(b, a, signal_array)
+        return dominant_freq * 60, confidence
+    
+    @timed('calculate_vitals')
+    def calculate_vitals(self, min_bpm=40, max_bpm=200, min_rpm=8, max_rpm=30):
+        """
+        심박수와 호흡률을 한 번의 디트렌딩과 한 번의 실수 FFT로 함께 계산
         
-        # FFT를 통한 주파수 분석
-        fft_values = fft(filtered_signal)
-        fft_freq = fftfreq(len(filtered_signal), 1.0 / self.fps)
+        밴드패스 필터는 스펙트럼 계획에 미리 계산된 대역 내 이득으로 주파수 영역에서 적용합니다.
+        스트리밍 / Sliding DFT 모드에서는 이미 대역별로 필터링된 신호를 사용하므로
+        calculate_heart_rate / calculate_respiration_rate를 그대로 호출합니다.
         
-        # 호흡률 범위에 해당하는 주파수만 고려
-        min_freq = min_rpm / 60.0
-        max_freq = max_rpm / 60.0
+        Args:
+            min_bpm: 최소 심박수
+            max_bpm: 최대 심박수
+            min_rpm: 최소 호흡률 (분당 호흡 수)
+            max_rpm: 최대 호흡률 (분당 호흡 수)
+            
+        Returns:
+            (심박수, 신뢰도), (호흡률, 신뢰도)
+            (다중 얼굴 모드에서는 트랙별 결과를 last_track_vitals에 함께 저장)
+        """
+        if self.multi_face:
+            self.last_track_vitals = self.calculate_track_vitals(min_bpm, max_bpm, min_rpm, max_rpm)
+        
+        if self.streaming or self.sliding_dft:
+            return (self.calculate_heart_rate(min_bpm, max_bpm),
+                    self.calculate_respiration_rate(min_rpm, max_rpm))
+        
+        n = len(self.signal_buffer)
+        if n < 60:  # 최소 2초 데이터 필요
+            return (None, 0.0), (None, 0.0)
+        
+        # 한 번의 디트렌딩과 한 번의 FFT
+        signal_array, fps = self._get_analysis_signal()
+        hr_plan = get_spectral_plan(fps, len(signal_array), min_bpm / 60.0, max_bpm / 60.0, 0.7, 4.0)
+        spectrum = hr_plan.spectrum(signal_array)
+        
+        heart_freq, heart_confidence = hr_plan.estimate(spectrum, 1.0, 5.0, apply_filter_gain=True)
+        heart_result = (heart_freq * 60, heart_confidence) if heart_freq is not None else (None, 0.0)
+        
+        respiration_result = (None, 0.0)
+        if self.respiration_window is not None:
+            # 호흡률은 데시메이션된 장기 버퍼에서 계산
+            respiration_result = self.calculate_respiration_rate(min_rpm, max_rpm)
+        elif n >= 180:  # 최소 6초 데이터 필요
+            rr_plan = get_spectral_plan(fps, len(signal_array), min_rpm / 60.0, max_rpm / 60.0, 0.1, 0.5)
+            resp_freq, resp_confidence = rr_plan.estimate(spectrum, 0.8, 4.0, apply_filter_gain=True)
+            if resp_freq is not None:
+                respiration_result = (resp_freq * 60, resp_confidence)
+        
+        return heart_result, respiration_result
+    
+    @timed('calculate_roi_heart_rates')
+    def calculate_roi_heart_rates(self, min_bpm=40, max_bpm=200):
+        """
+        ROI별 심박수 계산 (다중 ROI 모드)
         
-        # 해당 범위의 인덱스 찾기
-        freq_mask = (fft_freq >= min_freq) & (fft_freq <= max_freq)
+        모든 ROI 버퍼를 (ROI 수, 윈도우) 배열로 쌓아 한 번의 필터링과 한 번의 FFT로 처리합니다.
         
-        if not np.any(freq_mask):
-            return None, 0.0
+        Args:
+            min_bpm: 최소 심박수
+            max_bpm: 최대 심박수
+            
+        Returns:
+            {ROI 이름: (심박수, 신뢰도)} 딕셔너리
+        """
+        if not self.multi_roi:
+            return {}
         
-        # 주파수 범위 내에서 최대 파워를 가진 주파수 찾기
-        power_spectrum = np.abs(fft_values)
-        power_spectrum[~freq_mask] = 0
+        if len(self.signal_buffer) < 60:  # 최소 2초 데이터 필요
+            return {name: (None, 0.0) for name in self.roi_names}
+        
+        stacked = np.stack([self.roi_buffers[name].view() for name in self.roi_names])
+        fps = self.fps
+        if self.use_timestamps:
+            # ROI 버퍼는 공통 타임스탬프 버퍼와 길이가 같으므로 같은 격자로 재샘플링
+            measured_fps = measure_analysis_rate(self.timestamp_buffer.view())
+            if measured_fps is not None:
+                fps = measured_fps
+                timestamps = self.timestamp_buffer.view()
+                stacked = np.stack([resample_uniform(timestamps, row, fps) for row in stacked])
+        stacked = stacked - stacked.mean(axis=1, keepdims=True)
+        
+        plan = get_spectral_plan(fps, stacked.shape[1], min_bpm / 60.0, max_bpm / 60.0, 0.7, 4.0)
+        spectra = plan.spectrum(plan.filter(stacked))
+        
+        results = {}
+        for name, spectrum in zip(self.roi_names, spectra):
+            dominant_freq, confidence = plan.estimate(spectrum, 1.0, 5.0)
+            results[name] = (dominant_freq * 60, confidence) if dominant_freq is not None else (None, 0.0)
+        return results
+    
+    @timed('calculate_track_vitals')
+    def calculate_track_vitals(self, min_bpm=40, max_bpm=200, min_rpm=8, max_rpm=30):
+        """
+        얼굴 트랙별 심박수와 호흡률 계산 (다중 얼굴 모드)
         
-        max_power_idx = np.argmax(power_spectrum)
-        dominant_freq = abs(fft_freq[max_power_idx])
+        모든 트랙을 한 번의 배치 FFT / 피크 추정으로 처리합니다.
         
-        # RPM으로 변환
-        respiration_rate = dominant_freq * 60
+        Args:
+            min_bpm: 최소 심박수
+            max_bpm: 최대 심박수
+            min_rpm: 최소 호흡률 (분당 호흡 수)
+            max_rpm: 최대 호흡률 (분당 호흡 수)
+            
+        Returns:
+            {트랙 ID: ((심박수, 신뢰도), (호흡률, 신뢰도))} 딕셔너리
+        """
+        if not self.multi_face:
+            return {}
         
-        # 신뢰도 계산 (개선된 방식)
-        max_power = power_spectrum[max_power_idx]
+        return self.face_tracker.calculate_vitals(self.fps, min_bpm, max_bpm, min_rpm, max_rpm,
+                                                  use_timestamps=self.use_timestamps)
+    
+    def get_timing_stats(self):
+        """
+        단계별 실행 시간 통계 반환 (timing=True일 때)
         
-        # 피크 주변의 파워 제외하고 평균 계산 (노이즈 추정)
-        # 피크 주변 ±2개 인덱스 제외
-        peak_window = 2
-        noise_mask = freq_mask.copy()
-        if max_power_idx - peak_window >= 0 and max_power_idx + peak_window < len(noise_mask):
-            noise_mask[max(0, max_power_idx - peak_window):min(len(noise_mask), max_power_idx + peak_window + 1)] = False
+        Returns:
+            {단계 이름: {count, mean_ms, p50_ms, p95_ms, p99_ms, max_ms}} 딕셔너리
+        """
+        return self.timer.snapshot()
+    
+    def get_effective_fps(self):
+        """
+        타임스탬프 버퍼로 측정한 실제 유효 샘플링 주파수
         
-        if np.any(noise_mask):
-            noise_power = np.mean(power_spectrum[noise_mask])
-        else:
-            # 피크 주변만 있으면 전체 평균 사용
-            noise_power = np.mean(power_spectrum[freq_mask])
-        
-        # Signal-to-Noise Ratio (SNR) 기반 신뢰도
-        snr = max_power / (noise_power + 1e-6)
-        
-        # SNR을 0-1 범위로 정규화 (경험적 임계값 사용)
-        # 호흡률은 더 낮은 주파수이므로 임계값 조정
-        snr_threshold_low = 0.8
-        snr_threshold_high = 4.0
-        confidence = np.clip((snr - snr_threshold_low) / (snr_threshold_high - snr_threshold_low), 0.0, 1.0)
-        
-        # 추가: 피크의 두드러짐 (peak prominence) 고려
-        sorted_powers = np.sort(power_spectrum[freq_mask])[::-1]
-        if len(sorted_powers) > 1:
-            peak_prominence = (max_power - sorted_powers[1]) / (max_power + 1e-6)
-            # prominence를 신뢰도에 반영 (가중 평균)
-            confidence = 0.7 * confidence + 0.3 * peak_prominence
-        
-        return respiration_rate, confidence
+        Returns:
+            유효 fps, 측정 불가 시 None
+        """
+        return measure_sampling_rate(self.timestamp_buffer.view())
+    
+    def _get_analysis_signal(self):
+        """
+        배치 분석용 디트렌딩된 신호와 샘플링 주파수 반환
+        
+        use_timestamps 모드에서는 측정된 유효 fps(0.5 Hz 단위로 반올림, 스펙트럼 계획 캐시 재사용)의
+        균일 격자로 재샘플링합니다.
+        
+        Returns:
+            디트렌딩된 신호, 샘플링 주파수
+        """
+        if self.use_timestamps:
+            fps = measure_analysis_rate(self.timestamp_buffer.view())
+            if fps is not None:
+                resampled = resample_uniform(self.timestamp_buffer.view(), self.signal_buffer.view(), fps)
+                return resampled - np.mean(resampled), fps
+        
+        # 신호 정규화 및 디트렌딩 (링 버퍼 뷰와 누적 평균 사용, 복사 없음)
+        return self.signal_buffer.view() - self.signal_buffer.mean(), self.fps
     
     def get_signal_stats(self):
         """
@@ -342,5 +937,5 @@ class RPPGDetector:
         if len(self.signal_buffer) == 0:
             return 0, 0
         
-        return len(self.signal_buffer), np.mean(self.signal_buffer)
+        return len(self.signal_buffer), self.signal_buffer.mean()
 
@@ -0,0 +1,621 @@
+"""
+신호 처리 유틸리티
+rPPG 감지기(dlib / MediaPipe 버전)가 공통으로 사용하는 신호 처리 도구를 제공합니다.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+from scipy import signal
+from scipy.fft import rfft, rfftfreq
+
+
+def _sos_step(coeffs, state, x):
+    """
+    SOS 필터에 스칼라 샘플 하나를 통과시킴 (Direct Form II Transposed, 섹션별 순차 적용)
+
+    Args:
+        coeffs: 섹션별 (b0, b1, b2, a0, a1, a2) 튜플 리스트
+        state: 섹션별 [z0, z1] 상태 리스트 (제자리 갱신)
+        x: 입력 샘플
+
+    Returns:
+        필터링된 샘플
+    """
+    for (b0, b1, b2, _a0, a1, a2), z in zip(coeffs, state):
+        y = b0 * x + z[0]
+        z[0] = b1 * x - a1 * y + z[1]
+        z[1] = b2 * x - a2 * y
+        x = y
+    return x
+
+
+class StreamingBandpassFilter:
+    def __init__(self, low_hz, high_hz, fps, order=3):
+        """
+        상태(zi)를 유지하는 인과(causal) 밴드패스 필터 초기화
+
+        2차 섹션(SOS) 형태의 Butterworth 필터를 한 번만 설계하고,
+        샘플이 들어올 때마다 내부 상태를 갱신하여 프레임당 O(1)로 필터링합니다.
+
+        Args:
+            low_hz: 통과 대역 하한 주파수 (Hz)
+            high_hz: 통과 대역 상한 주파수 (Hz)
+            fps: 샘플링 주파수 (초당 프레임 수)
+            order: 필터 차수
+        """
+        self.low_hz = low_hz
+        self.high_hz = high_hz
+        self.fps = fps
+        self.order = order
+
+        nyquist = fps / 2
+        self.sos = signal.butter(order, [low_hz / nyquist, high_hz / nyquist],
+                                 btype='band', output='sos')
+
+        # 섹션별 계수를 파이썬 float로 풀어두기 (스칼라 연산이 numpy 호출보다 빠름)
+        self._coeffs = [tuple(float(c) for c in section) for section in self.sos]
+        self._zi_unit = signal.sosfilt_zi(self.sos)
+        self._state = None
+
+    def reset(self):
+        """필터 내부 상태 초기화"""
+        self._state = None
+
+    def process(self, value):
+        """
+        샘플 하나를 필터에 통과시킴
+
+        Args:
+            value: 입력 샘플
+
+        Returns:
+            필터링된 샘플
+        """
+        x = float(value)
+
+        if self._state is None:
+            # 첫 샘플 값으로 정상 상태를 가정하여 시작 시 과도 응답(step) 방지
+            self._state = [[float(z0) * x, float(z1) * x] for z0, z1 in self._zi_unit]
+
+        return _sos_step(self._coeffs, self._state, x)
+
+
+class Decimator:
+    def __init__(self, fps, target_fps=4.0, order=4):
+        """
+        스트리밍 데시메이터 초기화 (안티앨리어싱 저역통과 필터 + 다운샘플링)
+
+        Args:
+            fps: 입력 샘플링 주파수 (Hz)
+            target_fps: 목표 샘플링 주파수 (Hz, 정수 배 다운샘플링으로 근사)
+            order: 안티앨리어싱 필터 차수
+        """
+        self.factor = max(1, int(round(fps / target_fps)))
+        self.fps = fps / self.factor
+
+        # 출력 나이퀴스트의 80%에서 차단하여 앨리어싱 방지
+        cutoff = 0.8 * (self.fps / 2) / (fps / 2)
+        sos = signal.butter(order, cutoff, btype='low', output='sos')
+        self._coeffs = [tuple(float(c) for c in section) for section in sos]
+        self._zi_unit = signal.sosfilt_zi(sos)
+        self._state = None
+        self._phase = 0
+
+    def reset(self):
+        """필터 상태 및 다운샘플링 위상 초기화"""
+        self._state = None
+        self._phase = 0
+
+    def process(self, value):
+        """
+        샘플 하나를 저역통과 필터에 통과시키고 factor개마다 하나를 출력
+
+        Args:
+            value: 입력 샘플
+
+        Returns:
+            다운샘플링된 샘플 (이번 입력에서 출력이 없으면 None)
+        """
+        x = float(value)
+
+        if self._state is None:
+            self._state = [[float(z0) * x, float(z1) * x] for z0, z1 in self._zi_unit]
+
+        x = _sos_step(self._coeffs, self._state, x)
+
+        self._phase += 1
+        if self._phase < self.factor:
+            return None
+        self._phase = 0
+        return x
+
+
+def measure_sampling_rate(timestamps):
+    """
+    타임스탬프로부터 실제 유효 샘플링 주파수 측정
+
+    Args:
+        timestamps: 시간 순서로 정렬된 타임스탬프 배열 (초)
+
+    Returns:
+        유효 샘플링 주파수 (Hz), 측정 불가 시 None
+    """
+    if len(timestamps) < 2:
+        return None
+
+    duration = timestamps[-1] - timestamps[0]
+    if duration <= 0:
+        return None
+
+    return (len(timestamps) - 1) / duration
+
+
+def resample_uniform(timestamps, values, fps):
+    """
+    불규칙한 타임스탬프의 신호를 균일한 시간 격자로 재샘플링 (벡터화된 선형 보간)
+
+    Args:
+        timestamps: 시간 순서로 정렬된 타임스탬프 배열 (초)
+        values: 타임스탬프별 신호 값
+        fps: 목표 샘플링 주파수 (Hz)
+
+    Returns:
+        균일 격자로 재샘플링된 신호
+    """
+    start = timestamps[0]
+    num_samples = int(np.floor((timestamps[-1] - start) * fps)) + 1
+    grid = start + np.arange(num_samples) / fps
+    return np.interp(grid, timestamps, values)
+
+
+def measure_analysis_rate(timestamps):
+    """
+    배치 분석에 사용할 샘플링 주파수 측정 (0.5 Hz 단위로 반올림하여 스펙트럼 계획 캐시 재사용)
+
+    Args:
+        timestamps: 시간 순서로 정렬된 타임스탬프 배열 (초)
+
+    Returns:
+        분석 샘플링 주파수 (Hz), 측정 불가 시 None
+    """
+    effective_fps = measure_sampling_rate(timestamps)
+    if effective_fps is None:
+        return None
+    return max(1.0, round(effective_fps * 2) / 2)
+
+
+def check_timestamp_options(use_timestamps, streaming=False, sliding_dft=False, respiration_window=None):
+    """
+    use_timestamps와 함께 쓸 수 없는 옵션 조합 확인
+
+    스트리밍 필터 / Sliding DFT / 호흡률 데시메이터는 샘플마다 고정 샘플링 주파수로 설계된 상태를
+    갱신하므로, 측정된 fps로 재샘플링하는 배치 분석과 달리 실제 프레임 간격을 반영할 수 없습니다.
+
+    Args:
+        use_timestamps: 타임스탬프 기반 분석 사용 여부
+        streaming: 스트리밍 필터 모드 사용 여부
+        sliding_dft: Sliding DFT 모드 사용 여부
+        respiration_window: 호흡률 전용 장기 버퍼 길이 (초, 사용하지 않으면 None)
+
+    Returns:
+        오류 메시지, 조합이 유효하면 None
+    """
+    if not use_timestamps:
+        return None
+
+    conflicts = []
+    if streaming:
+        conflicts.append("streaming")
+    if sliding_dft:
+        conflicts.append("sliding_dft")
+    if respiration_window is not None:
+        conflicts.append("respiration_window")
+
+    if not conflicts:
+        return None
+    return (f"use_timestamps는 {', '.join(conflicts)}와 함께 사용할 수 없습니다 "
+            "(샘플마다 갱신하는 필터는 명목 fps로 동작)")
+
+
+class RingBuffer:
+    def __init__(self, capacity, dtype=np.float64):
+        """
+        고정 용량의 NumPy 링 버퍼 초기화
+
+        값을 두 번(i, i + capacity) 기록하여 항상 연속된 메모리 구간으로
+        시간 순서 뷰를 복사 없이 제공하고, 누적 합계를 유지하여 평균을 O(1)로 계산합니다.
+
+        Args:
+            capacity: 버퍼 용량 (샘플 수)
+            dtype: 저장할 데이터 타입 (float32 / float64)
+        """
+        self.capacity = int(capacity)
+        self.dtype = np.dtype(dtype)
+        self._data = np.zeros(2 * self.capacity, dtype=self.dtype)
+        self._head = 0
+        self._count = 0
+        self._sum = 0.0
+
+    def __len__(self):
+        return self._count
+
+    def __array__(self, dtype=None, copy=None):
+        return np.array(self.view(), dtype=dtype)
+
+    @property
+    def maxlen(self):
+        """deque와 호환되는 최대 길이"""
+        return self.capacity
+
+    def is_full(self):
+        """버퍼가 가득 찼는지 여부"""
+        return self._count == self.capacity
+
+    def clear(self):
+        """버퍼 비우기 (메모리는 재할당하지 않음)"""
+        self._head = 0
+        self._count = 0
+        self._sum = 0.0
+
+    def append(self, value):
+        """
+        값 추가 (가득 찬 경우 가장 오래된 값을 덮어씀)
+
+        Args:
+            value: 추가할 값
+        """
+        value = float(value)
+        head = self._head
+
+        if self._count == self.capacity:
+            self._sum -= float(self._data[head])
+        else:
+            self._count += 1
+
+        self._data[head] = value
+        self._data[head + self.capacity] = value
+        self._sum += value
+
+        head += 1
+        if head == self.capacity:
+            head = 0
+            # 한 바퀴마다 누적 합계를 다시 계산하여 부동소수점 오차 누적 방지 (분할 상환 O(1))
+            self._sum = float(np.sum(self._data[:self.capacity], dtype=np.float64))
+        self._head = head
+
+    def view(self):
+        """
+        오래된 값부터 최신 값까지 시간 순서대로 정렬된 읽기 전용 뷰 (복사 없음)
+
+        Returns:
+            NumPy 배열 뷰
+        """
+        start = (self._head - self._count) % self.capacity if self._count else 0
+        result = self._data[start:start + self._count]
+        result.flags.writeable = False
+        return result
+
+    def last(self):
+        """가장 최근 값 (비어 있으면 None)"""
+        if self._count == 0:
+            return None
+        return float(self._data[(self._head - 1) % self.capacity])
+
+    def sum(self):
+        """버퍼 내 값의 누적 합계"""
+        return self._sum
+
+    def mean(self):
+        """버퍼 내 값의 평균 (비어 있으면 0)"""
+        if self._count == 0:
+            return 0.0
+        return self._sum / self._count
+
+
+def spectral_peak_confidence(band_power, band_freqs, snr_low, snr_high, peak_window=2):
+    """
+    대역 내 스펙트럼에서 주 주파수와 신뢰도 계산
+
+    피크 주변(±peak_window 빈)을 제외한 평균으로 노이즈를 추정하여 SNR 기반 신뢰도를 구하고,
+    두 번째 피크 대비 두드러짐(prominence)을 가중 평균으로 반영합니다.
+
+    Args:
+        band_power: 대역 내 주파수 빈의 크기 스펙트럼
+        band_freqs: 대역 내 주파수 빈의 주파수 (Hz)
+        snr_low: 신뢰도 0에 해당하는 SNR
+        snr_high: 신뢰도 1에 해당하는 SNR
+        peak_window: 노이즈 추정 시 제외할 피크 주변 빈 수
+
+    Returns:
+        주 주파수 (Hz), 신뢰도 점수
+    """
+    n = len(band_power)
+    if n == 0:
+        return None, 0.0
+
+    max_power_idx = int(np.argmax(band_power))
+    max_power = band_power[max_power_idx]
+    dominant_freq = abs(band_freqs[max_power_idx])
+
+    # 피크 주변의 파워 제외하고 평균 계산 (노이즈 추정)
+    noise_mask = np.ones(n, dtype=bool)
+    noise_mask[max(0, max_power_idx - peak_window):max_power_idx + peak_window + 1] = False
+
+    if np.any(noise_mask):
+        noise_power = np.mean(band_power[noise_mask])
+    else:
+        # 피크 주변만 있으면 전체 평균 사용
+        noise_power = np.mean(band_power)
+
+    # Signal-to-Noise Ratio (SNR) 기반 신뢰도
+    snr = max_power / (noise_power + 1e-6)
+    confidence = np.clip((snr - snr_low) / (snr_high - snr_low), 0.0, 1.0)
+
+    # 피크의 두드러짐 (최대값이 두 번째 최대값보다 얼마나 큰지)
+    if n > 1:
+        second_power = np.partition(band_power, n - 2)[n - 2]
+        peak_prominence = (max_power - second_power) / (max_power + 1e-6)
+        confidence = 0.7 * confidence + 0.3 * peak_prominence
+
+    return dominant_freq, confidence
+
+
+def spectral_peak_confidence_batch(band_power, band_freqs, snr_low, snr_high, peak_window=2):
+    """
+    여러 신호의 대역 내 스펙트럼에서 주 주파수와 신뢰도를 한 번에 계산
+
+    spectral_peak_confidence와 같은 계산을 (신호 수, 빈 수) 배열에 대해 벡터화합니다.
+
+    Args:
+        band_power: 대역 내 크기 스펙트럼 배열 (신호 수 x 빈 수)
+        band_freqs: 대역 내 주파수 빈의 주파수 (Hz)
+        snr_low: 신뢰도 0에 해당하는 SNR
+        snr_high: 신뢰도 1에 해당하는 SNR
+        peak_window: 노이즈 추정 시 제외할 피크 주변 빈 수
+
+    Returns:
+        주 주파수 배열 (Hz), 신뢰도 점수 배열
+    """
+    count, n = band_power.shape
+    if n == 0:
+        return np.full(count, np.nan), np.zeros(count)
+
+    max_power_idx = np.argmax(band_power, axis=1)
+    max_power = band_power[np.arange(count), max_power_idx]
+    dominant_freq = np.abs(band_freqs[max_power_idx])
+
+    # 피크 주변(±peak_window 빈)을 제외한 평균으로 노이즈 추정 (제외 후 남는 빈이 없으면 전체 평균)
+    noise_mask = np.abs(np.arange(n) - max_power_idx[:, None]) > peak_window
+    noise_count = noise_mask.sum(axis=1)
+    noise_power = np.where(noise_count > 0,
+                           (band_power * noise_mask).sum(axis=1) / np.maximum(noise_count, 1),
+                           band_power.mean(axis=1))
+
+    snr = max_power / (noise_power + 1e-6)
+    confidence = np.clip((snr - snr_low) / (snr_high - snr_low), 0.0, 1.0)
+
+    if n > 1:
+        second_power = np.partition(band_power, n - 2, axis=1)[:, n - 2]
+        peak_prominence = (max_power - second_power) / (max_power + 1e-6)
+        confidence = 0.7 * confidence + 0.3 * peak_prominence
+
+    return dominant_freq, confidence
+
+
+class SlidingDFT:
+    def __init__(self, window_size, fps, min_freq, max_freq):
+        """
+        관심 대역의 DFT 빈만 샘플마다 갱신하는 Sliding DFT 초기화
+
+        전체 FFT 대신 대역 내 K개 빈만 유지하므로 샘플당 O(K)로 최신 스펙트럼을 얻을 수 있습니다.
+
+        Args:
+            window_size: 분석 윈도우 길이 (샘플 수)
+            fps: 샘플링 주파수 (Hz)
+            min_freq: 대역 하한 주파수 (Hz)
+            max_freq: 대역 상한 주파수 (Hz)
+        """
+        self.window_size = int(window_size)
+        self.fps = fps
+
+        n = self.window_size
+        k_min = max(1, int(np.ceil(min_freq * n / fps)))
+        k_max = min(n // 2, int(np.floor(max_freq * n / fps)))
+        self.bins = np.arange(k_min, k_max + 1)
+        self.freqs = self.bins * fps / n
+
+        self._twiddle = np.exp(2j * np.pi * self.bins / n)
+        self._spectrum = np.zeros(len(self.bins), dtype=np.complex128)
+        self._samples = RingBuffer(n)
+        self._since_refresh = 0
+
+    def __len__(self):
+        return len(self._samples)
+
+    def reset(self):
+        """스펙트럼 및 샘플 초기화"""
+        self._spectrum[:] = 0
+        self._samples.clear()
+        self._since_refresh = 0
+
+    def update(self, value):
+        """
+        샘플 하나로 대역 내 DFT 빈 갱신
+
+        Args:
+            value: 입력 샘플 (필터링된 신호 권장)
+        """
+        value = float(value)
+        oldest = self._samples.view()[0] if self._samples.is_full() else 0.0
+        self._samples.append(value)
+
+        self._spectrum += value - oldest
+        self._spectrum *= self._twiddle
+
+        # 윈도우 길이마다 정확히 재계산하여 누적 반올림 오차 제거 (분할 상환 O(K))
+        self._since_refresh += 1
+        if self._since_refresh >= self.window_size:
+            self._refresh()
+
+    def _refresh(self):
+        """현재 윈도우로 대역 내 DFT 빈을 직접 계산"""
+        samples = self._samples.view()
+        n = self.window_size
+        positions = np.arange(n - len(samples), n)
+        kernel = np.exp(-2j * np.pi * np.outer(self.bins, positions) / n)
+        self._spectrum = kernel @ samples
+        self._since_refresh = 0
+
+    def magnitude(self):
+        """대역 내 빈의 크기 스펙트럼"""
+        return np.abs(self._spectrum)
+
+    def estimate(self, min_freq, max_freq, snr_low, snr_high):
+        """
+        현재 스펙트럼에서 주 주파수와 신뢰도 추정
+
+        Args:
+            min_freq: 탐색 하한 주파수 (Hz)
+            max_freq: 탐색 상한 주파수 (Hz)
+            snr_low: 신뢰도 0에 해당하는 SNR
+            snr_high: 신뢰도 1에 해당하는 SNR
+
+        Returns:
+            주 주파수 (Hz), 신뢰도 점수
+        """
+        freq_mask = (self.freqs >= min_freq) & (self.freqs <= max_freq)
+        if not np.any(freq_mask):
+            return None, 0.0
+
+        return spectral_peak_confidence(
+            self.magnitude()[freq_mask], self.freqs[freq_mask], snr_low, snr_high
+        )
+
+
+class SpectralPlan:
+    def __init__(self, fps, window_size, min_freq, max_freq, filter_low, filter_high,
+                 filter_order=3, window='boxcar'):
+        """
+        (fps, 윈도우 길이, 대역) 조합별로 한 번만 준비하는 스펙트럼 분석 계획
+
+        필터 SOS 계수, 윈도우 함수, rfft 주파수 격자, 대역 인덱스 범위와
+        대역 내 필터 이득(|H(f)|^2, filtfilt와 동일한 영위상 이득)을 미리 계산합니다.
+
+        Args:
+            fps: 샘플링 주파수 (Hz)
+            window_size: 분석 윈도우 길이 (샘플 수)
+            min_freq: 탐색 대역 하한 주파수 (Hz)
+            max_freq: 탐색 대역 상한 주파수 (Hz)
+            filter_low: 밴드패스 필터 하한 주파수 (Hz)
+            filter_high: 밴드패스 필터 상한 주파수 (Hz)
+            filter_order: 필터 차수
+            window: scipy.signal.get_window 윈도우 이름 ('boxcar'는 기존 동작과 동일)
+        """
+        self.fps = fps
+        self.window_size = window_size
+
+        nyquist = fps / 2
+        self.sos = signal.butter(filter_order, [filter_low / nyquist, filter_high / nyquist],
+                                 btype='band', output='sos')
+        self.window = signal.get_window(window, window_size)
+        self.freqs = rfftfreq(window_size, 1.0 / fps)
+
+        band_indices = np.flatnonzero((self.freqs >= min_freq) & (self.freqs <= max_freq))
+        if len(band_indices) == 0:
+            self.band = None
+            self.band_freqs = np.empty(0)
+            self.band_gain = np.empty(0)
+        else:
+            self.band = slice(band_indices[0], band_indices[-1] + 1)
+            self.band_freqs = self.freqs[self.band]
+            _, response = signal.sosfreqz(self.sos, worN=self.band_freqs, fs=fps)
+            self.band_gain = np.abs(response) ** 2
+
+    def filter(self, signal_array):
+        """
+        시간 영역 영위상 밴드패스 필터링
+
+        Args:
+            signal_array: 디트렌딩된 신호
+
+        Returns:
+            필터링된 신호
+        """
+        return signal.sosfiltfilt(self.sos, signal_array)
+
+    def spectrum(self, signal_array):
+        """
+        윈도우를 적용한 실수 FFT
+
+        Args:
+            signal_array: 길이가 window_size인 신호
+
+        Returns:
+            rfft 결과 (복소수 배열)
+        """
+        return rfft(signal_array * self.window)
+
+    def estimate(self, spectrum, snr_low, snr_high, apply_filter_gain=False):
+        """
+        rfft 스펙트럼에서 대역 내 주 주파수와 신뢰도 추정
+
+        Args:
+            spectrum: spectrum()의 결과 (필터링된 신호 또는 원 신호)
+            snr_low: 신뢰도 0에 해당하는 SNR
+            snr_high: 신뢰도 1에 해당하는 SNR
+            apply_filter_gain: True이면 원 신호 스펙트럼에 필터 이득을 곱해
+                               시간 영역 필터링을 주파수 영역에서 대신함
+
+        Returns:
+            주 주파수 (Hz), 신뢰도 점수
+        """
+        if self.band is None:
+            return None, 0.0
+
+        band_power = np.abs(spectrum[self.band])
+        if apply_filter_gain:
+            band_power = band_power * self.band_gain
+
+        return spectral_peak_confidence(band_power, self.band_freqs, snr_low, snr_high)
+
+    def estimate_batch(self, spectra, snr_low, snr_high, apply_filter_gain=False):
+        """
+        여러 신호의 rfft 스펙트럼 (신호 수 x 빈 수)에서 주 주파수와 신뢰도를 한 번에 추정
+
+        Args:
+            spectra: spectrum()에 (신호 수 x window_size) 배열을 넣은 결과
+            snr_low: 신뢰도 0에 해당하는 SNR
+            snr_high: 신뢰도 1에 해당하는 SNR
+            apply_filter_gain: True이면 필터 이득을 주파수 영역에서 적용
+
+        Returns:
+            주 주파수 배열 (Hz, 대역이 없으면 NaN), 신뢰도 점수 배열
+        """
+        if self.band is None:
+            return np.full(len(spectra), np.nan), np.zeros(len(spectra))
+
+        band_power = np.abs(spectra[:, self.band])
+        if apply_filter_gain:
+            band_power = band_power * self.band_gain
+
+        return spectral_peak_confidence_batch(band_power, self.band_freqs, snr_low, snr_high)
+
+
+@lru_cache(maxsize=32)
+def get_spectral_plan(fps, window_size, min_freq, max_freq, filter_low, filter_high):
+    """
+    캐시된 SpectralPlan 반환 (같은 조합이면 계수를 다시 설계하지 않음)
+
+    Args:
+        fps: 샘플링 주파수 (Hz)
+        window_size: 분석 윈도우 길이 (샘플 수)
+        min_freq: 탐색 대역 하한 주파수 (Hz)
+        max_freq: 탐색 대역 상한 주파수 (Hz)
+        filter_low: 밴드패스 필터 하한 주파수 (Hz)
+        filter_high: 밴드패스 필터 상한 주파수 (Hz)
+
+    Returns:
+        SpectralPlan 인스턴스
+    """
+    return SpectralPlan(fps, window_size, min_freq, max_freq, filter_low, filter_high)
@@ -0,0 +1,503 @@
+"""
+rPPG 멀티 카메라 슈퍼바이저
+한 호스트에서 여러 카메라의 rPPG 측정을 카메라별 워커 프로세스로 실행하고,
+결과를 하나의 MQTT 클라이언트로 카메라별 토픽에 발행합니다.
+
+사용 예:
+    python supervisor.py 0 1 2 3
+    python supervisor.py 0 rtsp://192.168.0.10/stream --detector dlib --detection-scale 0.5
+"""
+
+import argparse
+import multiprocessing
+import os
+import queue
+import time
+
+import cv2
+import numpy as np
+
+from camera_utils import open_camera
+from mqtt_client import MQTTClient, create_mqtt_client_from_config, create_mqtt_client_from_env
+from signal_utils import check_timestamp_options
+
+
+def parse_source(source):
+    """
+    카메라 소스 문자열 변환 (숫자면 카메라 인덱스, 아니면 URI/파일 경로)
+
+    Args:
+        source: 명령줄에서 받은 카메라 소스 문자열
+
+    Returns:
+        카메라 인덱스(int) 또는 URI 문자열
+    """
+    return int(source) if source.isdigit() else source
+
+
+def open_capture(source):
+    """
+    카메라 소스 열기 (카메라 인덱스는 camera_utils.open_camera로 플랫폼 백엔드 사용)
+
+    Args:
+        source: 카메라 인덱스 또는 URI
+
+    Returns:
+        cv2.VideoCapture 객체
+    """
+    if isinstance(source, int):
+        return open_camera(source)
+    return cv2.VideoCapture(source)
+
+
+def create_detector(backend, fps, detector_options):
+    """
+    백엔드에 맞는 RPPGDetector 생성 (워커 프로세스 안에서 모델 로드)
+
+    Args:
+        backend: 'mediapipe' 또는 'dlib'
+        fps: 카메라 fps
+        detector_options: RPPGDetector 생성자 키워드 인수
+
+    Returns:
+        RPPGDetector 인스턴스
+    """
+    if backend == 'dlib':
+        from rppg import RPPGDetector
+    else:
+        from rppg_mediapipe import RPPGDetector
+    return RPPGDetector(fps=fps, **detector_options)
+
+
+def camera_worker(camera_id, source, backend, detector_options, update_interval,
+                  result_queue, stop_event, max_failures=10):
+    """
+    카메라 하나의 캡처 + rPPG 측정을 수행하는 워커 프로세스 본체
+
+    update_interval마다 심박수/호흡률과 함께 처리 fps, 프로세스 CPU 점유율
+    (프로세스 CPU 시간 / 경과 시간, 1.0 = 코어 하나)을 결과 큐로 보냅니다.
+
+    Args:
+        camera_id: 카메라 식별자 (토픽 이름에 사용)
+        source: 카메라 인덱스 또는 URI
+        backend: 'mediapipe' 또는 'dlib'
+        detector_options: RPPGDetector 생성자 키워드 인수
+        update_interval: 심박수/호흡률 계산 간격 (초)
+        result_queue: 슈퍼바이저로 결과를 보낼 multiprocessing.Queue
+        stop_event: 종료 요청 multiprocessing.Event
+        max_failures: 연속 프레임 읽기 실패 허용 횟수
+    """
+    # 카메라마다 프로세스가 따로 있으므로 OpenCV 내부 스레드는 하나만 사용 (코어 과다 점유 방지)
+    cv2.setNumThreads(1)
+
+    cap = open_capture(source)
+    if not cap.isOpened():
+        result_queue.put({"type": "error", "camera": camera_id,
+                          "message": f"카메라 소스 {source}를 열 수 없습니다."})
+        return
+
+    fps = int(cap.get(cv2.CAP_PROP_FPS))
+    if fps <= 0:
+        fps = 30
+
+    try:
+        detector = create_detector(backend, fps, detector_options)
+    except Exception as e:
+        cap.release()
+        result_queue.put({"type": "error", "camera": camera_id,
+                          "message": f"감지기 초기화 실패: {e}"})
+        return
+
+    frames = 0
+    consecutive_failures = 0
+    last_update_time = time.time()
+    last_cpu_time = time.process_time()
+
+    try:
+        while not stop_event.is_set():
+            ret, frame = cap.read()
+            capture_time = time.time()
+
+            if not ret:
+                consecutive_failures += 1
+                if consecutive_failures >= max_failures:
+                    result_queue.put({"type": "error", "camera": camera_id,
+                                      "message": f"{max_failures}번 연속으로 프레임을 읽을 수 없습니다."})
+                    break
+                time.sleep(0.1)
+                continue
+
+            consecutive_failures = 0
+            frames += 1
+
+            _, _, signal_value = detector.process_frame(frame, capture_time)
+            if signal_value is not None:
+                detector.add_signal(signal_value, capture_time, roi_values=detector.last_roi_values)
+
+            elapsed = capture_time - last_update_time
+            if elapsed >= update_interval:
+                (heart_rate, hr_confidence), (respiration_rate, rr_confidence) = detector.calculate_vitals()
+                cpu_time = time.process_time()
+
+                result_queue.put({
+                    "type": "vitals",
+                    "camera": camera_id,
+                    "timestamp": capture_time,
+                    "heart_rate": heart_rate,
+                    "hr_confidence": hr_confidence,
+                    "respiration_rate": respiration_rate,
+                    "rr_confidence": rr_confidence,
+                    "fps": frames / elapsed,
+                    "effective_fps": detector.get_effective_fps(),
+                    "cpu": (cpu_time - last_cpu_time) / elapsed,
+                    "buffer": len(detector.signal_buffer)
+                })
+
+                frames = 0
+                last_update_time = capture_time
+                last_cpu_time = cpu_time
+    except KeyboardInterrupt:
+        # 종료는 슈퍼바이저가 stop_event로 처리
+        pass
+    finally:
+        cap.release()
+
+
+class CameraStatus:
+    def __init__(self, camera_id, source, history_size=10):
+        """
+        슈퍼바이저가 관리하는 카메라별 상태 초기화
+
+        Args:
+            camera_id: 카메라 식별자
+            source: 카메라 인덱스 또는 URI
+            history_size: 심박수/호흡률 이동 평균 길이
+        """
+        self.camera_id = camera_id
+        self.source = source
+        self.history_size = history_size
+
+        self.process = None
+        self.error = None
+        self.fps = 0.0
+        self.cpu = 0.0
+        self.buffer = 0
+        self.heart_rate_history = []
+        self.respiration_rate_history = []
+        self.hr_confidence = 0.0
+        self.last_update = None
+
+    def update(self, message):
+        """
+        워커의 측정 결과 반영
+
+        Args:
+            message: 워커가 보낸 'vitals' 메시지
+
+        Returns:
+            (평균 심박수, 평균 호흡률), 값이 없으면 None
+        """
+        self.fps = message["fps"]
+        self.cpu = message["cpu"]
+        self.buffer = message["buffer"]
+        self.last_update = message["timestamp"]
+
+        if message["heart_rate"] is not None:
+            self.heart_rate_history.append(message["heart_rate"])
+            if len(self.heart_rate_history) > self.history_size:
+                self.heart_rate_history.pop(0)
+            self.hr_confidence = message["hr_confidence"]
+
+        if message["respiration_rate"] is not None:
+            self.respiration_rate_history.append(message["respiration_rate"])
+            if len(self.respiration_rate_history) > self.history_size:
+                self.respiration_rate_history.pop(0)
+
+        avg_heart_rate = np.mean(self.heart_rate_history) if message["heart_rate"] is not None else None
+        avg_respiration_rate = (np.mean(self.respiration_rate_history)
+                                if message["respiration_rate"] is not None else None)
+        return avg_heart_rate, avg_respiration_rate
+
+
+class CameraSupervisor:
+    def __init__(self, sources, backend='mediapipe', detector_options=None, mqtt_client=None,
+                 topic_prefix=None, update_interval=1.0, report_interval=5.0):
+        """
+        멀티 카메라 슈퍼바이저 초기화
+
+        카메라마다 워커 프로세스를 하나씩 띄워 dlib / MediaPipe가 서로 다른 코어에서
+        실행되도록 하고, 결과는 하나의 큐로 모아 공유 MQTT 클라이언트로 발행합니다.
+
+        Args:
+            sources: 카메라 인덱스 또는 URI 목록
+            backend: 'mediapipe' 또는 'dlib'
+            detector_options: RPPGDetector 생성자 키워드 인수
+            mqtt_client: 공유 MQTTClient (None이면 전송 안 함)
+            topic_prefix: 카메라별 토픽 접두사 (토픽: {topic_prefix}/{camera_id})
+            update_interval: 심박수/호흡률 계산 간격 (초)
+            report_interval: 카메라별 fps / CPU 점유율 보고 간격 (초)
+        """
+        self.backend = backend
+        self.detector_options = detector_options or {}
+        self.mqtt_client = mqtt_client
+        if topic_prefix is None:
+            topic_prefix = mqtt_client.topic if mqtt_client else "rppg/vital_signs"
+        self.topic_prefix = topic_prefix.rstrip('/')
+        self.update_interval = update_interval
+        self.report_interval = report_interval
+
+        self.cameras = {f"cam{i}": CameraStatus(f"cam{i}", source) for i, source in enumerate(sources)}
+
+        # spawn: 워커마다 모델을 새로 로드 (fork 시 MediaPipe/스레드 상태 복제 문제 방지)
+        self._context = multiprocessing.get_context('spawn')
+        self.result_queue = self._context.Queue()
+        self.stop_event = self._context.Event()
+
+    def get_topic(self, camera_id):
+        """카메라별 MQTT 토픽"""
+        return f"{self.topic_prefix}/{camera_id}"
+
+    def start(self):
+        """카메라별 워커 프로세스 시작"""
+        for camera_id, status in self.cameras.items():
+            status.process = self._context.Process(
+                target=camera_worker,
+                args=(camera_id, status.source, self.backend, self.detector_options,
+                      self.update_interval, self.result_queue, self.stop_event),
+                name=f"rppg-{camera_id}",
+                daemon=True
+            )
+            status.process.start()
+            print(f"📹 {camera_id}: 소스 {status.source} 워커 시작 (PID {status.process.pid})")
+
+    def stop(self, timeout=5.0):
+        """
+        모든 워커 종료 요청 후 대기 (시간 내 종료하지 않으면 강제 종료)
+
+        Args:
+            timeout: 워커별 종료 대기 시간 (초)
+        """
+        self.stop_event.set()
+        for status in self.cameras.values():
+            if status.process is None:
+                continue
+            status.process.join(timeout)
+            if status.process.is_alive():
+                status.process.terminate()
+                status.process.join()
+
+    def is_running(self):
+        """동작 중인 워커가 하나라도 있는지 여부"""
+        return any(status.process is not None and status.process.is_alive()
+                   for status in self.cameras.values())
+
+    def handle_message(self, message):
+        """
+        워커 메시지 처리 (측정 결과 발행 / 오류 기록)
+
+        Args:
+            message: 워커가 보낸 메시지 딕셔너리
+        """
+        status = self.cameras[message["camera"]]
+
+        if message["type"] == "error":
+            status.error = message["message"]
+            print(f"❌ {status.camera_id}: {status.error}")
+            return
+
+        avg_heart_rate, avg_respiration_rate = status.update(message)
+
+        if self.mqtt_client:
+            self.mqtt_client.publish_vital_signs(
+                heart_rate=avg_heart_rate,
+                respiration_rate=avg_respiration_rate,
+                heart_confidence=status.hr_confidence if avg_heart_rate is not None else 0.0,
+                timestamp=message["timestamp"],
+                topic=self.get_topic(status.camera_id)
+            )
+
+    def get_report(self):
+        """
+        카메라별 fps / CPU 점유율 / 측정값 보고
+
+        Returns:
+            카메라 ID를 키로 하는 상태 딕셔너리
+        """
+        report = {}
+        for camera_id, status in self.cameras.items():
+            report[camera_id] = {
+                "source": status.source,
+                "alive": status.process is not None and status.process.is_alive(),
+                "fps": status.fps,
+                "cpu": status.cpu,
+                "buffer": status.buffer,
+                "heart_rate": np.mean(status.heart_rate_history) if status.heart_rate_history else None,
+                "respiration_rate": (np.mean(status.respiration_rate_history)
+                                     if status.respiration_rate_history else None),
+                "error": status.error
+            }
+        return report
+
+    def print_report(self):
+        """카메라별 상태 표 출력 (하드웨어 사이징용 CPU 점유율 포함)"""
+        report = self.get_report()
+        cpu_count = os.cpu_count() or 1
+        total_cpu = sum(item["cpu"] for item in report.values())
+
+        print(f"\n📊 카메라 상태 (CPU 100% = 코어 1개, 호스트 코어 {cpu_count}개)")
+        for camera_id, item in report.items():
+            hr = f"{item['heart_rate']:.1f} BPM" if item["heart_rate"] is not None else "측정 중"
+            rr = f"{item['respiration_rate']:.1f} RPM" if item["respiration_rate"] is not None else "측정 중"
+            state = "실행 중" if item["alive"] else f"중지 ({item['error'] or '종료됨'})"
+            print(f"  {camera_id} [{item['source']}] {state} | {item['fps']:5.1f} fps | "
+                  f"CPU {item['cpu'] * 100:5.1f}% | HR {hr} | RR {rr}")
+        print(f"  합계 CPU {total_cpu * 100:.1f}% (호스트 전체의 {total_cpu / cpu_count * 100:.1f}%)")
+
+    def run(self):
+        """
+        워커 결과를 받아 발행하고 주기적으로 상태 보고 (모든 워커가 종료되거나 Ctrl+C까지)
+        """
+        last_report_time = time.time()
+        while self.is_running() or not self.result_queue.empty():
+            try:
+                message = self.result_queue.get(timeout=0.5)
+                self.handle_message(message)
+            except queue.Empty:
+                pass
+
+            if time.time() - last_report_time >= self.report_interval:
+                self.print_report()
+                last_report_time = time.time()
+
+
+def create_mqtt_client(args):
+    """
+    명령줄 인수 > 설정 파일 > 환경 변수 순으로 MQTT 클라이언트 생성
+
+    Args:
+        args: argparse 결과
+
+    Returns:
+        MQTTClient 인스턴스 또는 None
+    """
+    if args.no_mqtt:
+        return None
+
+    if args.mqtt_host or args.mqtt_port or args.mqtt_topic:
+        return MQTTClient(
+            broker_host=args.mqtt_host or "localhost",
+            broker_port=args.mqtt_port or 1883,
+            topic=args.mqtt_topic or "rppg/vital_signs",
+            username=args.mqtt_username,
+            password=args.mqtt_password
+        )
+
+    mqtt_client = create_mqtt_client_from_config("mqtt_config.json")
+    if mqtt_client is None:
+        mqtt_client = create_mqtt_client_from_env()
+    return mqtt_client
+
+
+def main():
+    """
+    메인 함수
+    """
+    parser = argparse.ArgumentParser(description='rPPG 멀티 카메라 슈퍼바이저')
+    parser.add_argument('sources', nargs='+',
+                        help='카메라 인덱스 또는 URI 목록 (예: 0 1 rtsp://host/stream)')
+    parser.add_argument('--detector', choices=['mediapipe', 'dlib'], default='mediapipe',
+                        help='얼굴 감지 백엔드 (기본값: mediapipe)')
+    parser.add_argument('--mqtt-host', type=str, default=None,
+                        help='MQTT 브로커 호스트 (기본값: localhost)')
+    parser.add_argument('--mqtt-port', type=int, default=None,
+                        help='MQTT 브로커 포트 (기본값: 1883)')
+    parser.add_argument('--mqtt-topic', type=str, default=None,
+                        help='MQTT 토픽 접두사 (카메라별 토픽: {토픽}/cam0, {토픽}/cam1 ...)')
+    parser.add_argument('--mqtt-username', type=str, default=None,
+                        help='MQTT 사용자명')
+    parser.add_argument('--mqtt-password', type=str, default=None,
+                        help='MQTT 비밀번호')
+    parser.add_argument('--mqtt-spool', type=str, default=None,
+                        help='브로커 연결이 끊긴 동안의 메시지를 보관할 스풀 파일 경로 (재연결 후 나누어 전송)')
+    parser.add_argument('--device-id', type=str, default=None,
+                        help='MQTT 메시지에 넣을 장치 ID (기본값: 설정 파일 또는 호스트 이름, 재시작해도 유지)')
+    parser.add_argument('--no-mqtt', action='store_true',
+                        help='MQTT 전송 비활성화')
+    parser.add_argument('--buffer-size', type=int, default=300,
+                        help='신호 버퍼 크기 (프레임 수, 기본값: 300 = 30fps 기준 10초)')
+    parser.add_argument('--streaming', action='store_true',
+                        help='스트리밍 필터 모드 (프레임마다 상태 유지 필터 적용, 매초 재필터링 생략)')
+    parser.add_argument('--use-timestamps', action='store_true',
+                        help='실제 프레임 타임스탬프로 측정한 fps로 재샘플링하여 분석 (부하로 fps가 떨어질 때 권장)')
+    parser.add_argument('--rois', type=str, default='forehead',
+                        help='사용할 얼굴 ROI (쉼표로 구분: forehead,left_cheek,right_cheek, 기본값: forehead)')
+    parser.add_argument('--detection-scale', type=float, default=1.0,
+                        help='얼굴 감지 해상도 축소 비율 (예: 0.5, 기본값: 1.0)')
+    parser.add_argument('--detect-interval', type=int, default=1,
+                        help='dlib 얼굴 감지 주기 (프레임 수, 0이면 추적을 놓칠 때만 감지)')
+    parser.add_argument('--update-interval', type=float, default=1.0,
+                        help='심박수/호흡률 갱신 간격 (초, 기본값: 1.0)')
+    parser.add_argument('--report-interval', type=float, default=5.0,
+                        help='카메라별 fps / CPU 점유율 보고 간격 (초, 기본값: 5.0)')
+
+    args = parser.parse_args()
+
+    error = check_timestamp_options(args.use_timestamps, streaming=args.streaming)
+    if error is not None:
+        parser.error(error)
+
+    detector_options = {
+        "buffer_size": args.buffer_size,
+        "streaming": args.streaming,
+        "use_timestamps": args.use_timestamps,
+        "roi_names": tuple(name.strip() for name in args.rois.split(',') if name.strip()),
+        "detection_scale": args.detection_scale
+    }
+    if args.detector == 'dlib':
+        detector_options["detect_interval"] = args.detect_interval if args.detect_interval > 0 else None
+
+    print("rPPG 멀티 카메라 슈퍼바이저 시작")
+    print("=" * 50)
+    print(f"카메라 {len(args.sources)}대, 백엔드: {args.detector}")
+    print("Ctrl+C로 종료하세요")
+    print("=" * 50)
+
+    mqtt_client = create_mqtt_client(args)
+    if mqtt_client:
+        if args.device_id:
+            mqtt_client.device_id = args.device_id
+        if args.mqtt_spool and mqtt_client.spool is None:
+            mqtt_client.enable_spool(args.mqtt_spool)
+        mqtt_client.connect()
+
+    supervisor = CameraSupervisor(
+        [parse_source(source) for source in args.sources],
+        backend=args.detector,
+        detector_options=detector_options,
+        mqtt_client=mqtt_client,
+        update_interval=args.update_interval,
+        report_interval=args.report_interval
+    )
+    for camera_id in supervisor.cameras:
+        print(f"  {camera_id} → 토픽 {supervisor.get_topic(camera_id)}")
+
+    supervisor.start()
+
+    try:
+        supervisor.run()
+    except KeyboardInterrupt:
+        print("\n프로그램이 중단되었습니다.")
+    finally:
+        supervisor.stop()
+        supervisor.print_report()
+
+        if mqtt_client:
+            mqtt_client.disconnect()
+            if mqtt_client.publish_count > 0:
+                print(f"MQTT로 {mqtt_client.publish_count}개의 메시지를 전송했습니다.")
+
+        print("\n프로그램을 종료합니다.")
+
+
+if __name__ == "__main__":
+    main()